@@ -1,17 +1,23 @@
 import os
 import io
 import json
-from flask import Flask, request, jsonify
+import time
+import zipfile
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 import logging
 
-from parsers.pdfplumber_parser import PDFPlumberParser
-from parsers.pymupdf_parser import PyMuPDFParser
-from parsers.ocr_parser import OCRParser
-from parsers.textract_parser import TextractParser
-from parsers.docai_parser import DocAIParser
+from parsers.registry import create_parser, is_enabled
 from parsers.ensemble_coordinator import EnsembleCoordinator
+from parsers.pages import parse_page_spec
+from parsers.cache_stats import add_cache_listener
+from parsers.executors import add_stats_listener
+from parsers.tracing import start_trace, tracing_exported
+from document_store import DocumentStore
+from response_shaping import dumps, encode_response, response_options, shape_result
+import metrics
+import warmup
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +27,18 @@ app = Flask(__name__)
 CORS(app)
 
 API_KEY = os.getenv('API_KEY', 'dev-key-change-in-production')
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 50))
+
+document_store = DocumentStore()
+add_stats_listener(metrics.record_executor_stats)
+add_cache_listener(metrics.record_cache_lookup)
+
+class RequestError(Exception):
+    """A client-side problem with a parse request (missing file, bad page range, unknown document)."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
 
 def verify_api_key():
     """Verify API key from request headers."""
@@ -29,43 +47,195 @@ def verify_api_key():
         return False
     return True
 
-@app.route('/', methods=['GET'])
-def index():
-    """Root endpoint."""
-    return jsonify({
+def resolve_parsers(parsers_to_use: str) -> list:
+    """Turn the optional `parsers` form field into a list of parser names."""
+    if parsers_to_use == 'all':
+        parsers = ['pdfplumber', 'pymupdf', 'ocr']
+
+        # Add cloud parsers if credentials available
+        if os.getenv('AWS_ACCESS_KEY_ID'):
+            parsers.append('textract')
+        if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
+            parsers.append('docai')
+        return [p for p in parsers if is_enabled(p)]
+
+    return [p.strip() for p in parsers_to_use.split(',')]
+
+def get_enabled_parser(parser_name: str):
+    """Build a parser for a single-parser endpoint (imported on first use)."""
+    if not is_enabled(parser_name):
+        raise RequestError(f'Parser {parser_name} is not enabled on this deployment', 404)
+    return create_parser(parser_name)
+
+def load_document(pages_spec, document_id, upload):
+    """
+    Return (pdf_bytes, filename, pages) from the request fields shared by the
+    Flask and ASGI apps. `upload` is a (pdf_bytes, filename) pair or None.
+    """
+    try:
+        pages = parse_page_spec(pages_spec)
+    except ValueError as e:
+        raise RequestError(str(e))
+
+    if document_id:
+        document = document_store.get(document_id)
+        if document is None:
+            raise RequestError('Unknown or expired document_id', 404)
+        if pages and pages[-1] > document['num_pages']:
+            raise RequestError(f"Page {pages[-1]} out of range (document has {document['num_pages']} pages)")
+        return document['pdf_bytes'], document['file_name'], pages
+
+    if upload is None:
+        raise RequestError('No file provided')
+
+    pdf_bytes, filename = upload
+    return pdf_bytes, filename, pages
+
+def read_request_document():
+    """
+    Return (pdf_bytes, filename, pages) for a parse request.
+    The PDF comes from the `file` upload or from a `document_id` returned by
+    POST /documents. `pages` is an optional range such as "1-3,5".
+    """
+    upload = None
+    if 'file' in request.files and not request.form.get('document_id'):
+        file = request.files['file']
+        upload = (file.read(), file.filename)
+    return load_document(request.form.get('pages'), request.form.get('document_id'), upload)
+
+def run_traced(parse, *args):
+    """
+    Run a parse call inside a request trace. If the client sent `timings=true`
+    the per-stage breakdown is added to the result as `timings`.
+    """
+    timings = request.form.get('timings', '').lower() in ('1', 'true', 'yes')
+
+    with start_trace(f'{request.method} {request.path}', enabled=timings or tracing_exported()) as trace:
+        result = parse(*args)
+
+    if timings and trace is not None:
+        result['timings'] = trace.summary()
+    return result
+
+def respond(result: dict) -> Response:
+    """Shape and encode a parse result as the client asked (see response_shaping.py)."""
+    options = response_options(request.values, request.headers)
+    body, headers = encode_response(shape_result(result, options), options)
+    return Response(body, headers=headers)
+
+def read_batch_documents() -> list:
+    """
+    Collect (filename, bytes) pairs for a batch request.
+    Accepts repeated `files` fields, a single `file`, and zip archives
+    (any uploaded .zip is expanded into its PDF members).
+    """
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    return expand_batch_uploads([(upload.filename, upload.read()) for upload in uploads])
+
+def expand_batch_uploads(uploads: list) -> list:
+    """Turn uploaded (filename, bytes) pairs into documents, expanding zip archives."""
+    documents = []
+
+    for filename, data in uploads:
+        filename = filename or 'document.pdf'
+
+        if filename.lower().endswith('.zip') or zipfile.is_zipfile(io.BytesIO(data)):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for member in archive.infolist():
+                    name = member.filename
+                    if member.is_dir() or name.startswith('__MACOSX/') or not name.lower().endswith('.pdf'):
+                        continue
+                    documents.append((os.path.basename(name), archive.read(member)))
+        else:
+            documents.append((filename, data))
+
+    return documents
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.time()
+    metrics.track_request_started()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    if endpoint != '/metrics' and not g.get('streamed_metrics'):
+        metrics.observe_request(endpoint, request.method, response.status_code, time.time() - g.request_start)
+    return response
+
+@app.teardown_request
+def finish_request(exc):
+    metrics.track_request_finished()
+
+def service_index() -> dict:
+    """Body of the root endpoint."""
+    return {
         'service': 'PDF Parser Ensemble',
         'version': '1.0.0',
         'endpoints': {
             'health': '/health',
+            'metrics': '/metrics',
             'parse_ensemble': '/parse/ensemble',
             'parse_auto': '/parse/auto',
+            'parse_smart': '/parse/smart',
+            'parse_batch': '/parse/batch',
+            'parse_chunked': '/parse/chunked',
+            'documents': '/documents',
             'parse_pdfplumber': '/parse/pdfplumber',
             'parse_pymupdf': '/parse/pymupdf',
             'parse_ocr': '/parse/ocr',
             'parse_textract': '/parse/textract',
             'parse_docai': '/parse/docai'
         }
-    })
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint."""
-    return jsonify({
-        'status': 'healthy',
+    }
+
+def service_health() -> dict:
+    """Body of the health check endpoint."""
+    ready = warmup.is_ready()
+    return {
+        'status': 'healthy' if ready else 'warming',
+        'ready': ready,
+        'warmup': warmup.status() if warmup.warmup_enabled() else None,
         'service': 'pdf-parser-ensemble',
         'version': '1.0.0',
         'parsers': {
-            'pdfplumber': True,
-            'pymupdf': True,
-            'ocr': True,
-            'textract': bool(os.getenv('AWS_ACCESS_KEY_ID')),
-            'docai': bool(os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
+            'pdfplumber': is_enabled('pdfplumber'),
+            'pymupdf': is_enabled('pymupdf'),
+            'ocr': is_enabled('ocr'),
+            'textract': is_enabled('textract') and bool(os.getenv('AWS_ACCESS_KEY_ID')),
+            'docai': is_enabled('docai') and bool(os.getenv('GOOGLE_APPLICATION_CREDENTIALS'))
         }
-    })
+    }
 
-@app.route('/parse/pdfplumber', methods=['POST'])
-def parse_pdfplumber():
-    """Parse PDF using pdfplumber (table extraction)."""
+@app.route('/', methods=['GET'])
+def index():
+    """Root endpoint."""
+    return jsonify(service_index())
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint. Returns 503 until warm-up (WARMUP=true) has finished."""
+    health = service_health()
+    return jsonify(health), 200 if health['ready'] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics aggregated across all gunicorn workers."""
+    if os.getenv('METRICS_PUBLIC', '').lower() != 'true' and not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if not metrics.PROMETHEUS_AVAILABLE:
+        return jsonify({'error': 'prometheus_client not installed'}), 503
+
+    body, content_type = metrics.render_latest()
+    return Response(body, content_type=content_type)
+
+@app.route('/documents', methods=['POST'])
+def upload_document():
+    """
+    Upload a PDF once and get a `document_id` handle back.
+    Later parse requests pass `document_id` (plus `pages`) instead of the file.
+    """
     if not verify_api_key():
         return jsonify({'error': 'Unauthorized'}), 401
 
@@ -76,10 +246,40 @@ def parse_pdfplumber():
         file = request.files['file']
         pdf_bytes = file.read()
 
-        parser = PDFPlumberParser()
-        result = parser.parse(pdf_bytes, file.filename)
+        if not pdf_bytes:
+            return jsonify({'error': 'Empty file provided'}), 400
+
+        return jsonify(document_store.put(pdf_bytes, file.filename))
+    except Exception as e:
+        logger.error(f"Document upload error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/documents/<document_id>', methods=['DELETE'])
+def delete_document(document_id):
+    """Release an uploaded document once a chunked job is finished."""
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if not document_store.delete(document_id):
+        return jsonify({'error': 'Unknown document_id'}), 404
+    return jsonify({'deleted': document_id})
+
+@app.route('/parse/pdfplumber', methods=['POST'])
+def parse_pdfplumber():
+    """Parse PDF using pdfplumber (table extraction)."""
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        pdf_bytes, filename, pages = read_request_document()
+
+        parser = get_enabled_parser('pdfplumber')
+        result = run_traced(parser.parse, pdf_bytes, filename, pages)
+        metrics.observe_parser_result(result)
 
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"PDFPlumber parsing error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -91,16 +291,15 @@ def parse_pymupdf():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
+        pdf_bytes, filename, pages = read_request_document()
 
-        file = request.files['file']
-        pdf_bytes = file.read()
-
-        parser = PyMuPDFParser()
-        result = parser.parse(pdf_bytes, file.filename)
+        parser = get_enabled_parser('pymupdf')
+        result = run_traced(parser.parse, pdf_bytes, filename, pages)
+        metrics.observe_parser_result(result)
 
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"PyMuPDF parsing error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -112,16 +311,15 @@ def parse_ocr():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
+        pdf_bytes, filename, pages = read_request_document()
 
-        file = request.files['file']
-        pdf_bytes = file.read()
+        parser = get_enabled_parser('ocr')
+        result = run_traced(parser.parse, pdf_bytes, filename, pages)
+        metrics.observe_parser_result(result)
 
-        parser = OCRParser()
-        result = parser.parse(pdf_bytes, file.filename)
-
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"OCR parsing error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -133,16 +331,15 @@ def parse_textract():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
+        pdf_bytes, filename, pages = read_request_document()
 
-        file = request.files['file']
-        pdf_bytes = file.read()
+        parser = get_enabled_parser('textract')
+        result = run_traced(parser.parse, pdf_bytes, filename, pages)
+        metrics.observe_parser_result(result)
 
-        parser = TextractParser()
-        result = parser.parse(pdf_bytes, file.filename)
-
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"Textract parsing error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -154,16 +351,15 @@ def parse_docai():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
-        pdf_bytes = file.read()
+        pdf_bytes, filename, pages = read_request_document()
 
-        parser = DocAIParser()
-        result = parser.parse(pdf_bytes, file.filename)
+        parser = get_enabled_parser('docai')
+        result = run_traced(parser.parse, pdf_bytes, filename, pages)
+        metrics.observe_parser_result(result)
 
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"DocAI parsing error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -178,41 +374,34 @@ def parse_ensemble():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
-        pdf_bytes = file.read()
+        pdf_bytes, filename, pages = read_request_document()
 
         if not pdf_bytes:
             return jsonify({'error': 'Empty file provided'}), 400
 
-        logger.info(f"Processing file: {file.filename}, size: {len(pdf_bytes)} bytes")
+        logger.info(f"Processing file: {filename}, size: {len(pdf_bytes)} bytes, pages: {pages or 'all'}")
 
         # Get parser selection from request (optional)
-        parsers_to_use = request.form.get('parsers', 'all')
-        if parsers_to_use == 'all':
-            parsers_to_use = ['pdfplumber', 'pymupdf', 'ocr']
-
-            # Add cloud parsers if credentials available
-            if os.getenv('AWS_ACCESS_KEY_ID'):
-                parsers_to_use.append('textract')
-            if os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
-                parsers_to_use.append('docai')
-        else:
-            parsers_to_use = [p.strip() for p in parsers_to_use.split(',')]
+        parsers_to_use = resolve_parsers(request.form.get('parsers', 'all'))
 
         logger.info(f"Using parsers: {parsers_to_use}")
 
         coordinator = EnsembleCoordinator()
-        result = coordinator.parse_with_ensemble(
+        result = run_traced(
+            coordinator.parse_with_ensemble,
             pdf_bytes,
-            file.filename,
-            parsers_to_use
+            filename,
+            parsers_to_use,
+            pages,
+            request.form.get('cloud_routing'),
+            request.form.get('execution')
         )
+        metrics.observe_ensemble_result(result)
 
         logger.info(f"Ensemble parsing completed successfully")
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"Ensemble parsing error: {str(e)}", exc_info=True)
         return jsonify({
@@ -222,6 +411,103 @@ def parse_ensemble():
             'success': False
         }), 500
 
+@app.route('/parse/batch', methods=['POST'])
+def parse_batch():
+    """
+    Run the ensemble over many quotes in one request.
+    Results are streamed as newline-delimited JSON, one line per document
+    in completion order, followed by a final summary line.
+    """
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        documents = read_batch_documents()
+    except zipfile.BadZipFile as e:
+        return jsonify({'error': f'Invalid zip archive: {str(e)}'}), 400
+
+    if not documents:
+        return jsonify({'error': 'No files provided'}), 400
+    if len(documents) > BATCH_MAX_FILES:
+        return jsonify({'error': f'Too many files ({len(documents)}), limit is {BATCH_MAX_FILES}'}), 400
+
+    parsers_to_use = resolve_parsers(request.form.get('parsers', 'all'))
+    options = response_options(request.values, request.headers)
+    logger.info(f"Batch parsing {len(documents)} files with parsers: {parsers_to_use}")
+
+    def generate():
+        coordinator = EnsembleCoordinator()
+        valid = []
+
+        # Empty uploads are reported straight away and never scheduled
+        for index, (filename, pdf_bytes) in enumerate(documents):
+            if pdf_bytes:
+                valid.append(index)
+            else:
+                yield json.dumps({
+                    'index': index,
+                    'file_name': filename,
+                    'error': 'Empty file provided',
+                    'success': False
+                }) + '\n'
+
+        completed = 0
+        try:
+            for entry in coordinator.parse_batch([documents[i] for i in valid], parsers_to_use):
+                entry['index'] = valid[entry['index']]
+                metrics.observe_ensemble_result(entry['result'])
+                completed += 1
+                entry['result'] = shape_result(entry['result'], options)
+                yield dumps(entry) + b'\n'
+        except Exception as e:
+            logger.error(f"Batch parsing error: {str(e)}", exc_info=True)
+            yield json.dumps({
+                'error': str(e),
+                'error_type': type(e).__name__,
+                'parser_name': 'ensemble',
+                'success': False
+            }) + '\n'
+
+        yield json.dumps({
+            'summary': True,
+            'documents_received': len(documents),
+            'documents_completed': completed,
+            'parsers_used': parsers_to_use,
+        }) + '\n'
+
+    # The documents are parsed while the body streams, so the stream records the request
+    g.streamed_metrics = True
+    body = metrics.observe_stream(generate(), request.url_rule.rule, request.method, g.request_start)
+    return Response(body, mimetype='application/x-ndjson')
+
+@app.route('/parse/chunked', methods=['POST'])
+def parse_chunked():
+    """
+    Parse a large digital PDF in page chunks across the process pool,
+    stitching tables that continue over page breaks.
+    """
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        pdf_bytes, filename, pages = read_request_document()
+
+        if not pdf_bytes:
+            return jsonify({'error': 'Empty file provided'}), 400
+
+        chunk_size = request.form.get('chunk_size', type=int)
+
+        coordinator = EnsembleCoordinator()
+        result = run_traced(coordinator.parse_chunked, pdf_bytes, filename, chunk_size, pages)
+        metrics.observe_ensemble_result(result)
+
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        logger.error(f"Chunked parsing error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/parse/auto', methods=['POST'])
 def parse_auto():
     """
@@ -232,20 +518,55 @@ def parse_auto():
         return jsonify({'error': 'Unauthorized'}), 401
 
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-
-        file = request.files['file']
-        pdf_bytes = file.read()
+        pdf_bytes, filename, pages = read_request_document()
 
         coordinator = EnsembleCoordinator()
-        result = coordinator.parse_with_auto_selection(pdf_bytes, file.filename)
+        result = run_traced(coordinator.parse_with_auto_selection, pdf_bytes, filename, pages)
+        if 'all_results' in result:
+            metrics.observe_ensemble_result(result)
+        else:
+            metrics.observe_parser_result(result.get('result'))
 
-        return jsonify(result)
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         logger.error(f"Auto parsing error: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/parse/smart', methods=['POST'])
+def parse_smart():
+    """
+    Run the cheapest parser set that similar earlier documents say will be
+    confident enough, escalating to every parser if it falls short.
+    The chosen plan is returned as `smart_plan`.
+    """
+    if not verify_api_key():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        pdf_bytes, filename, pages = read_request_document()
+
+        if not pdf_bytes:
+            return jsonify({'error': 'Empty file provided'}), 400
+
+        available = resolve_parsers(request.form.get('parsers', 'all'))
+
+        coordinator = EnsembleCoordinator()
+        result = run_traced(coordinator.parse_smart, pdf_bytes, filename, available, pages)
+        metrics.observe_ensemble_result(result)
+
+        logger.info(f"Smart parse of {filename}: {result['smart_plan']['reason']} plan {result['smart_plan']['parsers']}")
+        return respond(result)
+    except RequestError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except Exception as e:
+        logger.error(f"Smart parsing error: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
+    if warmup.warmup_enabled():
+        warmup.warm_up()
+        warmup.start_worker_pools()
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
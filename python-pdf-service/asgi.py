@@ -0,0 +1,431 @@
+"""
+ASGI entry point: the same routes and response contracts as app.py, served
+by async handlers so one worker can hold many in-flight requests.
+
+Cloud parsers (Textract, Document AI) wait on the shared thread pool and
+CPU-bound parsers run in the shared process pool, so the event loop only
+reads uploads, schedules work and writes responses.
+
+Run with:
+    gunicorn -k uvicorn.workers.UvicornWorker --workers 2 asgi:app
+    uvicorn asgi:app --port 5000
+"""
+
+import os
+import json
+import asyncio
+import time
+import zipfile
+import logging
+
+from starlette.applications import Starlette
+from starlette.datastructures import UploadFile
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Match, Route
+
+from app import (
+    API_KEY,
+    BATCH_MAX_FILES,
+    RequestError,
+    document_store,
+    expand_batch_uploads,
+    load_document,
+    resolve_parsers,
+    service_health,
+    service_index,
+)
+from parsers.ensemble_coordinator import EnsembleCoordinator
+from parsers.registry import is_enabled
+from parsers.tracing import start_trace, tracing_exported
+from response_shaping import OPTION_FIELDS, dumps, encode_response, response_options, shape_result
+import metrics
+import warmup
+
+logger = logging.getLogger(__name__)
+
+SINGLE_PARSERS = {
+    'pdfplumber': 'PDFPlumber',
+    'pymupdf': 'PyMuPDF',
+    'ocr': 'OCR',
+    'textract': 'Textract',
+    'docai': 'DocAI',
+}
+
+
+def verify_api_key(request: Request) -> bool:
+    """Verify API key from request headers."""
+    return request.headers.get('X-API-Key') == API_KEY
+
+
+def unauthorized() -> JSONResponse:
+    return JSONResponse({'error': 'Unauthorized'}, status_code=401)
+
+
+async def read_request_document(form):
+    """Async counterpart of app.read_request_document."""
+    upload = None
+    file = form.get('file')
+    if isinstance(file, UploadFile) and not form.get('document_id'):
+        upload = (await file.read(), file.filename)
+    return load_document(form.get('pages'), form.get('document_id'), upload)
+
+
+async def run_traced(request: Request, form, parse, *args):
+    """Await a parse coroutine inside a request trace (see app.run_traced)."""
+    timings = (form.get('timings') or '').lower() in ('1', 'true', 'yes')
+
+    with start_trace(f'{request.method} {request.url.path}', enabled=timings or tracing_exported()) as trace:
+        result = await parse(*args)
+
+    if timings and trace is not None:
+        result['timings'] = trace.summary()
+    return result
+
+
+def respond(request: Request, form, result: dict) -> Response:
+    """Shape and encode a parse result (see response_shaping.py; form fields win over the query string)."""
+    options = response_options(shaping_values(request, form), request.headers)
+    body, headers = encode_response(shape_result(result, options), options)
+    return Response(body, headers=headers)
+
+
+def shaping_values(request: Request, form) -> dict:
+    return {key: form.get(key) or request.query_params.get(key) for key in OPTION_FIELDS}
+
+
+async def index(request: Request):
+    """Root endpoint."""
+    return JSONResponse(service_index())
+
+
+async def health_check(request: Request):
+    """Health check endpoint. Returns 503 until warm-up (WARMUP=true) has finished."""
+    health = service_health()
+    return JSONResponse(health, status_code=200 if health['ready'] else 503)
+
+
+async def warm_up_worker():
+    """Warm this worker's parsers before it takes traffic (no-op if already warmed by a preload)."""
+    if warmup.warmup_enabled():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, warmup.warm_up)
+        await loop.run_in_executor(None, warmup.start_worker_pools)
+
+
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics aggregated across all workers."""
+    if os.getenv('METRICS_PUBLIC', '').lower() != 'true' and not verify_api_key(request):
+        return unauthorized()
+
+    if not metrics.PROMETHEUS_AVAILABLE:
+        return JSONResponse({'error': 'prometheus_client not installed'}, status_code=503)
+
+    body, content_type = metrics.render_latest()
+    return Response(body, media_type=content_type)
+
+
+async def upload_document(request: Request):
+    """Upload a PDF once and get a `document_id` handle back."""
+    if not verify_api_key(request):
+        return unauthorized()
+
+    try:
+        form = await request.form()
+        file = form.get('file')
+        if not isinstance(file, UploadFile):
+            return JSONResponse({'error': 'No file provided'}, status_code=400)
+
+        pdf_bytes = await file.read()
+        if not pdf_bytes:
+            return JSONResponse({'error': 'Empty file provided'}, status_code=400)
+
+        return JSONResponse(document_store.put(pdf_bytes, file.filename))
+    except Exception as e:
+        logger.error(f"Document upload error: {str(e)}", exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def delete_document(request: Request):
+    """Release an uploaded document once a chunked job is finished."""
+    if not verify_api_key(request):
+        return unauthorized()
+
+    document_id = request.path_params['document_id']
+    if not document_store.delete(document_id):
+        return JSONResponse({'error': 'Unknown document_id'}, status_code=404)
+    return JSONResponse({'deleted': document_id})
+
+
+def single_parser_endpoint(parser_name: str, label: str):
+    """Build the /parse/<parser_name> handler."""
+
+    async def endpoint(request: Request):
+        if not verify_api_key(request):
+            return unauthorized()
+
+        try:
+            if not is_enabled(parser_name):
+                raise RequestError(f'Parser {parser_name} is not enabled on this deployment', 404)
+
+            form = await request.form()
+            pdf_bytes, filename, pages = await read_request_document(form)
+
+            coordinator = EnsembleCoordinator()
+            result = await run_traced(request, form, coordinator.parse_async, parser_name, pdf_bytes, filename, pages)
+            metrics.observe_parser_result(result)
+
+            return respond(request, form, result)
+        except RequestError as e:
+            return JSONResponse({'error': str(e)}, status_code=e.status_code)
+        except Exception as e:
+            logger.error(f"{label} parsing error: {str(e)}", exc_info=True)
+            return JSONResponse({'error': str(e)}, status_code=500)
+
+    endpoint.__name__ = f'parse_{parser_name}'
+    return endpoint
+
+
+async def parse_ensemble(request: Request):
+    """Run all available parsers and return ensemble results."""
+    if not verify_api_key(request):
+        return unauthorized()
+
+    try:
+        form = await request.form()
+        pdf_bytes, filename, pages = await read_request_document(form)
+
+        if not pdf_bytes:
+            return JSONResponse({'error': 'Empty file provided'}, status_code=400)
+
+        parsers_to_use = resolve_parsers(form.get('parsers') or 'all')
+        logger.info(f"Processing file: {filename}, size: {len(pdf_bytes)} bytes, parsers: {parsers_to_use}")
+
+        coordinator = EnsembleCoordinator()
+        result = await run_traced(
+            request, form,
+            coordinator.parse_with_ensemble_async,
+            pdf_bytes,
+            filename,
+            parsers_to_use,
+            pages,
+            form.get('cloud_routing'),
+            form.get('execution')
+        )
+        metrics.observe_ensemble_result(result)
+
+        return respond(request, form, result)
+    except RequestError as e:
+        return JSONResponse({'error': str(e)}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Ensemble parsing error: {str(e)}", exc_info=True)
+        return JSONResponse({
+            'error': str(e),
+            'error_type': type(e).__name__,
+            'parser_name': 'ensemble',
+            'success': False
+        }, status_code=500)
+
+
+async def parse_batch(request: Request):
+    """
+    Run the ensemble over many quotes in one request, streaming one NDJSON
+    line per document in completion order plus a final summary line.
+    """
+    if not verify_api_key(request):
+        return unauthorized()
+
+    form = await request.form()
+    uploads = [
+        (upload.filename, await upload.read())
+        for upload in form.getlist('files') + form.getlist('file')
+        if isinstance(upload, UploadFile)
+    ]
+    try:
+        documents = expand_batch_uploads(uploads)
+    except zipfile.BadZipFile as e:
+        return JSONResponse({'error': f'Invalid zip archive: {str(e)}'}, status_code=400)
+
+    if not documents:
+        return JSONResponse({'error': 'No files provided'}, status_code=400)
+    if len(documents) > BATCH_MAX_FILES:
+        return JSONResponse({'error': f'Too many files ({len(documents)}), limit is {BATCH_MAX_FILES}'}, status_code=400)
+
+    parsers_to_use = resolve_parsers(form.get('parsers') or 'all')
+    options = response_options(shaping_values(request, form), request.headers)
+    logger.info(f"Batch parsing {len(documents)} files with parsers: {parsers_to_use}")
+
+    async def generate():
+        coordinator = EnsembleCoordinator()
+        valid = []
+
+        for index, (filename, pdf_bytes) in enumerate(documents):
+            if pdf_bytes:
+                valid.append(index)
+            else:
+                yield json.dumps({
+                    'index': index,
+                    'file_name': filename,
+                    'error': 'Empty file provided',
+                    'success': False
+                }) + '\n'
+
+        completed = 0
+        try:
+            async for entry in coordinator.parse_batch_async([documents[i] for i in valid], parsers_to_use):
+                entry['index'] = valid[entry['index']]
+                metrics.observe_ensemble_result(entry['result'])
+                completed += 1
+                entry['result'] = shape_result(entry['result'], options)
+                yield dumps(entry) + b'\n'
+        except Exception as e:
+            logger.error(f"Batch parsing error: {str(e)}", exc_info=True)
+            yield json.dumps({
+                'error': str(e),
+                'error_type': type(e).__name__,
+                'parser_name': 'ensemble',
+                'success': False
+            }) + '\n'
+
+        yield json.dumps({
+            'summary': True,
+            'documents_received': len(documents),
+            'documents_completed': completed,
+            'parsers_used': parsers_to_use,
+        }) + '\n'
+
+    # The documents are parsed while the body streams, so the stream records the request
+    request.state.streamed_metrics = True
+    body = metrics.observe_async_stream(generate(), '/parse/batch', request.method, request.state.request_start)
+    return StreamingResponse(body, media_type='application/x-ndjson')
+
+
+async def parse_chunked(request: Request):
+    """Parse a large digital PDF in page chunks across the process pool."""
+    if not verify_api_key(request):
+        return unauthorized()
+
+    try:
+        form = await request.form()
+        pdf_bytes, filename, pages = await read_request_document(form)
+
+        if not pdf_bytes:
+            return JSONResponse({'error': 'Empty file provided'}, status_code=400)
+
+        try:
+            chunk_size = int(form.get('chunk_size')) if form.get('chunk_size') else None
+        except ValueError:
+            chunk_size = None
+
+        coordinator = EnsembleCoordinator()
+        result = await run_traced(request, form, coordinator.parse_chunked_async, pdf_bytes, filename, chunk_size, pages)
+        metrics.observe_ensemble_result(result)
+
+        return respond(request, form, result)
+    except RequestError as e:
+        return JSONResponse({'error': str(e)}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Chunked parsing error: {str(e)}", exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def parse_auto(request: Request):
+    """Try parsers in order until one succeeds with high confidence."""
+    if not verify_api_key(request):
+        return unauthorized()
+
+    try:
+        form = await request.form()
+        pdf_bytes, filename, pages = await read_request_document(form)
+
+        coordinator = EnsembleCoordinator()
+        result = await run_traced(request, form, coordinator.parse_with_auto_selection_async, pdf_bytes, filename, pages)
+        if 'all_results' in result:
+            metrics.observe_ensemble_result(result)
+        else:
+            metrics.observe_parser_result(result.get('result'))
+
+        return respond(request, form, result)
+    except RequestError as e:
+        return JSONResponse({'error': str(e)}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Auto parsing error: {str(e)}", exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def parse_smart(request: Request):
+    """Run the parser set learned from similar documents (see parsers.outcomes)."""
+    if not verify_api_key(request):
+        return unauthorized()
+
+    try:
+        form = await request.form()
+        pdf_bytes, filename, pages = await read_request_document(form)
+
+        if not pdf_bytes:
+            return JSONResponse({'error': 'Empty file provided'}, status_code=400)
+
+        available = resolve_parsers(form.get('parsers') or 'all')
+
+        coordinator = EnsembleCoordinator()
+        result = await run_traced(request, form, coordinator.parse_smart_async, pdf_bytes, filename, available, pages)
+        metrics.observe_ensemble_result(result)
+
+        logger.info(f"Smart parse of {filename}: {result['smart_plan']['reason']} plan {result['smart_plan']['parsers']}")
+        return respond(request, form, result)
+    except RequestError as e:
+        return JSONResponse({'error': str(e)}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Smart parsing error: {str(e)}", exc_info=True)
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+routes = [
+    Route('/', index, methods=['GET']),
+    Route('/health', health_check, methods=['GET']),
+    Route('/metrics', metrics_endpoint, methods=['GET']),
+    Route('/documents', upload_document, methods=['POST']),
+    Route('/documents/{document_id}', delete_document, methods=['DELETE']),
+    Route('/parse/ensemble', parse_ensemble, methods=['POST']),
+    Route('/parse/batch', parse_batch, methods=['POST']),
+    Route('/parse/chunked', parse_chunked, methods=['POST']),
+    Route('/parse/auto', parse_auto, methods=['POST']),
+    Route('/parse/smart', parse_smart, methods=['POST']),
+] + [
+    Route(f'/parse/{name}', single_parser_endpoint(name, label), methods=['POST'])
+    for name, label in SINGLE_PARSERS.items()
+]
+
+
+async def record_request_metrics(request: Request, call_next):
+    """Same request counters and latency histogram as the Flask hooks."""
+    start = time.time()
+    endpoint = next(
+        (route.path for route in routes if route.matches(request.scope)[0] == Match.FULL),
+        'unmatched'
+    ).replace('{', '<').replace('}', '>')  # label like Flask's url_rule
+    request.state.request_start = start
+    metrics.track_request_started()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.track_request_finished()
+        if endpoint != '/metrics' and not getattr(request.state, 'streamed_metrics', False):
+            metrics.observe_request(endpoint, request.method, status, time.time() - start)
+
+
+app = Starlette(
+    routes=routes,
+    on_startup=[warm_up_worker],
+    middleware=[
+        # flask_cors' defaults, as CORS(app) in app.py
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+        Middleware(BaseHTTPMiddleware, dispatch=record_request_metrics),
+    ],
+)
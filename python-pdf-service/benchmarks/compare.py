@@ -0,0 +1,72 @@
+"""
+Compare two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+
+Exits with status 1 if any target/document got slower than the threshold
+(or uses more peak memory by the same ratio), so it can gate CI.
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Tuple
+
+
+def _index(report: Dict) -> Dict[Tuple[str, str], Dict]:
+    return {(r['target'], r['document']): r for r in report.get('results', [])}
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> int:
+    base = _index(baseline)
+    cand = _index(candidate)
+    regressions = 0
+
+    print(f"{'target':<13} {'document':<18} {'base ms':>10} {'new ms':>10} {'change':>8} "
+          f"{'base MB':>8} {'new MB':>8}")
+
+    for key in sorted(set(base) & set(cand)):
+        old, new = base[key], cand[key]
+        old_ms, new_ms = old.get('median_ms', 0), new.get('median_ms', 0)
+        change = (new_ms - old_ms) / old_ms if old_ms else 0.0
+        old_mb, new_mb = old.get('peak_rss_mb', 0), new.get('peak_rss_mb', 0)
+        mem_change = (new_mb - old_mb) / old_mb if old_mb else 0.0
+
+        flag = ''
+        if change > threshold or mem_change > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  faster'
+
+        print(f'{key[0]:<13} {key[1]:<18} {old_ms:>10.1f} {new_ms:>10.1f} {change:>+7.1%} '
+              f'{old_mb:>8.1f} {new_mb:>8.1f}{flag}')
+
+    for key in sorted(set(base) ^ set(cand)):
+        side = 'baseline' if key in base else 'candidate'
+        print(f'{key[0]:<13} {key[1]:<18} only in {side}')
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown (or memory growth) counted as a regression')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate, args.threshold)
+    print(f'\n{regressions} regression(s) above {args.threshold:.0%}')
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+Deterministic synthetic quote PDFs for benchmarking.
+
+Every document is generated from a fixed seed, so two runs on different
+machines (or commits) parse byte-identical inputs. Variants cover what the
+service sees in practice: ruled and unruled tables, tables that run across
+page breaks, terms & conditions pages, and rasterised "scanned" copies.
+"""
+
+import os
+import random
+from dataclasses import dataclass
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+ROW_HEIGHT = 16
+COLUMNS = [('Description', 50), ('Qty', 330), ('Unit', 380), ('Rate', 430), ('Total', 500)]
+
+SUPPLIERS = ['Firestop Solutions Ltd', 'Passive Fire NZ', 'Protek Fire Systems', 'Seal-Tite Contracting']
+SYSTEMS = ['Fire collar', 'Intumescent sealant', 'Fire batt', 'Pipe wrap', 'Cable transit', 'Fire damper seal']
+SUBSTRATES = ['GIB wall', 'concrete floor', 'block wall', 'Hebel panel', 'timber floor']
+SIZES = ['50mm', '65mm', '80mm', '100mm', '150mm', '200mm']
+FONT = fitz.Font('helv')
+FIXED_DATE = 'D:20240101000000Z'
+UNITS = ['ea', 'm', 'm2', 'lm', 'no']
+TC_SENTENCES = [
+    'This quotation is valid for thirty days from the date of issue.',
+    'Prices exclude GST unless stated otherwise.',
+    'Access equipment above 3m is excluded and to be provided by the main contractor.',
+    'Penetrations not shown on the drawings supplied will be charged at schedule rates.',
+    'Payment terms are twentieth of the month following invoice.',
+    'All work is carried out in accordance with the approved fire report.',
+    'Variations must be approved in writing before work commences.',
+    'Remedial work caused by other trades will be charged as a variation.',
+]
+
+
+@dataclass(frozen=True)
+class QuoteSpec:
+    """Shape of one synthetic quote."""
+    name: str
+    priced_pages: int
+    ruled: bool = True
+    multipage_table: bool = False  # header row only on the first priced page
+    tc_pages: int = 0
+    scanned: bool = False
+    seed: int = 0
+
+    @property
+    def total_pages(self) -> int:
+        return self.priced_pages + self.tc_pages
+
+
+# Default corpus: small enough for CI-style runs, with a few large documents
+CORPUS: List[QuoteSpec] = [
+    QuoteSpec('ruled_1p', 1, seed=1),
+    QuoteSpec('ruled_5p_tc2', 5, tc_pages=2, seed=2),
+    QuoteSpec('unruled_5p', 5, ruled=False, seed=3),
+    QuoteSpec('multipage_20p', 20, multipage_table=True, seed=4),
+    QuoteSpec('scanned_3p', 3, scanned=True, seed=5),
+    QuoteSpec('ruled_50p_tc5', 50, tc_pages=5, seed=6),
+    QuoteSpec('multipage_200p', 195, multipage_table=True, tc_pages=5, seed=7),
+]
+
+SMALL_CORPUS = [spec for spec in CORPUS if spec.total_pages <= 20]
+
+
+def generate_quote(spec: QuoteSpec) -> bytes:
+    """Build the PDF for a spec. Same spec -> same bytes."""
+    rng = random.Random(spec.seed)
+    doc = fitz.open()
+    supplier = rng.choice(SUPPLIERS)
+    quote_number = f'Q-{rng.randint(10000, 99999)}'
+    grand_total = 0.0
+    line_number = 0
+
+    for page_index in range(spec.priced_pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN + 20
+
+        if page_index == 0:
+            page.insert_text((MARGIN, y), supplier, fontsize=16)
+            y += 22
+            page.insert_text((MARGIN, y), f'Quote No: {quote_number}', fontsize=10)
+            y += 14
+            page.insert_text((MARGIN, y), f'Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024', fontsize=10)
+            y += 26
+
+        show_header = page_index == 0 or not spec.multipage_table
+        rows: List[List[str]] = []
+        if show_header:
+            rows.append([title for title, _ in COLUMNS])
+
+        available = int((PAGE_HEIGHT - MARGIN - 60 - y) // ROW_HEIGHT) - len(rows)
+        for _ in range(available):
+            line_number += 1
+            qty = rng.randint(1, 250)
+            rate = round(rng.uniform(8, 450), 2)
+            total = round(qty * rate, 2)
+            grand_total += total
+            description = f'{line_number}. {rng.choice(SYSTEMS)} {rng.choice(SIZES)} to {rng.choice(SUBSTRATES)}'
+            rows.append([description, str(qty), rng.choice(UNITS), f'{rate:,.2f}', f'{total:,.2f}'])
+
+        y = _draw_table(page, rows, y, spec.ruled)
+
+        if page_index == spec.priced_pages - 1:
+            gst = round(grand_total * 0.15, 2)
+            y += 24
+            page.insert_text((380, y), f'Subtotal: {grand_total:,.2f}', fontsize=10)
+            page.insert_text((380, y + 14), f'GST: {gst:,.2f}', fontsize=10)
+            page.insert_text((380, y + 28), f'Grand Total: {grand_total + gst:,.2f}', fontsize=10)
+
+        page.insert_text((MARGIN, PAGE_HEIGHT - 30), f'Page {page_index + 1}', fontsize=8)
+
+    for tc_index in range(spec.tc_pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN + 20), 'Terms and Conditions' if tc_index == 0 else 'Terms and Conditions (continued)', fontsize=14)
+        paragraphs = [
+            ' '.join(rng.choice(TC_SENTENCES) for _ in range(rng.randint(3, 6)))
+            for _ in range(8)
+        ]
+        text = '\n\n'.join(f'{i + 1}. {p}' for i, p in enumerate(paragraphs))
+        page.insert_textbox(
+            fitz.Rect(MARGIN, MARGIN + 40, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN),
+            text,
+            fontsize=9
+        )
+
+    if spec.scanned:
+        doc = _rasterise(doc, rng)
+
+    # Fixed dates and no random /ID keep the output byte-identical between runs
+    doc.set_metadata({
+        'title': f'Quote {quote_number}',
+        'author': supplier,
+        'creator': 'benchmarks.corpus',
+        'creationDate': FIXED_DATE,
+        'modDate': FIXED_DATE,
+    })
+    data = doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return data
+
+
+def _draw_table(page, rows: List[List[str]], y: float, ruled: bool) -> float:
+    """Draw rows starting at baseline y; returns the y below the table."""
+    top = y - ROW_HEIGHT + 4
+    writer = fitz.TextWriter(page.rect)
+    for row in rows:
+        for (_, x), value in zip(COLUMNS, row):
+            writer.append((x, y), value, font=FONT, fontsize=9)
+        y += ROW_HEIGHT
+    writer.write_text(page)
+    bottom = top + ROW_HEIGHT * len(rows)
+
+    if ruled and rows:
+        shape = page.new_shape()
+        right = PAGE_WIDTH - MARGIN + 10
+        for row_index in range(len(rows) + 1):
+            line_y = top + row_index * ROW_HEIGHT
+            shape.draw_line((MARGIN - 4, line_y), (right, line_y))
+        for x in [MARGIN - 4] + [x - 4 for _, x in COLUMNS[1:]] + [right]:
+            shape.draw_line((x, top), (x, bottom))
+        shape.finish(width=0.5)
+        shape.commit()
+
+    return y
+
+
+def _rasterise(doc, rng: random.Random, dpi: int = 150):
+    """Replace every page with a grayscale image of itself, like a scanner would."""
+    scanned = fitz.open()
+    for page in doc:
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        new_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        # A slight, deterministic skew in placement so it is not pixel-perfect
+        offset = rng.uniform(-1.5, 1.5)
+        rect = fitz.Rect(offset, offset, page.rect.width + offset, page.rect.height + offset)
+        new_page.insert_image(rect, stream=pixmap.tobytes('jpeg', jpg_quality=80))
+    doc.close()
+    return scanned
+
+
+def write_corpus(out_dir: str, specs: List[QuoteSpec] = None) -> Dict[str, str]:
+    """Write the corpus to out_dir; returns {name: path}."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for spec in specs or CORPUS:
+        path = os.path.join(out_dir, f'{spec.name}.pdf')
+        with open(path, 'wb') as f:
+            f.write(generate_quote(spec))
+        paths[spec.name] = path
+    return paths
+
+
+if __name__ == '__main__':
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else 'benchmark_corpus'
+    for name, path in write_corpus(target).items():
+        print(f'{name}: {path}')
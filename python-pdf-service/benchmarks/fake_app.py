@@ -0,0 +1,19 @@
+"""
+app.py with Textract and Document AI answered by the local fakes in
+benchmarks/fakes.py, for load testing. load_test.py serves this module:
+
+    gunicorn --workers 2 benchmarks.fake_app:app
+
+The fakes are installed before the app is imported, so no real cloud client
+is ever built in these workers.
+"""
+
+import logging
+
+from .fakes import install_fake_backends
+
+install_fake_backends()
+
+from app import app  # noqa: E402,F401
+
+logging.getLogger(__name__).warning("Textract and Document AI responses are simulated (benchmarks.fakes)")
@@ -0,0 +1,378 @@
+"""
+Local stand-ins for AWS Textract and Google Document AI.
+
+The fakes read the PDF's own text layer (PyMuPDF) and answer with payloads
+shaped like the real services: Textract PAGE/LINE/WORD/TABLE/CELL/
+KEY_VALUE_SET blocks, and a Document AI `Document` with per-page tables whose
+cells anchor into `document.text`. Payloads are cached per document, so under
+load the fakes cost latency (a sleep, which releases the GIL like a network
+call would) rather than CPU.
+
+Latency is lognormal around a median plus a per-page cost; errors and
+throttling are drawn at configurable rates. Everything is read from the
+environment each time a client is built:
+
+    FAKE_<BACKEND>_LATENCY_MS       median call latency (TEXTRACT default 1200, DOCAI 1500)
+    FAKE_<BACKEND>_PER_PAGE_MS      added per page (default 300 / 200)
+    FAKE_<BACKEND>_LATENCY_SIGMA    lognormal spread (default 0.35)
+    FAKE_<BACKEND>_ERROR_RATE       fraction of calls failing with a 5xx (default 0.01)
+    FAKE_<BACKEND>_THROTTLE_RATE    fraction of calls throttled (default 0.02)
+    FAKE_BACKEND_SEED               seed for reproducible latency/error draws
+
+Serve the app with them through benchmarks.fake_app (what load_test.py
+starts); the service itself never imports this module.
+"""
+
+import os
+import re
+import time
+import math
+import random
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+_KEY_VALUE_PATTERN = re.compile(r'^([A-Za-z][A-Za-z .#]{1,40}):$')
+
+
+@dataclass
+class FakeBackendConfig:
+    """Latency and failure model for one fake backend."""
+    latency_ms: float
+    per_page_ms: float
+    latency_sigma: float = 0.35
+    error_rate: float = 0.01
+    throttle_rate: float = 0.02
+
+    @classmethod
+    def from_env(cls, prefix: str, latency_ms: float, per_page_ms: float) -> 'FakeBackendConfig':
+        return cls(
+            latency_ms=float(os.getenv(f'{prefix}_LATENCY_MS', latency_ms)),
+            per_page_ms=float(os.getenv(f'{prefix}_PER_PAGE_MS', per_page_ms)),
+            latency_sigma=float(os.getenv(f'{prefix}_LATENCY_SIGMA', 0.35)),
+            error_rate=float(os.getenv(f'{prefix}_ERROR_RATE', 0.01)),
+            throttle_rate=float(os.getenv(f'{prefix}_THROTTLE_RATE', 0.02)),
+        )
+
+    def draw_latency_s(self, rng: random.Random, num_pages: int) -> float:
+        median = self.latency_ms + self.per_page_ms * max(0, num_pages - 1)
+        return median * math.exp(rng.gauss(0.0, self.latency_sigma)) / 1000.0
+
+    def draw_outcome(self, rng: random.Random) -> str:
+        """'ok', 'throttled' or 'error'."""
+        roll = rng.random()
+        if roll < self.throttle_rate:
+            return 'throttled'
+        if roll < self.throttle_rate + self.error_rate:
+            return 'error'
+        return 'ok'
+
+
+def _backend_rng() -> random.Random:
+    seed = os.getenv('FAKE_BACKEND_SEED')
+    return random.Random(int(seed)) if seed else random.Random()
+
+
+# ---------------------------------------------------------------------------
+# Layout extraction shared by both fakes
+# ---------------------------------------------------------------------------
+
+_layout_cache: 'OrderedDict[str, List[Dict[str, Any]]]' = OrderedDict()
+_layout_lock = threading.Lock()
+_LAYOUT_CACHE_SIZE = 32
+
+
+def _document_layout(pdf_bytes: bytes) -> List[Dict[str, Any]]:
+    """
+    Per page: size, lines of (text, bbox) words, and tables as rows of cells,
+    each cell a list of indexes into the page's flattened word list.
+    """
+    key = hashlib.sha256(pdf_bytes).hexdigest()
+    with _layout_lock:
+        if key in _layout_cache:
+            _layout_cache.move_to_end(key)
+            return _layout_cache[key]
+
+    pages = []
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+        for page in doc:
+            raw_words = page.get_text('words')
+            words = []
+            lines: Dict[tuple, List[int]] = {}
+            for x0, y0, x1, y1, text, block_no, line_no, _ in raw_words:
+                lines.setdefault((block_no, line_no), []).append(len(words))
+                words.append({'text': text, 'bbox': (x0, y0, x1, y1)})
+
+            pages.append({
+                'width': page.rect.width,
+                'height': page.rect.height,
+                'words': words,
+                'lines': list(lines.values()),
+                'tables': _page_tables(page, words),
+            })
+
+    with _layout_lock:
+        _layout_cache[key] = pages
+        while len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    return pages
+
+
+def _page_tables(page, words: List[Dict[str, Any]]) -> List[List[List[List[int]]]]:
+    """Ruled tables first; fall back to text alignment like the real services manage."""
+    try:
+        found = page.find_tables().tables or page.find_tables(strategy='text').tables
+    except Exception:
+        return []
+
+    tables = []
+    for table in found:
+        rows = []
+        for row in table.rows:
+            cells = []
+            for cell_bbox in row.cells:
+                if cell_bbox is None:
+                    cells.append([])
+                    continue
+                cx0, cy0, cx1, cy1 = cell_bbox
+                cells.append([
+                    index for index, word in enumerate(words)
+                    if cx0 <= (word['bbox'][0] + word['bbox'][2]) / 2 <= cx1
+                    and cy0 <= (word['bbox'][1] + word['bbox'][3]) / 2 <= cy1
+                ])
+            rows.append(cells)
+        if len(rows) >= 2:
+            tables.append(rows)
+    return tables
+
+
+# ---------------------------------------------------------------------------
+# Textract
+# ---------------------------------------------------------------------------
+
+def _textract_geometry(bbox, width: float, height: float) -> Dict[str, Any]:
+    x0, y0, x1, y1 = bbox
+    return {'BoundingBox': {
+        'Left': x0 / width, 'Top': y0 / height,
+        'Width': (x1 - x0) / width, 'Height': (y1 - y0) / height,
+    }}
+
+
+def _union_bbox(bboxes) -> tuple:
+    bboxes = list(bboxes)
+    if not bboxes:
+        return (0.0, 0.0, 0.0, 0.0)
+    return (min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+            max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+
+
+def build_textract_response(pdf_bytes: bytes, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+    """An `analyze_document(FeatureTypes=['TABLES', 'FORMS'])` response for the PDF."""
+    rng = rng or random.Random(0)
+    blocks: List[Dict[str, Any]] = []
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+
+    layout = _document_layout(pdf_bytes)
+    for page_number, page in enumerate(layout, start=1):
+        width, height = page['width'], page['height']
+        page_block = {'BlockType': 'PAGE', 'Id': new_id(), 'Page': page_number,
+                      'Geometry': _textract_geometry((0, 0, width, height), width, height),
+                      'Relationships': [{'Type': 'CHILD', 'Ids': []}]}
+        blocks.append(page_block)
+
+        word_ids = []
+        for word in page['words']:
+            word_ids.append(new_id())
+            blocks.append({'BlockType': 'WORD', 'Id': word_ids[-1], 'Page': page_number,
+                           'Text': word['text'], 'TextType': 'PRINTED',
+                           'Confidence': round(rng.uniform(92.0, 99.9), 3),
+                           'Geometry': _textract_geometry(word['bbox'], width, height)})
+
+        for line in page['lines']:
+            line_id = new_id()
+            page_block['Relationships'][0]['Ids'].append(line_id)
+            blocks.append({'BlockType': 'LINE', 'Id': line_id, 'Page': page_number,
+                           'Text': ' '.join(page['words'][i]['text'] for i in line),
+                           'Confidence': round(rng.uniform(92.0, 99.9), 3),
+                           'Geometry': _textract_geometry(
+                               _union_bbox(page['words'][i]['bbox'] for i in line), width, height),
+                           'Relationships': [{'Type': 'CHILD', 'Ids': [word_ids[i] for i in line]}]})
+
+            # "Label: value" lines become FORMS key/value pairs
+            for split, index in enumerate(line[:-1], start=1):
+                if _KEY_VALUE_PATTERN.match(' '.join(page['words'][i]['text'] for i in line[:split])):
+                    key_id, value_id = new_id(), new_id()
+                    blocks.append({'BlockType': 'KEY_VALUE_SET', 'Id': key_id, 'Page': page_number,
+                                   'EntityTypes': ['KEY'], 'Confidence': round(rng.uniform(85.0, 99.0), 3),
+                                   'Relationships': [
+                                       {'Type': 'VALUE', 'Ids': [value_id]},
+                                       {'Type': 'CHILD', 'Ids': [word_ids[i] for i in line[:split]]},
+                                   ]})
+                    blocks.append({'BlockType': 'KEY_VALUE_SET', 'Id': value_id, 'Page': page_number,
+                                   'EntityTypes': ['VALUE'], 'Confidence': round(rng.uniform(85.0, 99.0), 3),
+                                   'Relationships': [{'Type': 'CHILD', 'Ids': [word_ids[i] for i in line[split:]]}]})
+                    break
+
+        for table in page['tables']:
+            table_id = new_id()
+            cell_ids = []
+            for row_index, row in enumerate(table, start=1):
+                for column_index, cell in enumerate(row, start=1):
+                    cell_ids.append(new_id())
+                    blocks.append({'BlockType': 'CELL', 'Id': cell_ids[-1], 'Page': page_number,
+                                   'RowIndex': row_index, 'ColumnIndex': column_index,
+                                   'RowSpan': 1, 'ColumnSpan': 1,
+                                   'Confidence': round(rng.uniform(80.0, 99.0), 3),
+                                   'Relationships': [{'Type': 'CHILD', 'Ids': [word_ids[i] for i in cell]}]})
+            page_block['Relationships'][0]['Ids'].append(table_id)
+            blocks.append({'BlockType': 'TABLE', 'Id': table_id, 'Page': page_number,
+                           'Confidence': round(rng.uniform(85.0, 99.0), 3),
+                           'Relationships': [{'Type': 'CHILD', 'Ids': cell_ids}]})
+
+    return {
+        'DocumentMetadata': {'Pages': len(layout)},
+        'Blocks': blocks,
+        'AnalyzeDocumentModelVersion': '1.0',
+    }
+
+
+class FakeTextractClient:
+    """Drop-in for `boto3.client('textract')` covering `analyze_document`."""
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None):
+        self.config = config or FakeBackendConfig.from_env('FAKE_TEXTRACT', 1200, 300)
+        self.rng = _backend_rng()
+
+    def analyze_document(self, Document: Dict[str, Any], FeatureTypes: List[str], **kwargs) -> Dict[str, Any]:
+        from botocore.exceptions import ClientError
+
+        pdf_bytes = Document['Bytes']
+        response = build_textract_response(pdf_bytes, random.Random(len(pdf_bytes)))
+        time.sleep(self.config.draw_latency_s(self.rng, response['DocumentMetadata']['Pages']))
+
+        outcome = self.config.draw_outcome(self.rng)
+        if outcome == 'throttled':
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+                              'AnalyzeDocument')
+        if outcome == 'error':
+            raise ClientError({'Error': {'Code': 'InternalServerError', 'Message': 'Internal server error'}},
+                              'AnalyzeDocument')
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Document AI
+# ---------------------------------------------------------------------------
+
+def build_docai_document(pdf_bytes: bytes, rng: Optional[random.Random] = None):
+    """A Form Parser style `documentai.Document` for the PDF."""
+    from google.cloud import documentai_v1 as documentai
+
+    rng = rng or random.Random(0)
+    layout = _document_layout(pdf_bytes)
+    text_parts: List[str] = []
+    offset = 0
+    pages = []
+
+    def anchor(spans) -> 'documentai.Document.TextAnchor':
+        return documentai.Document.TextAnchor(text_segments=[
+            documentai.Document.TextAnchor.TextSegment(start_index=start, end_index=end)
+            for start, end in spans
+        ])
+
+    for page_number, page in enumerate(layout, start=1):
+        # Lay the page's words out as document text, remembering each word's span
+        spans = [None] * len(page['words'])
+        page_start = offset
+        doc_lines = []
+        for line in page['lines']:
+            line_start = offset
+            for position, index in enumerate(line):
+                if position:
+                    text_parts.append(' ')
+                    offset += 1
+                word_text = page['words'][index]['text']
+                spans[index] = (offset, offset + len(word_text))
+                text_parts.append(word_text)
+                offset += len(word_text)
+            text_parts.append('\n')
+            offset += 1
+            doc_lines.append(documentai.Document.Page.Line(layout=documentai.Document.Page.Layout(
+                text_anchor=anchor([(line_start, offset)]),
+                confidence=round(rng.uniform(0.9, 0.99), 3),
+            )))
+
+        tables = []
+        for table in page['tables']:
+            rows = [documentai.Document.Page.Table.TableRow(cells=[
+                documentai.Document.Page.Table.TableCell(
+                    layout=documentai.Document.Page.Layout(
+                        text_anchor=anchor([spans[i] for i in cell]),
+                        confidence=round(rng.uniform(0.8, 0.99), 3),
+                    ),
+                    row_span=1, col_span=1,
+                ) for cell in row
+            ]) for row in table]
+            tables.append(documentai.Document.Page.Table(header_rows=rows[:1], body_rows=rows[1:]))
+
+        pages.append(documentai.Document.Page(
+            page_number=page_number,
+            dimension=documentai.Document.Page.Dimension(width=page['width'], height=page['height'], unit='points'),
+            layout=documentai.Document.Page.Layout(
+                text_anchor=anchor([(page_start, offset)]),
+                confidence=round(rng.uniform(0.9, 0.99), 3),
+            ),
+            lines=doc_lines,
+            tables=tables,
+        ))
+
+    return documentai.Document(mime_type='application/pdf', text=''.join(text_parts), pages=pages)
+
+
+class FakeDocAIClient:
+    """Drop-in for `DocumentProcessorServiceClient` covering `process_document`."""
+
+    def __init__(self, config: Optional[FakeBackendConfig] = None):
+        self.config = config or FakeBackendConfig.from_env('FAKE_DOCAI', 1500, 200)
+        self.rng = _backend_rng()
+
+    def processor_path(self, project: Optional[str], location: str, processor: Optional[str]) -> str:
+        return f"projects/{project or 'fake-project'}/locations/{location}/processors/{processor or 'fake-processor'}"
+
+    def process_document(self, request=None, **kwargs):
+        from google.api_core import exceptions
+        from google.cloud import documentai_v1 as documentai
+
+        pdf_bytes = request.raw_document.content
+        document = build_docai_document(pdf_bytes, random.Random(len(pdf_bytes)))
+        time.sleep(self.config.draw_latency_s(self.rng, len(document.pages)))
+
+        outcome = self.config.draw_outcome(self.rng)
+        if outcome == 'throttled':
+            raise exceptions.ResourceExhausted('Quota exceeded for online processing requests')
+        if outcome == 'error':
+            raise exceptions.ServiceUnavailable('The service is currently unavailable')
+        return documentai.ProcessResponse(document=document)
+
+
+def install_fake_backends():
+    """Make every TextractParser / DocAIParser built from now on use the fakes."""
+    from parsers.registry import get_parser_class, is_enabled
+
+    def create_textract_client(parser):
+        return FakeTextractClient()
+
+    def create_docai_client(parser):
+        return FakeDocAIClient()
+
+    if is_enabled('textract'):
+        get_parser_class('textract')._create_client = create_textract_client
+    if is_enabled('docai'):
+        get_parser_class('docai')._create_client = create_docai_client
@@ -0,0 +1,250 @@
+"""
+End-to-end load test for /parse/ensemble.
+
+For each gunicorn configuration (WORKERSxTHREADS) a server is started on
+benchmarks.fake_app, so Textract and Document AI answer from the local
+fakes in benchmarks/fakes.py with realistic latency and error rates. Closed-loop
+clients then post corpus documents at each concurrency level and the run
+reports throughput, p50/p95/p99 latency and error rates.
+
+Usage (from python-pdf-service/):
+    python -m benchmarks.load_test --configs 2x1,4x1,2x4 --concurrency 1,4,8 --duration 30
+    python -m benchmarks.load_test --url http://localhost:5000 --concurrency 8   # existing server
+
+Fake backend behaviour is tuned with the FAKE_* variables documented in
+benchmarks/fakes.py (they are passed through to the servers started here).
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from .corpus import SMALL_CORPUS
+from .run_benchmarks import _git_commit, _percentile, ensure_corpus
+
+SCHEMA_VERSION = 1
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PARSERS = 'pdfplumber,pymupdf,textract,docai'
+API_KEY = os.getenv('API_KEY', 'dev-key-change-in-production')
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _parse_config(config: str) -> Tuple[int, int]:
+    workers, _, threads = config.partition('x')
+    return int(workers), int(threads or 1)
+
+
+def start_server(config: str, timeout_s: float = 60.0) -> Tuple[subprocess.Popen, str]:
+    """Start gunicorn with fake cloud backends and wait until /health answers."""
+    workers, threads = _parse_config(config)
+    port = _free_port()
+    env = {
+        **os.environ,
+        'API_KEY': API_KEY,
+        'PROMETHEUS_MULTIPROC_DIR': tempfile.mkdtemp(prefix='pdf-parser-loadtest-metrics-'),
+    }
+    process = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--threads', str(threads), '--timeout', '300', 'benchmarks.fake_app:app'],
+        cwd=SERVICE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            if requests.get(f'{url}/health', timeout=2).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+
+    stop_server(process)
+    raise RuntimeError(f'gunicorn did not become healthy within {timeout_s:.0f}s')
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _post_ensemble(session: requests.Session, url: str, document: Tuple[str, bytes],
+                   parsers: str) -> Dict[str, Any]:
+    filename, pdf_bytes = document
+    start = time.perf_counter()
+    try:
+        response = session.post(
+            f'{url}/parse/ensemble',
+            headers={'X-API-Key': API_KEY},
+            files={'file': (filename, pdf_bytes, 'application/pdf')},
+            data={'parsers': parsers},
+            timeout=600,
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+    except requests.RequestException as e:
+        return {'latency_ms': (time.perf_counter() - start) * 1000, 'status': 0,
+                'error': type(e).__name__, 'parser_failures': []}
+
+    parser_failures = []
+    if response.status_code == 200:
+        for parser_result in response.json().get('all_results', []):
+            if not parser_result.get('success'):
+                parser_failures.append(parser_result.get('parser_name', 'unknown'))
+
+    return {'latency_ms': latency_ms, 'status': response.status_code,
+            'error': None if response.status_code == 200 else f'HTTP {response.status_code}',
+            'parser_failures': parser_failures}
+
+
+def run_level(url: str, documents: List[Tuple[str, bytes]], parsers: str, concurrency: int,
+              duration_s: float, warmup: int) -> Dict[str, Any]:
+    """Drive `concurrency` closed-loop clients for `duration_s` seconds."""
+    samples: List[Dict[str, Any]] = []
+    samples_lock = threading.Lock()
+    next_document = iter(range(sys.maxsize))
+    deadline = [0.0]
+
+    def client():
+        with requests.Session() as session:
+            while time.perf_counter() < deadline[0]:
+                with samples_lock:
+                    document = documents[next(next_document) % len(documents)]
+                sample = _post_ensemble(session, url, document, parsers)
+                with samples_lock:
+                    samples.append(sample)
+
+    # Warm each worker's imports and caches before measuring
+    with requests.Session() as session:
+        for i in range(warmup):
+            _post_ensemble(session, url, documents[i % len(documents)], parsers)
+
+    start = time.perf_counter()
+    deadline[0] = start + duration_s
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed_s = time.perf_counter() - start
+
+    latencies = [s['latency_ms'] for s in samples] or [0.0]
+    errors = Counter(s['error'] for s in samples if s['error'])
+    parser_failures = Counter(name for s in samples for name in s['parser_failures'])
+    completed = len(samples)
+
+    return {
+        'concurrency': concurrency,
+        'requests': completed,
+        'elapsed_s': round(elapsed_s, 2),
+        'throughput_rps': round(completed / elapsed_s, 3) if elapsed_s else 0.0,
+        'p50_ms': round(_percentile(latencies, 50), 1),
+        'p95_ms': round(_percentile(latencies, 95), 1),
+        'p99_ms': round(_percentile(latencies, 99), 1),
+        'error_rate': round(sum(errors.values()) / completed, 4) if completed else 0.0,
+        'errors': dict(errors),
+        'parser_failure_rates': {
+            name: round(count / completed, 4) for name, count in sorted(parser_failures.items())
+        },
+    }
+
+
+def _print_level(config: str, level: Dict[str, Any]):
+    failures = ', '.join(f'{k} {v:.0%}' for k, v in level['parser_failure_rates'].items()) or '-'
+    print(f"  {config:<8} c={level['concurrency']:<4} {level['requests']:>6} req  "
+          f"{level['throughput_rps']:>7.2f} req/s  p50 {level['p50_ms']:>8.0f}  "
+          f"p95 {level['p95_ms']:>8.0f}  p99 {level['p99_ms']:>8.0f} ms  "
+          f"errors {level['error_rate']:.1%}  parser failures: {failures}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test /parse/ensemble with fake cloud backends')
+    parser.add_argument('--configs', default='2x1,4x1,2x4',
+                        help='Comma-separated gunicorn WORKERSxTHREADS configurations to start')
+    parser.add_argument('--url', default='', help='Test an already running server instead of starting gunicorn')
+    parser.add_argument('--concurrency', default='1,4,8', help='Comma-separated client concurrency levels')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per concurrency level')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests before each level')
+    parser.add_argument('--parsers', default=DEFAULT_PARSERS)
+    parser.add_argument('--documents', default='', help='Comma-separated corpus document names (default: small corpus)')
+    parser.add_argument('--corpus-dir', default=os.path.join('benchmarks', '.corpus'))
+    parser.add_argument('--out', default='load_test_results.json')
+    args = parser.parse_args(argv)
+
+    specs = SMALL_CORPUS
+    if args.documents:
+        wanted = {name.strip() for name in args.documents.split(',')}
+        specs = [spec for spec in specs if spec.name in wanted]
+    paths = ensure_corpus(args.corpus_dir, specs)
+    documents = []
+    for spec in specs:
+        with open(paths[spec.name], 'rb') as f:
+            documents.append((os.path.basename(paths[spec.name]), f.read()))
+
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    configs = ['external'] if args.url else [c.strip() for c in args.configs.split(',') if c.strip()]
+
+    print(f'Load testing /parse/ensemble ({args.parsers}) with {len(documents)} documents, '
+          f'{args.duration:.0f}s per level')
+    runs = []
+    for config in configs:
+        process: Optional[subprocess.Popen] = None
+        try:
+            if args.url:
+                url = args.url.rstrip('/')
+            else:
+                process, url = start_server(config)
+            for concurrency in levels:
+                level = run_level(url, documents, args.parsers, concurrency, args.duration, args.warmup)
+                _print_level(config, level)
+                runs.append({'config': config, **level})
+        except RuntimeError as e:
+            print(f'  {config:<8} failed to start: {e}')
+            runs.append({'config': config, 'error': str(e)})
+        finally:
+            if process is not None:
+                stop_server(process)
+
+    report = {
+        'schema_version': SCHEMA_VERSION,
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'parsers': args.parsers,
+            'duration_s': args.duration,
+            'fake_backend_env': {k: v for k, v in os.environ.items() if k.startswith('FAKE_')},
+        },
+        'runs': runs,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Per-parser and per-mode benchmark runner.
+
+Each (target, document) measurement runs in a fresh process so peak RSS is
+attributable to that parser alone. Results are written as JSON that
+`benchmarks.compare` can diff between runs.
+
+Usage (from python-pdf-service/):
+    python -m benchmarks.run_benchmarks --out bench.json
+    python -m benchmarks.run_benchmarks --corpus small --targets pdfplumber,pymupdf,chunked --repeat 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from .corpus import CORPUS, SMALL_CORPUS, QuoteSpec, generate_quote
+
+SCHEMA_VERSION = 1
+
+PARSER_TARGETS = ['pdfplumber', 'pymupdf', 'ocr', 'textract', 'docai', 'unstructured']
+MODE_TARGETS = ['ensemble', 'auto', 'chunked']
+LOCAL_ENSEMBLE = ['pdfplumber', 'pymupdf', 'ocr']
+
+
+def _peak_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def _run_target(coordinator, target: str, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
+    """Run one target once and return its (ensemble or parser) result."""
+    if target == 'ensemble':
+        return coordinator.parse_with_ensemble(pdf_bytes, filename, LOCAL_ENSEMBLE)
+    if target == 'auto':
+        return coordinator.parse_with_auto_selection(pdf_bytes, filename)
+    if target == 'chunked':
+        return coordinator.parse_chunked(pdf_bytes, filename)
+    if target == 'unstructured':
+        return coordinator._parse_with_unstructured_wrapper(pdf_bytes, filename)
+    return coordinator.parsers[target].parse(pdf_bytes, filename)
+
+
+def _summarise(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Pull success / item count out of a parser, auto or ensemble result."""
+    if 'best_result' in result:
+        best = result['best_result']
+        return {'success': bool(best.get('success')), 'items': len(result.get('consensus_items', [])),
+                'errors': best.get('errors', [])}
+    if 'selected_parser' in result:
+        result = result['result']
+    return {'success': bool(result.get('success')), 'items': len(result.get('items', [])),
+            'errors': result.get('errors', [])}
+
+
+def measure(target: str, pdf_path: str, repeat: int) -> Dict[str, Any]:
+    """Child-process entry point: time `repeat` warm runs after one cold run."""
+    from parsers.ensemble_coordinator import EnsembleCoordinator
+    from parsers.executors import shutdown_executors
+
+    with open(pdf_path, 'rb') as f:
+        pdf_bytes = f.read()
+    filename = os.path.basename(pdf_path)
+
+    coordinator = EnsembleCoordinator()
+    baseline_rss_mb = _peak_rss_mb()
+
+    start = time.perf_counter()
+    result = _run_target(coordinator, target, pdf_bytes, filename)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = _run_target(coordinator, target, pdf_bytes, filename)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    # Child pools must be stopped or this worker process cannot exit
+    shutdown_executors()
+
+    return {
+        'cold_ms': round(cold_ms, 2),
+        'latencies_ms': [round(l, 2) for l in latencies],
+        'baseline_rss_mb': round(baseline_rss_mb, 1),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        **_summarise(result),
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def ensure_corpus(corpus_dir: str, specs: List[QuoteSpec]) -> Dict[str, str]:
+    """Generate missing corpus files (generation is slow for the 200-page document)."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = {}
+    for spec in specs:
+        path = os.path.join(corpus_dir, f'{spec.name}-s{spec.seed}.pdf')
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(generate_quote(spec))
+        paths[spec.name] = path
+    return paths
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return ''
+
+
+def run(targets: List[str], specs: List[QuoteSpec], repeat: int, corpus_dir: str) -> Dict[str, Any]:
+    paths = ensure_corpus(corpus_dir, specs)
+    results = []
+
+    # One fresh process per measurement keeps peak RSS per target honest
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+        for spec in specs:
+            for target in targets:
+                print(f'  {target:<13} {spec.name:<18}', end='', flush=True)
+                try:
+                    measurement = executor.submit(measure, target, paths[spec.name], repeat).result()
+                except Exception as e:
+                    measurement = {'success': False, 'errors': [str(e)], 'latencies_ms': []}
+
+                latencies = measurement.get('latencies_ms') or [measurement.get('cold_ms', 0.0)]
+                median_ms = statistics.median(latencies)
+                entry = {
+                    'target': target,
+                    'document': spec.name,
+                    'pages': spec.total_pages,
+                    'scanned': spec.scanned,
+                    'ruled': spec.ruled,
+                    'median_ms': round(median_ms, 2),
+                    'p95_ms': round(_percentile(latencies, 95), 2),
+                    'pages_per_s': round(spec.total_pages / (median_ms / 1000.0), 2) if median_ms else 0.0,
+                    **measurement,
+                }
+                results.append(entry)
+                status = 'ok' if entry.get('success') else 'FAILED'
+                print(f'{median_ms:>10.1f} ms  {entry["pages_per_s"]:>8.1f} p/s  '
+                      f'{entry.get("peak_rss_mb", 0):>7.1f} MB  {status}')
+
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark PDF parsers on a synthetic quote corpus')
+    parser.add_argument('--targets', default=','.join(PARSER_TARGETS + MODE_TARGETS),
+                        help='Comma-separated parsers and/or modes (ensemble, auto, chunked)')
+    parser.add_argument('--corpus', choices=['small', 'full'], default='full')
+    parser.add_argument('--documents', default='', help='Comma-separated document names to restrict to')
+    parser.add_argument('--repeat', type=int, default=3, help='Warm runs per measurement')
+    parser.add_argument('--corpus-dir', default=os.path.join('benchmarks', '.corpus'))
+    parser.add_argument('--out', default='benchmark_results.json')
+    args = parser.parse_args(argv)
+
+    specs = SMALL_CORPUS if args.corpus == 'small' else CORPUS
+    if args.documents:
+        wanted = {name.strip() for name in args.documents.split(',')}
+        specs = [spec for spec in specs if spec.name in wanted]
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+
+    print(f'Benchmarking {len(targets)} targets x {len(specs)} documents (repeat={args.repeat})')
+    report = run(targets, specs, args.repeat, args.corpus_dir)
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Startup-time benchmark for the service entry points.
+
+Imports the entry point (`app` or `asgi`) in fresh interpreters under
+`python -X importtime` and reports wall time, peak RSS and the slowest
+imports by cumulative time. This is what a gunicorn worker pays on boot and
+on every --max-requests recycle.
+
+Usage (from python-pdf-service/):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --entry asgi --repeat 5 --top 20
+    ENABLED_PARSERS=pdfplumber,pymupdf python -m benchmarks.startup
+    python -m benchmarks.startup --first-parse     # include one parse per enabled parser
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: import the entry point, optionally parse once per parser,
+# then print timings as the last stdout line.
+_CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import {entry}
+import_ms = (time.perf_counter() - start) * 1000
+first_parse_ms = {{}}
+if {first_parse}:
+    from benchmarks.corpus import QuoteSpec, generate_quote
+    from parsers.ensemble_coordinator import EnsembleCoordinator
+    pdf_bytes = generate_quote(QuoteSpec('startup', 1, seed=1))
+    coordinator = EnsembleCoordinator()
+    for name in coordinator.parsers:
+        t = time.perf_counter()
+        coordinator.parsers[name].parse(pdf_bytes, 'startup.pdf')
+        first_parse_ms[name] = round((time.perf_counter() - t) * 1000, 1)
+max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+print(json.dumps({{'import_ms': import_ms, 'peak_rss_mb': rss_mb, 'first_parse_ms': first_parse_ms}}))
+'''
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` lines into {'module', 'self_us', 'cumulative_us', 'depth'}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append({
+                'module': name.strip(),
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                # importtime indents nested imports by two spaces per level
+                'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            })
+        except ValueError:
+            continue
+    return rows
+
+
+def measure_once(entry: str, first_parse: bool) -> Dict[str, Any]:
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD.format(entry=entry, first_parse=first_parse)],
+        cwd=SERVICE_DIR, capture_output=True, text=True, timeout=600,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr else 'import failed')
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(process.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure service import time and memory')
+    parser.add_argument('--entry', choices=['app', 'asgi'], default='app')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters to average over')
+    parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+    parser.add_argument('--first-parse', action='store_true',
+                        help='Also time the first parse of a one-page quote with every enabled parser')
+    parser.add_argument('--out', default='', help='Optional JSON output path')
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.entry, args.first_parse) for _ in range(args.repeat)]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    peak_rss_mb = statistics.median(run['peak_rss_mb'] for run in runs)
+
+    # Slowest imports from the last run, keeping only direct imports of the entry point
+    # and its first level so the list reads as "what does booting pull in"
+    imports = [row for row in runs[-1]['imports'] if row['depth'] <= 1]
+    slowest = sorted(imports, key=lambda row: row['cumulative_us'], reverse=True)[:args.top]
+
+    print(f"import {args.entry}: {import_ms:.0f} ms median over {args.repeat} runs, "
+          f"peak RSS {peak_rss_mb:.0f} MB (ENABLED_PARSERS={os.getenv('ENABLED_PARSERS', 'all')})")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in slowest:
+        print(f"{row['cumulative_us'] / 1000:>14.1f} {row['self_us'] / 1000:>9.1f}  {'  ' * row['depth']}{row['module']}")
+
+    if args.first_parse:
+        print('first parse:')
+        for name, ms in runs[-1]['first_parse_ms'].items():
+            print(f'  {name:<12} {ms:>8.1f} ms')
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({
+                'entry': args.entry,
+                'enabled_parsers': os.getenv('ENABLED_PARSERS', 'all'),
+                'import_ms': round(import_ms, 1),
+                'peak_rss_mb': round(peak_rss_mb, 1),
+                'runs': [{k: v for k, v in run.items() if k != 'imports'} for run in runs],
+                'slowest_imports': slowest,
+            }, f, indent=2)
+        print(f'Results written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Table normalisation benchmark.
+
+Times `parsers.table_normalize.normalize_rows` against the per-row loop the
+parsers used before (`_get_cell_value` + `_parse_number` with a re.sub per
+cell) on generated line-item tables: currency symbols, thousands
+separators, blank and caption rows, split across tables of TABLE_ROWS rows
+as a long multi-page quote would be. Both paths must agree on clean tables;
+with --ocr-noise some figures carry OCR digit confusions (O for 0, l for 1)
+that only the vectorised path recovers (read as OCR text, `ocr_digits`).
+
+Usage (from python-pdf-service/):
+    python -m benchmarks.tables
+    python -m benchmarks.tables --rows 10000,50000,200000 --repeat 5 --out tables.json
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import statistics
+from functools import partial
+from typing import Any, Dict, List
+
+from parsers.table_normalize import frame_items, header_tables, match_header, normalize_rows
+
+HEADER = ['Item', 'Description', 'Qty', 'Unit', 'Unit Price', 'Total']
+UNITS = ['ea', 'm', 'm2', 'lm', 'hr']
+# Rows per table (a generated table per "page")
+TABLE_ROWS = 40
+
+
+def generate_tables(rows: int, seed: int = 1, ocr_noise: float = 0.0) -> List[List[List[Any]]]:
+    """`rows` data rows split into tables of TABLE_ROWS, each with a header row."""
+    rng = random.Random(seed)
+    data = []
+    for index in range(rows):
+        if rng.random() < 0.03:
+            data.append(['', 'Section subtotal carried forward', '', '', '', ''])
+            continue
+        if rng.random() < 0.02:
+            data.append([None, None, None, None, None, None])
+            continue
+        qty = rng.randint(1, 500)
+        rate = round(rng.uniform(2, 2500), 2)
+        total = f'{qty * rate:,.2f}'
+        if rng.random() < ocr_noise:
+            total = total.replace('0', 'O').replace('1', 'l')
+        data.append([
+            str(index + 1),
+            f'Fire collar {rng.choice([50, 65, 100, 150])}mm to GIB wall',
+            str(qty),
+            rng.choice(UNITS),
+            f'${rate:,.2f}',
+            total,
+        ])
+    return [[HEADER] + data[start:start + TABLE_ROWS] for start in range(0, len(data), TABLE_ROWS)]
+
+
+def row_loop(tables: List[List[List[Any]]]) -> List[Dict[str, Any]]:
+    """The per-row, per-cell extraction the parsers used before table_normalize."""
+    def cell(row, index):
+        if index < 0 or index >= len(row):
+            return ''
+        return str(row[index]).strip() if row[index] is not None else ''
+
+    def number(value):
+        if not value:
+            return 0.0
+        try:
+            return float(re.sub(r'[,$£€\s]', '', value))
+        except ValueError:
+            return 0.0
+
+    items = []
+    for rows in tables:
+        if len(rows) < 2:
+            continue
+        columns = match_header(rows[0])
+        desc, qty, unit, rate, total = (columns.get(field, -1) for field in (
+            'description', 'quantity', 'unit', 'unit_price', 'total_price'
+        ))
+        for row_idx, row in enumerate(rows[1:]):
+            if not row or all(value is None or str(value).strip() == '' for value in row):
+                continue
+            item = {
+                'line_number': row_idx + 1,
+                'description': cell(row, desc),
+                'quantity': number(cell(row, qty)),
+                'unit': cell(row, unit),
+                'unit_price': number(cell(row, rate)),
+                'total_price': number(cell(row, total)),
+            }
+            if item['description'] and (item['quantity'] or item['unit_price'] or item['total_price']):
+                items.append(item)
+    return items
+
+
+def vectorised(tables: List[List[List[Any]]], ocr_digits: bool = False) -> List[Dict[str, Any]]:
+    return frame_items(normalize_rows(header_tables(tables), line_numbers='row', ocr_digits=ocr_digits))
+
+
+def measure(rows: int, repeat: int, ocr_noise: float) -> Dict[str, Any]:
+    tables = generate_tables(rows, ocr_noise=ocr_noise)
+    result = {'rows': rows, 'tables': len(tables)}
+    outputs = {}
+    for name, extract in (('row_loop', row_loop), ('vectorised', partial(vectorised, ocr_digits=ocr_noise > 0))):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = extract(tables)
+            times.append((time.perf_counter() - start) * 1000)
+        result[name] = {
+            'median_ms': round(statistics.median(times), 1),
+            'rows_per_s': int(rows / (statistics.median(times) / 1000)),
+            'items': len(outputs[name]),
+            'total': round(sum(item['total_price'] for item in outputs[name]), 2),
+        }
+    result['speedup'] = round(result['row_loop']['median_ms'] / result['vectorised']['median_ms'], 2)
+    result['same_items'] = outputs['row_loop'] == outputs['vectorised']
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark table-to-line-item normalisation')
+    parser.add_argument('--rows', default='10000,50000,200000', help='Comma-separated data row counts')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--ocr-noise', type=float, default=0.0,
+                        help='Share of totals with OCR digit confusions')
+    parser.add_argument('--out', default='', help='Optional JSON output path')
+    args = parser.parse_args(argv)
+
+    normalize_rows([])  # pay the pandas import outside the timings
+    results = [measure(int(rows), args.repeat, args.ocr_noise) for rows in args.rows.split(',')]
+
+    print(f"{'rows':>8} {'row loop ms':>12} {'vectorised ms':>14} {'speedup':>8}  items (loop / vectorised)  same")
+    for result in results:
+        print(f"{result['rows']:>8} {result['row_loop']['median_ms']:>12.1f} "
+              f"{result['vectorised']['median_ms']:>14.1f} {result['speedup']:>7.2f}x  "
+              f"{result['row_loop']['items']:>10} / {result['vectorised']['items']:<10}    {result['same_items']}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'ocr_noise': args.ocr_noise, 'results': results}, f, indent=2)
+        print(f'Results written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from parsers.pages import count_pages
+from parsers.store_dir import StoreDirectory
+import metrics
+
+_DOCUMENT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class DocumentStore:
+    """
+    Keeps uploaded PDFs so chunked parsing jobs can refer to them by handle
+    instead of re-uploading the whole file for every page range.
+
+    Documents are written to a directory shared by all gunicorn workers on the
+    host, with a small in-process LRU cache in front so repeat chunk requests
+    on the same worker don't touch the disk.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_cached: Optional[int] = None
+    ):
+        self.directory = directory or os.getenv(
+            'DOCUMENT_STORE_DIR',
+            os.path.join(tempfile.gettempdir(), 'pdf-parser-documents')
+        )
+        self.ttl_seconds = ttl_seconds or int(os.getenv('DOCUMENT_TTL_SECONDS', 3600))
+        self.max_cached = max_cached or int(os.getenv('DOCUMENT_CACHE_SIZE', 16))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Swept on every upload: documents live minutes, not days
+        self._files = StoreDirectory(self.directory, self.ttl_seconds, prune_interval=0)
+
+    def put(self, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
+        """Store a PDF and return its handle. Identical uploads share a handle."""
+        self._prune()
+
+        document_id = hashlib.sha256(pdf_bytes).hexdigest()[:32]
+        num_pages = count_pages(pdf_bytes)
+        meta = {'file_name': filename, 'num_pages': num_pages, 'size_bytes': len(pdf_bytes)}
+
+        pdf_path, meta_path = self._paths(document_id)
+        if not os.path.exists(pdf_path):
+            self._files.write(pdf_path, pdf_bytes)
+        self._files.write(meta_path, json.dumps(meta).encode('utf-8'))
+
+        self._remember(document_id, {**meta, 'pdf_bytes': pdf_bytes})
+
+        return {
+            'document_id': document_id,
+            **meta,
+            'expires_in': self.ttl_seconds,
+        }
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Return {'pdf_bytes', 'file_name', 'num_pages', 'size_bytes'} for a handle, or None."""
+        if not _DOCUMENT_ID_PATTERN.match(document_id or ''):
+            return None
+
+        with self._lock:
+            entry = self._cache.get(document_id)
+            if entry is not None:
+                self._cache.move_to_end(document_id)
+        metrics.record_cache_lookup('documents', entry is not None)
+
+        pdf_path, meta_path = self._paths(document_id)
+        if entry is not None:
+            # Refresh the TTL so an in-progress chunked job keeps its document
+            self._touch(pdf_path, meta_path)
+            return entry
+
+        try:
+            with open(meta_path, 'rb') as f:
+                meta = json.loads(f.read())
+            with open(pdf_path, 'rb') as f:
+                pdf_bytes = f.read()
+        except (OSError, ValueError):
+            return None
+
+        self._touch(pdf_path, meta_path)
+        entry = {**meta, 'pdf_bytes': pdf_bytes}
+        self._remember(document_id, entry)
+        return entry
+
+    def delete(self, document_id: str) -> bool:
+        """Remove a stored document. Returns False if it did not exist."""
+        if not _DOCUMENT_ID_PATTERN.match(document_id or ''):
+            return False
+
+        with self._lock:
+            self._cache.pop(document_id, None)
+
+        removed = False
+        for path in self._paths(document_id):
+            try:
+                os.unlink(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _paths(self, document_id: str):
+        return (
+            os.path.join(self.directory, f'{document_id}.pdf'),
+            os.path.join(self.directory, f'{document_id}.json'),
+        )
+
+    def _remember(self, document_id: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._cache[document_id] = entry
+            self._cache.move_to_end(document_id)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def _touch(self, *paths):
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def _prune(self):
+        """Delete documents not used within the TTL."""
+        kept = self._files.prune()
+        if kept is None:
+            return
+        with self._lock:
+            for document_id in [d for d in self._cache if f'{d}.pdf' not in kept]:
+                del self._cache[document_id]
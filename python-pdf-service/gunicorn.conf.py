@@ -0,0 +1,71 @@
+"""
+Gunicorn settings shared by the Dockerfile and render.yaml start commands.
+Gunicorn loads ./gunicorn.conf.py automatically; command-line flags still
+override anything set here.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Each worker writes its Prometheus samples here so /metrics can aggregate
+# across workers. Must be set before the app (and prometheus_client) is imported.
+os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'pdf-parser-metrics')
+)
+
+# Start every deploy with an empty metrics directory. This has to happen
+# here rather than in on_starting: with preload_app the master imports the
+# app (creating metric files) before on_starting runs. The marker keeps a
+# config reload (SIGHUP) from wiping files live workers still write to.
+if not os.environ.get('PDF_PARSER_METRICS_DIR_READY'):
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+    os.environ['PDF_PARSER_METRICS_DIR_READY'] = '1'
+
+# GUNICORN_PRELOAD=true imports the app in the master before forking; with
+# WARMUP=true the master also warms every parser (see warmup.py) so workers
+# start warm and share those pages copy-on-write.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+
+def when_ready(server):
+    """Preload mode: warm up once in the master, before any worker is forked."""
+    if not preload_app:
+        return
+    import warmup
+    if warmup.warmup_enabled():
+        warmup.warm_up()
+        # Keep the garbage collector from writing to (and so un-sharing) the warmed objects
+        import gc
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    """
+    Without preload, each worker warms itself before accepting connections.
+    Process pools don't survive fork, so even with preload they start here.
+    """
+    import warmup
+    if warmup.warmup_enabled():
+        warmup.warm_up()
+        warmup.start_worker_pools()
+
+
+def child_exit(server, worker):
+    """Drop live gauges for workers that exit (including --max-requests recycling)."""
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
+
+
+def worker_exit(server, worker):
+    """Stop the parser thread/process pools so recycled workers exit cleanly."""
+    try:
+        from parsers.executors import shutdown_executors
+        shutdown_executors()
+    except ImportError:
+        pass
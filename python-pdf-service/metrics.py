@@ -0,0 +1,206 @@
+"""
+Prometheus metrics for the parser service.
+
+Under gunicorn each worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(set up by gunicorn.conf.py) and /metrics aggregates every worker's files,
+so counters and histograms are correct whichever worker serves the scrape.
+Without that variable (e.g. `python app.py`) a normal in-process registry
+is used.
+"""
+
+import os
+import time
+import logging
+from typing import AsyncIterator, Dict, Any, Iterator, Tuple
+
+try:
+    from prometheus_client import (
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        generate_latest,
+        multiprocess,
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    logging.warning("prometheus_client not available - install with: pip install prometheus-client")
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+# Page-count label values, so latency can be compared for similar-sized documents
+PAGE_BUCKETS = ((1, '1'), (5, '2-5'), (20, '6-20'), (50, '21-50'))
+
+
+def page_bucket(num_pages: int) -> str:
+    """Map a page count to its label value."""
+    if not num_pages:
+        return 'unknown'
+    for limit, label in PAGE_BUCKETS:
+        if num_pages <= limit:
+            return label
+    return '51+'
+
+
+if PROMETHEUS_AVAILABLE:
+    REQUESTS = Counter(
+        'pdf_parser_requests_total',
+        'HTTP requests handled',
+        ['endpoint', 'method', 'status']
+    )
+    REQUEST_LATENCY = Histogram(
+        'pdf_parser_request_duration_seconds',
+        'HTTP request latency',
+        ['endpoint'],
+        buckets=LATENCY_BUCKETS
+    )
+    REQUESTS_IN_PROGRESS = Gauge(
+        'pdf_parser_requests_in_progress',
+        'HTTP requests currently being handled',
+        multiprocess_mode='livesum'
+    )
+    PARSER_LATENCY = Histogram(
+        'pdf_parser_parse_duration_seconds',
+        'Time spent in a single parser run',
+        ['parser', 'pages'],
+        buckets=LATENCY_BUCKETS
+    )
+    PARSER_RESULTS = Counter(
+        'pdf_parser_parser_results_total',
+        'Parser runs by outcome',
+        ['parser', 'outcome']
+    )
+    EXECUTOR_QUEUED = Gauge(
+        'pdf_parser_executor_queue_depth',
+        'Parser tasks waiting for a thread in the shared executor',
+        multiprocess_mode='livesum'
+    )
+    EXECUTOR_RUNNING = Gauge(
+        'pdf_parser_inflight_parses',
+        'Parser tasks currently running',
+        multiprocess_mode='livesum'
+    )
+    CACHE_LOOKUPS = Counter(
+        'pdf_parser_cache_lookups_total',
+        'Cache lookups by cache and result (hit/miss)',
+        ['cache', 'result']
+    )
+    PROCESS_RSS = Gauge(
+        'pdf_parser_process_resident_memory_bytes',
+        'Resident memory of each worker process',
+        multiprocess_mode='liveall'
+    )
+
+
+def observe_request(endpoint: str, method: str, status: int, duration_s: float):
+    """Record one finished HTTP request."""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    REQUESTS.labels(endpoint=endpoint, method=method, status=str(status)).inc()
+    REQUEST_LATENCY.labels(endpoint=endpoint).observe(duration_s)
+    update_process_rss()
+
+
+def observe_stream(chunks: Iterator, endpoint: str, method: str, start: float) -> Iterator:
+    """
+    Pass a streamed body through, counting the request as in progress until
+    the stream ends and recording its latency then. The request hooks finish
+    before a streamed body is sent, so they leave such requests to this.
+    """
+    track_request_started()
+    try:
+        yield from chunks
+    finally:
+        track_request_finished()
+        observe_request(endpoint, method, 200, time.time() - start)
+
+
+async def observe_async_stream(chunks: AsyncIterator, endpoint: str, method: str, start: float) -> AsyncIterator:
+    """Async counterpart of observe_stream."""
+    track_request_started()
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        track_request_finished()
+        observe_request(endpoint, method, 200, time.time() - start)
+
+
+def track_request_started():
+    if PROMETHEUS_AVAILABLE:
+        REQUESTS_IN_PROGRESS.inc()
+
+
+def track_request_finished():
+    if PROMETHEUS_AVAILABLE:
+        REQUESTS_IN_PROGRESS.dec()
+
+
+def observe_parser_result(result: Dict[str, Any]):
+    """Record latency and outcome for one parser result dict."""
+    if not PROMETHEUS_AVAILABLE or not isinstance(result, dict):
+        return
+
+    parser = result.get('parser_name', 'unknown')
+    num_pages = (result.get('metadata') or {}).get('num_pages', 0)
+    outcome = 'success' if result.get('success') else 'failure'
+
+    PARSER_RESULTS.labels(parser=parser, outcome=outcome).inc()
+    PARSER_LATENCY.labels(parser=parser, pages=page_bucket(num_pages)).observe(
+        result.get('extraction_time_ms', 0) / 1000.0
+    )
+
+
+def observe_ensemble_result(result: Dict[str, Any]):
+    """Record every parser result inside an ensemble response."""
+    for parser_result in result.get('all_results', []):
+        observe_parser_result(parser_result)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    if PROMETHEUS_AVAILABLE:
+        CACHE_LOOKUPS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def record_executor_stats(queued: int, running: int):
+    """Listener for the shared parser executor's queue/running counts."""
+    if PROMETHEUS_AVAILABLE:
+        EXECUTOR_QUEUED.set(queued)
+        EXECUTOR_RUNNING.set(running)
+
+
+def update_process_rss():
+    if PROMETHEUS_AVAILABLE:
+        PROCESS_RSS.set(_current_rss_bytes())
+
+
+def _current_rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Non-Linux fallback: peak RSS is the best we can do
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Return (body, content type) for the /metrics endpoint."""
+    update_process_rss()
+
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,24 @@
+"""
+Cache hit/miss events from the parser caches (page store, layout templates,
+similarity index, raster cache), pushed to listeners such as the metrics
+module, which this package doesn't import.
+
+    add_cache_listener(metrics.record_cache_lookup)   # (cache, hit)
+"""
+
+from typing import Callable, List
+
+_listeners: List[Callable[[str, bool], None]] = []
+
+
+def add_cache_listener(listener: Callable[[str, bool], None]):
+    """Register a callback receiving (cache name, hit) for every lookup."""
+    _listeners.append(listener)
+
+
+def record_lookup(cache: str, hit: bool):
+    for listener in _listeners:
+        try:
+            listener(cache, hit)
+        except Exception:
+            pass
@@ -1,10 +1,14 @@
 import os
 import time
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from google.cloud import documentai_v1 as documentai
 from google.api_core.client_options import ClientOptions
 
+from .pages import extract_pages, original_page
+from .table_normalize import POSITIONAL_COLUMNS, frame_items, frame_pages, normalize_rows
+from .tracing import span
+
 class DocAIParser:
     """
     PDF parser using Google Document AI - excellent for complex documents.
@@ -13,22 +17,27 @@ class DocAIParser:
 
     def __init__(self):
         self.client = None
+        self.processor_name = None
+        self.project_id = os.getenv('GOOGLE_CLOUD_PROJECT_ID')
+        self.location = os.getenv('GOOGLE_CLOUD_LOCATION', 'us')
+        self.processor_id = os.getenv('GOOGLE_DOCAI_PROCESSOR_ID')
         try:
-            project_id = os.getenv('GOOGLE_CLOUD_PROJECT_ID')
-            location = os.getenv('GOOGLE_CLOUD_LOCATION', 'us')
-            processor_id = os.getenv('GOOGLE_DOCAI_PROCESSOR_ID')
-
-            if project_id and processor_id:
-                opts = ClientOptions(api_endpoint=f"{location}-documentai.googleapis.com")
-                self.client = documentai.DocumentProcessorServiceClient(client_options=opts)
-                self.processor_name = self.client.processor_path(project_id, location, processor_id)
-            else:
-                print("Warning: Google Document AI not fully configured")
+            self.client = self._create_client()
+            if self.client is not None:
+                self.processor_name = self.client.processor_path(self.project_id, self.location, self.processor_id)
         except Exception as e:
             print(f"Warning: Document AI client initialization failed: {e}")
 
-    def parse(self, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Parse PDF using Google Document AI."""
+    def _create_client(self):
+        """Build the Document AI client, or None when not configured (benchmarks.fakes swaps this out for load tests)."""
+        if not (self.project_id and self.processor_id):
+            print("Warning: Google Document AI not fully configured")
+            return None
+        opts = ClientOptions(api_endpoint=f"{self.location}-documentai.googleapis.com")
+        return documentai.DocumentProcessorServiceClient(client_options=opts)
+
+    def parse(self, pdf_bytes: bytes, filename: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Parse PDF using Google Document AI. `pages` limits parsing to those 1-based page numbers."""
         start_time = time.time()
 
         if not self.client:
@@ -44,6 +53,10 @@ class DocAIParser:
             }
 
         try:
+            # Send only the requested pages
+            with span('docai.select_pages'):
+                pdf_bytes, page_numbers = extract_pages(pdf_bytes, pages)
+
             # Prepare document
             raw_document = documentai.RawDocument(
                 content=pdf_bytes,
@@ -56,38 +69,46 @@ class DocAIParser:
                 raw_document=raw_document
             )
 
-            result = self.client.process_document(request=request)
+            with span('docai.process_document', bytes=len(pdf_bytes)):
+                result = self.client.process_document(request=request)
             document = result.document
 
             # Extract text
             full_text = document.text
 
-            # Extract entities (if using specialized processor)
-            entities = {}
-            for entity in document.entities:
-                entity_type = entity.type_
-                entity_text = entity.mention_text
-                entities[entity_type] = entity_text
-
-            # Extract tables
-            tables = []
-            for page in document.pages:
-                for table in page.tables:
-                    table_data = self._extract_table(table, full_text)
-                    if table_data:
-                        tables.append(table_data)
+            with span('docai.process_tables'):
+                # Extract entities (if using specialized processor)
+                entities = {}
+                for entity in document.entities:
+                    entity_type = entity.type_
+                    entity_text = entity.mention_text
+                    entities[entity_type] = entity_text
+
+                # Extract tables
+                tables = []
+                table_pages = []
+                for page in document.pages:
+                    for table in page.tables:
+                        table_data = self._extract_table(table, full_text)
+                        if table_data:
+                            tables.append(table_data)
+                            # Pages of the sub-PDF are 1..n; report the original page
+                            table_pages.append(original_page(page_numbers, page.page_number or 1))
 
             # Extract line items
-            line_items = self._extract_line_items_from_tables(tables)
-
-            if not line_items:
-                line_items = self._extract_line_items_from_text(full_text)
+            with span('docai.line_items'):
+                frame = self._line_item_frame(tables)
+                line_items = frame_items(frame)
+                item_pages = frame_pages(frame, table_pages)
 
-            # Extract financials
-            financials = self._extract_financials(full_text, entities)
+                if not line_items:
+                    line_items = self._extract_line_items_from_text(full_text)
+                    item_pages = []
 
-            # Extract supplier info
-            supplier_info = self._extract_supplier_info(full_text, entities)
+            # Extract financials and supplier info
+            with span('docai.regex'):
+                financials = self._extract_financials(full_text, entities)
+                supplier_info = self._extract_supplier_info(full_text, entities)
 
             # Calculate average confidence
             avg_confidence = self._calculate_avg_confidence(document)
@@ -103,7 +124,10 @@ class DocAIParser:
                     'quote_number': supplier_info.get('quote_number', ''),
                     'quote_date': supplier_info.get('quote_date', ''),
                     'num_pages': len(document.pages),
+                    'pages': pages,
                     'tables_found': len(tables),
+                    'table_pages': table_pages,
+                    'item_pages': item_pages,
                     'entities_found': len(entities),
                     'docai_confidence': avg_confidence,
                 },
@@ -154,55 +178,28 @@ class DocAIParser:
 
     def _extract_line_items_from_tables(self, tables: List[List[List[str]]]) -> List[Dict]:
         """Extract line items from tables."""
-        line_items = []
+        return frame_items(self._line_item_frame(tables))
 
+    def _line_item_frame(self, tables: List[List[List[str]]]):
+        """Every table's line items as one DataFrame, one normalize_rows() table per input table."""
+        prepared = []
         for table in tables:
-            if not table or len(table) < 2:
-                continue
+            rows = []
+            if table and len(table) >= 2:
+                # Assume first row might be header (skip if too few columns)
+                data_rows = table if len(table[0]) < 3 else table[1:]
 
-            # Assume first row might be header (skip if too few columns)
-            data_rows = table if len(table[0]) < 3 else table[1:]
-
-            for row_idx, row in enumerate(data_rows):
-                if not row or all(not cell.strip() for cell in row):
-                    continue
-
-                # Try to parse row as line item
                 # Expected order: description, qty, unit, rate, total
-                if len(row) >= 3:
-                    try:
-                        item = {
-                            'line_number': len(line_items) + 1,
-                            'description': row[0].strip() if len(row) > 0 else '',
-                            'quantity': self._parse_number(row[1]) if len(row) > 1 else 0,
-                            'unit': row[2].strip() if len(row) > 2 else '',
-                            'unit_price': self._parse_number(row[3]) if len(row) > 3 else 0,
-                            'total_price': self._parse_number(row[4]) if len(row) > 4 else 0,
-                        }
-
-                        if item['description'] and (item['quantity'] or item['total_price']):
-                            line_items.append(item)
-                    except Exception:
-                        continue
-
-        return line_items
+                rows = [row for row in data_rows if len(row) >= 3]
+            prepared.append((rows, POSITIONAL_COLUMNS))
+
+        return normalize_rows(prepared)
 
     def _extract_line_items_from_text(self, text: str) -> List[Dict]:
         """Extract line items from text using patterns."""
-        line_items = []
         pattern = r'(.+?)\s+(\d+(?:\.\d+)?)\s+([a-zA-Z²³]+)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)'
-
-        for match in re.finditer(pattern, text):
-            line_items.append({
-                'line_number': len(line_items) + 1,
-                'description': match.group(1).strip(),
-                'quantity': float(match.group(2)),
-                'unit': match.group(3),
-                'unit_price': self._parse_number(match.group(4)),
-                'total_price': self._parse_number(match.group(5)),
-            })
-
-        return line_items
+        rows = [match.groups() for match in re.finditer(pattern, text)]
+        return frame_items(normalize_rows([(rows, POSITIONAL_COLUMNS)], require_values=False))
 
     def _parse_number(self, value: str) -> float:
         """Parse number from string."""
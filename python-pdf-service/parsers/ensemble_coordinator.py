@@ -1,13 +1,73 @@
+import os
 import time
-from typing import Dict, List, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+from functools import partial
+from typing import Dict, List, Any, AsyncIterator, Callable, Iterator, Optional, Tuple
+from concurrent.futures import Executor, Future, TimeoutError as FutureTimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
-from .pdfplumber_parser import PDFPlumberParser
-from .pymupdf_parser import PyMuPDFParser
-from .ocr_parser import OCRParser
-from .textract_parser import TextractParser
-from .docai_parser import DocAIParser
-from .unstructured_parser import parse_with_unstructured, extract_line_items_from_tables
+from .registry import ParserRegistry, is_enabled
+from .executors import (
+    get_parser_executor, get_process_executor, discard_process_executor,
+    get_unstructured_executor, discard_unstructured_executor,
+)
+from .layout_templates import (
+    TemplateParser, build_template, detect_layout, get_template_store, same_extraction, templates_enabled,
+)
+from .outcomes import (
+    choose_parsers, document_features, get_outcome_store, outcome_learning_enabled, outcome_record,
+)
+from .page_store import get_page_store, merge_content, page_key, page_store_enabled, split_content
+from .page_classifier import ITEM_LABELS, classifier_enabled, classify_pages
+from .pages import page_fingerprints, select_pages, split_pdf
+from .raster_cache import current_rasters, raster_scope
+from .routing import (
+    assess_pages, merge_by_page, page_budget, result_tables, routing_mode, select_pages_within_budget
+)
+from .similarity import document_signature, get_similarity_index, run_key, similarity_enabled
+from .tiers import execution_mode, reconciles, tier_2_reasons, tier_3_reasons, tier_of
+from .tracing import bind, span
+
+# Parsers that spend their time waiting on a remote API. In async mode they
+# run on the shared thread pool; every other parser is CPU-bound and runs in
+# the shared process pool.
+CLOUD_PARSERS = ('textract', 'docai')
+# Unstructured already runs in its own warm process pool; a thread just waits on it
+THREAD_PARSERS = CLOUD_PARSERS + ('unstructured',)
+# Parsers billed or slow per page: they only get pages the classifier marks relevant
+CLASSIFIED_PARSERS = CLOUD_PARSERS + ('ocr', 'unstructured')
+# How long the ensemble waits for one parser
+PARSER_TIMEOUT_SECONDS = 60
+
+# One coordinator per process-pool worker, built on first use
+_process_coordinator = None
+
+
+def run_parser_in_process(
+    parser_name: str,
+    pdf_bytes: bytes,
+    filename: str,
+    pages: Optional[List[int]] = None,
+    color_dpi: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Process-pool entry point: run one local parser in a worker process.
+    `color_dpi` is the request's RasterCache.color_dpi: its pages are then
+    shared through RASTER_CACHE_DIR with the Unstructured workers.
+    """
+    global _process_coordinator
+
+    if _process_coordinator is None:
+        _process_coordinator = EnsembleCoordinator()
+
+    parse = _process_coordinator._parser_callable(parser_name)
+    if parse is None:
+        return None
+    # Otherwise only spilled rasters (RASTER_CACHE_SPILL) are shared with the other pool workers
+    with raster_scope(pdf_bytes, color_dpi) as rasters:
+        if color_dpi:
+            rasters.share()
+        return parse(pdf_bytes, filename, pages)
 
 
 class EnsembleCoordinator:
@@ -17,72 +77,889 @@ class EnsembleCoordinator:
     """
 
     def __init__(self):
-        self.parsers = {
-            'pdfplumber': PDFPlumberParser(),
-            'pymupdf': PyMuPDFParser(),
-            'ocr': OCRParser(),
-            'textract': TextractParser(),
-            'docai': DocAIParser(),
-        }
+        # Parsers are imported and built on first use (see parsers.registry)
+        self.parsers = ParserRegistry()
         # Unstructured is handled separately (function-based, not class-based)
-        self.unstructured_available = True
+        self.unstructured_available = is_enabled('unstructured')
 
     def parse_with_ensemble(
         self,
         pdf_bytes: bytes,
         filename: str,
-        parsers_to_use: List[str]
+        parsers_to_use: List[str],
+        pages: Optional[List[int]] = None,
+        cloud_routing: Optional[str] = None,
+        execution: Optional[str] = None,
+        outcome_features: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Run multiple parsers in parallel and return ensemble results.
+        `pages` restricts every parser to those 1-based page numbers.
+        `cloud_routing='pages'` sends the cloud parsers only the pages the
+        local parsers got wrong (see parsers.routing). `execution='tiered'`
+        runs costlier parsers only when cheaper ones fall short (see
+        parsers.tiers). A fresh run is recorded for smart mode under
+        `outcome_features` (parse_smart passes the document's features).
+        """
+        start_time = time.time()
+        mode = self._routing_mode(parsers_to_use, cloud_routing)
+        execution = execution_mode(execution)
+        key = run_key(parsers_to_use, pages, mode, execution)
+
+        signature, reused = self._lookup_near_duplicate(pdf_bytes, filename, key, pages, start_time)
+        if reused is not None:
+            return reused
+        layout, templated = self._apply_template(pdf_bytes, filename, parsers_to_use, pages, start_time)
+        classification, relevant_pages = self._classify(pdf_bytes, pages)
+        if templated is not None:
+            # Downstream chunking needs the page labels whichever way the items were read
+            self._attach_classification(templated, classification, relevant_pages)
+            return templated
+
+        results = []
+        plan = None
+        stages = []
+        with raster_scope(pdf_bytes, self._color_dpi(parsers_to_use)):
+            for tier, stage_parsers in self._execution_stages(parsers_to_use, execution, mode):
+                stage, stage_plan, stage_pages = self._prepare_stage(
+                    tier, stage_parsers, results, classification, relevant_pages, pdf_bytes, pages, mode
+                )
+                plan = stage_plan or plan
+                stages.append(stage)
+                if stage['ran']:
+                    stage_start = time.time()
+                    results += self._run_parsers(stage_parsers, pdf_bytes, filename, stage_pages.get)
+                    stage['time_ms'] = int((time.time() - stage_start) * 1000)
+
+        response = self._combine_results(results, filename, start_time, pages)
+        self._attach_classification(response, classification, relevant_pages)
+        self._attach_routing(response, plan)
+        response['extraction_metadata']['execution'] = {'mode': execution, 'stages': stages}
+        self._index_result(signature, key, filename, response)
+        self._record_outcome(outcome_features, pages, response)
+        self._learn_template(pdf_bytes, filename, layout, response)
+        return response
+
+    def _run_parsers(
+        self,
+        parsers_to_use: List[str],
+        pdf_bytes: bytes,
+        filename: str,
+        parser_pages: Callable[[str], Optional[List[int]]]
+    ) -> List[Dict[str, Any]]:
+        """Run parsers in parallel on the shared executor; results in completion order."""
+        executor = get_parser_executor()
+        future_to_parser = {}
+        for parser_name in parsers_to_use:
+            future = self._submit_parser(executor, parser_name, pdf_bytes, filename, parser_pages(parser_name))
+            if future is not None:
+                future_to_parser[future] = parser_name
+
+        # Collect results as they complete
+        results = []
+        for future in as_completed(future_to_parser):
+            results.append(self._collect_result(future, future_to_parser[future]))
+        return results
+
+    def parse_batch(
+        self,
+        documents: List[Tuple[str, bytes]],
+        parsers_to_use: List[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run the ensemble over many documents at once.
+
+        Parser tasks are submitted round-robin (every document's first parser,
+        then every document's second parser, ...) so all documents make
+        progress together. Each document's ensemble result is yielded as soon
+        as its last parser finishes.
         """
+        executor = get_parser_executor()
         start_time = time.time()
 
-        # Run parsers in parallel
+        states = [
+            {'filename': filename, 'results': [], 'remaining': 0}
+            for filename, _ in documents
+        ]
+        future_to_task = {}
+
+        for parser_name in parsers_to_use:
+            for doc_index, (filename, pdf_bytes) in enumerate(documents):
+                future = self._submit_parser(executor, parser_name, pdf_bytes, filename)
+                if future is not None:
+                    future_to_task[future] = (doc_index, parser_name)
+                    states[doc_index]['remaining'] += 1
+
+        # Documents with no runnable parsers are complete immediately
+        for doc_index, state in enumerate(states):
+            if state['remaining'] == 0:
+                yield self._batch_entry(doc_index, state, start_time)
+
+        for future in as_completed(future_to_task):
+            doc_index, parser_name = future_to_task[future]
+            state = states[doc_index]
+            state['results'].append(self._collect_result(future, parser_name))
+            state['remaining'] -= 1
+
+            if state['remaining'] == 0:
+                yield self._batch_entry(doc_index, state, start_time)
+
+    def parse_chunked(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        chunk_size: Optional[int] = None,
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fast single pass for large digital PDFs.
+
+        The PDF is split into page chunks with PyMuPDF, each chunk's tables and
+        text are extracted by pdfplumber in the shared process pool, and the
+        merged content is turned into line items once. Tables that continue
+        across page breaks are stitched so their header carries forward.
+        """
+        from .pdfplumber_parser import extract_chunk_content
+
+        start_time = time.time()
+        chunk_size = chunk_size or int(os.getenv('CHUNK_PAGES', 4))
+        with span('chunked.split'):
+            chunks = split_pdf(pdf_bytes, chunk_size, pages)
+
+        try:
+            with span('chunked.extract', chunks=len(chunks)):
+                if len(chunks) <= 1:
+                    # Not worth a round-trip through the process pool
+                    contents = [extract_chunk_content(chunk_bytes, page_numbers) for page_numbers, chunk_bytes in chunks]
+                else:
+                    executor = get_process_executor()
+                    futures = [
+                        executor.submit(extract_chunk_content, chunk_bytes, page_numbers)
+                        for page_numbers, chunk_bytes in chunks
+                    ]
+                    contents = [future.result(timeout=60) for future in futures]
+
+            merged = {
+                'tables': [table for content in contents for table in content['tables']],
+                'text_content': [text for content in contents for text in content['text_content']],
+                'metadata': contents[0]['metadata'] if contents else {},
+                'num_pages': sum(content['num_pages'] for content in contents),
+            }
+            with span('chunked.build_result'):
+                result = self.parsers['pdfplumber'].build_result(merged, pages, start_time)
+        except BrokenProcessPool as e:
+            discard_process_executor()
+            result = self._error_result('pdfplumber', e)
+        except Exception as e:
+            result = self._error_result('pdfplumber', e)
+
+        response = self._combine_results([result], filename, start_time, pages)
+        response['extraction_metadata'].update({
+            'mode': 'chunked',
+            'chunk_size': chunk_size,
+            'chunks': len(chunks),
+        })
+        return response
+
+    async def parse_async(
+        self,
+        parser_name: str,
+        pdf_bytes: bytes,
+        filename: str,
+        pages: Optional[List[int]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run one parser without blocking the event loop (ASGI mode).
+        Cloud parsers wait on the thread pool, local parsers run in the
+        process pool. Returns None for an unknown parser name.
+        """
+        parse = self._parser_callable(parser_name)
+        if parse is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            with span(f'parser.{parser_name}'):
+                if parser_name in THREAD_PARSERS:
+                    future = loop.run_in_executor(get_parser_executor(), bind(parse), pdf_bytes, filename, pages)
+                else:
+                    rasters = current_rasters(pdf_bytes)
+                    future = asyncio.wrap_future(get_process_executor().submit(
+                        run_parser_in_process, parser_name, pdf_bytes, filename, pages,
+                        rasters.color_dpi if rasters else None
+                    ))
+                return await asyncio.wait_for(future, timeout=PARSER_TIMEOUT_SECONDS)
+        except BrokenProcessPool as e:
+            discard_process_executor()
+            return self._error_result(parser_name, e)
+        except Exception as e:
+            return self._error_result(parser_name, e)
+
+    async def parse_with_ensemble_async(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        parsers_to_use: List[str],
+        pages: Optional[List[int]] = None,
+        cloud_routing: Optional[str] = None,
+        execution: Optional[str] = None,
+        outcome_features: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Async counterpart of parse_with_ensemble."""
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        mode = self._routing_mode(parsers_to_use, cloud_routing)
+        execution = execution_mode(execution)
+        key = run_key(parsers_to_use, pages, mode, execution)
+
+        signature, reused = await loop.run_in_executor(
+            get_parser_executor(), bind(self._lookup_near_duplicate), pdf_bytes, filename, key, pages, start_time
+        )
+        if reused is not None:
+            return reused
+        layout, templated = await loop.run_in_executor(
+            get_parser_executor(), bind(self._apply_template), pdf_bytes, filename, parsers_to_use, pages, start_time
+        )
+        classification, relevant_pages = await loop.run_in_executor(
+            get_parser_executor(), bind(self._classify), pdf_bytes, pages
+        )
+        if templated is not None:
+            # Downstream chunking needs the page labels whichever way the items were read
+            self._attach_classification(templated, classification, relevant_pages)
+            return templated
+
         results = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_parser = {}
-
-            for parser_name in parsers_to_use:
-                if parser_name == 'unstructured' and self.unstructured_available:
-                    # Unstructured uses different API
-                    future = executor.submit(self._parse_with_unstructured_wrapper, pdf_bytes, filename)
-                    future_to_parser[future] = parser_name
-                elif parser_name in self.parsers:
-                    parser = self.parsers[parser_name]
-                    future = executor.submit(parser.parse, pdf_bytes, filename)
-                    future_to_parser[future] = parser_name
-
-            # Collect results as they complete
-            for future in as_completed(future_to_parser):
-                parser_name = future_to_parser[future]
-                try:
-                    result = future.result(timeout=60)  # 60 second timeout per parser
-                    results.append(result)
-                except Exception as e:
-                    # If a parser fails, add error result
-                    results.append({
-                        'parser_name': parser_name,
-                        'success': False,
-                        'items': [],
-                        'metadata': {},
-                        'financials': {},
-                        'confidence_score': 0.0,
-                        'extraction_time_ms': 0,
-                        'errors': [str(e)]
-                    })
+        plan = None
+        stages = []
+        color_dpi = self._color_dpi(parsers_to_use)
+        with raster_scope(pdf_bytes, color_dpi) as rasters:
+            if color_dpi:
+                # OCR runs in the process pool here: its pages reach Unstructured through disk
+                rasters.share()
+            for tier, stage_parsers in self._execution_stages(parsers_to_use, execution, mode):
+                stage, stage_plan, stage_pages = await loop.run_in_executor(
+                    get_parser_executor(), bind(self._prepare_stage),
+                    tier, stage_parsers, results, classification, relevant_pages, pdf_bytes, pages, mode
+                )
+                plan = stage_plan or plan
+                stages.append(stage)
+                if stage['ran']:
+                    stage_start = time.time()
+                    stage_results = await asyncio.gather(*(
+                        self.parse_async(parser_name, pdf_bytes, filename, stage_pages[parser_name])
+                        for parser_name in stage_parsers
+                    ))
+                    results += [result for result in stage_results if result is not None]
+                    stage['time_ms'] = int((time.time() - stage_start) * 1000)
+
+        response = self._combine_results(results, filename, start_time, pages)
+        self._attach_classification(response, classification, relevant_pages)
+        self._attach_routing(response, plan)
+        response['extraction_metadata']['execution'] = {'mode': execution, 'stages': stages}
+        await loop.run_in_executor(
+            get_parser_executor(), bind(self._index_result), signature, key, filename, response
+        )
+        await loop.run_in_executor(
+            get_parser_executor(), bind(self._record_outcome), outcome_features, pages, response
+        )
+        await loop.run_in_executor(
+            get_parser_executor(), bind(self._learn_template), pdf_bytes, filename, layout, response
+        )
+        return response
+
+    async def parse_batch_async(
+        self,
+        documents: List[Tuple[str, bytes]],
+        parsers_to_use: List[str]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of parse_batch: yields each document's result as it completes."""
+        start_time = time.time()
+        states = [
+            {'filename': filename, 'results': [], 'remaining': 0}
+            for filename, _ in documents
+        ]
+
+        async def run(doc_index: int, parser_name: str):
+            filename, pdf_bytes = documents[doc_index]
+            return doc_index, await self.parse_async(parser_name, pdf_bytes, filename)
+
+        tasks = []
+        for parser_name in parsers_to_use:
+            if self._parser_callable(parser_name) is None:
+                continue
+            for doc_index in range(len(documents)):
+                tasks.append(asyncio.ensure_future(run(doc_index, parser_name)))
+                states[doc_index]['remaining'] += 1
+
+        for doc_index, state in enumerate(states):
+            if state['remaining'] == 0:
+                yield self._batch_entry(doc_index, state, start_time)
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                doc_index, result = await next_done
+                state = states[doc_index]
+                state['results'].append(result)
+                state['remaining'] -= 1
+
+                if state['remaining'] == 0:
+                    yield self._batch_entry(doc_index, state, start_time)
+        finally:
+            # Client went away mid-stream
+            for task in tasks:
+                task.cancel()
+
+    async def parse_chunked_async(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        chunk_size: Optional[int] = None,
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of parse_chunked. The chunks already run in the
+        process pool, so a pool thread only waits for them and merges.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_parser_executor(), bind(self.parse_chunked), pdf_bytes, filename, chunk_size, pages
+        )
+
+    async def parse_with_auto_selection_async(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Async counterpart of parse_with_auto_selection."""
+        parser_order = ['pdfplumber', 'pymupdf', 'textract', 'docai', 'ocr']
+
+        for parser_name in parser_order:
+            result = await self.parse_async(parser_name, pdf_bytes, filename, pages)
+            if result and result['success'] and result['confidence_score'] >= 0.7:
+                return {
+                    'selected_parser': parser_name,
+                    'result': result,
+                    'tried_parsers': parser_order[:parser_order.index(parser_name) + 1],
+                }
+
+        return await self.parse_with_ensemble_async(pdf_bytes, filename, parser_order[:3], pages)
+
+    async def parse_smart_async(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        available: List[str],
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Async counterpart of parse_smart."""
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(get_parser_executor(), bind(self._smart_plan), pdf_bytes, available)
+        response = await self.parse_with_ensemble_async(
+            pdf_bytes, filename, plan['parsers'], pages, outcome_features=plan['features']
+        )
+        if self._needs_escalation(plan, response, available):
+            plan['escalated'] = True
+            response = await self.parse_with_ensemble_async(
+                pdf_bytes, filename, available, pages, outcome_features=plan['features']
+            )
+        response['smart_plan'] = plan
+        return response
+
+    def _batch_entry(self, doc_index: int, state: Dict, start_time: float) -> Dict[str, Any]:
+        """Build the streamed batch record for one finished document."""
+        return {
+            'index': doc_index,
+            'file_name': state['filename'],
+            'result': self._combine_results(state['results'], state['filename'], start_time),
+        }
+
+    def _submit_parser(
+        self,
+        executor: Executor,
+        parser_name: str,
+        pdf_bytes: bytes,
+        filename: str,
+        pages: Optional[List[int]] = None
+    ) -> Optional[Future]:
+        """Submit one parser run to the executor, or return None if unknown."""
+        parse = self._parser_callable(parser_name)
+        if parse is None:
+            return None
+
+        # Carry the request's trace onto the executor thread
+        return executor.submit(bind(parse, f'parser.{parser_name}'), pdf_bytes, filename, pages)
+
+    def _parser_callable(self, parser_name: str) -> Optional[Callable]:
+        """The parse(pdf_bytes, filename, pages) callable for a parser name, or None if unknown."""
+        if parser_name == 'unstructured' and self.unstructured_available:
+            # Unstructured uses different API
+            return self._parse_with_unstructured_wrapper
+        if parser_name in self.parsers:
+            parser = self.parsers[parser_name]
+            if page_store_enabled() and hasattr(parser, 'extract_page_content'):
+                return partial(self._parse_incremental, parser_name)
+            return parser.parse
+        return None
+
+    def _parse_incremental(
+        self,
+        parser_name: str,
+        pdf_bytes: bytes,
+        filename: str,
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a parser through the page store (see parsers.page_store): only
+        pages whose fingerprint hasn't been seen are extracted, then the
+        result is built over stored + fresh page content.
+        """
+        start_time = time.time()
+        parser = self.parsers[parser_name]
+
+        try:
+            content, reused, parsed = self._page_content(parser_name, pdf_bytes, pages)
+            result = parser.build_result(content, pages, start_time)
+        except Exception as e:
+            result = self._error_result(parser_name, e)
+            result['extraction_time_ms'] = int((time.time() - start_time) * 1000)
+            return result
+
+        result['metadata']['incremental'] = {
+            'pages_reused': reused,
+            'pages_parsed': parsed,
+        }
+        return result
+
+    def _page_content(
+        self,
+        parser_name: str,
+        pdf_bytes: bytes,
+        pages: Optional[List[int]] = None
+    ) -> Tuple[Dict[str, Any], int, int]:
+        """A parser's extracted content via the page store, with the number of pages reused and parsed."""
+        parser = self.parsers[parser_name]
+        with span('incremental.fingerprint'):
+            fingerprints = page_fingerprints(pdf_bytes)
+        page_numbers = select_pages(len(fingerprints), pages)
+        if not page_numbers:
+            return parser.extract_page_content(pdf_bytes, pages), 0, 0
+
+        store = get_page_store()
+        version = getattr(parser, 'content_version', parser_name)
+        keys = {page: page_key(version, fingerprints[page - 1]) for page in page_numbers}
+        entries = {page: store.get(key) for page, key in keys.items()}
+        missing = [page for page, entry in entries.items() if entry is None]
+
+        document = None
+        if missing:
+            fresh = split_content(parser.extract_page_content(pdf_bytes, missing), missing)
+            for page in missing:
+                store.put(keys[page], fresh[page])
+            entries.update(fresh)
+            document = fresh[missing[0]]['document']
 
+        content = merge_content([entries[page] for page in page_numbers], page_numbers, document)
+        return content, len(page_numbers) - len(missing), len(missing)
+
+    def _collect_result(self, future: Future, parser_name: str) -> Dict[str, Any]:
+        """Get a parser result from a finished future, converting failures to error results."""
+        try:
+            return future.result(timeout=PARSER_TIMEOUT_SECONDS)
+        except Exception as e:
+            # If a parser fails, add error result
+            return self._error_result(parser_name, e)
+
+    def _error_result(self, parser_name: str, error: Exception) -> Dict[str, Any]:
+        """Standard failed-parser result."""
+        return {
+            'parser_name': parser_name,
+            'success': False,
+            'items': [],
+            'metadata': {},
+            'financials': {},
+            'confidence_score': 0.0,
+            'extraction_time_ms': 0,
+            'errors': [str(error)]
+        }
+
+    def _classify(
+        self,
+        pdf_bytes: bytes,
+        pages: Optional[List[int]]
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[List[int]]]:
+        """
+        Label the pages (see parsers.page_classifier) and pick the pages for
+        CLASSIFIED_PARSERS: relevant ones plus a narrative first page (cover
+        letter with the supplier's details). Falls back to `pages` when the
+        classifier is off or fails, or finds no page that can hold the line
+        items (priced_table, or scanned and unreadable here): a quote whose
+        item pages weren't recognised must not lose them.
+        """
+        if not classifier_enabled():
+            return None, pages
+
+        try:
+            with span('classify_pages'):
+                classification = classify_pages(pdf_bytes, pages)
+        except Exception:
+            return None, pages
+
+        relevant = [
+            record['page'] for index, record in enumerate(classification)
+            if record['relevant'] or (index == 0 and record['label'] == 'narrative')
+        ]
+        if not any(record['relevant'] and record['label'] in ITEM_LABELS for record in classification):
+            return classification, pages
+        if len(relevant) == len(classification):
+            return classification, pages
+        return classification, relevant
+
+    def _attach_classification(
+        self,
+        response: Dict[str, Any],
+        classification: Optional[List[Dict[str, Any]]],
+        relevant_pages: Optional[List[int]]
+    ):
+        """Add page labels (for downstream chunking) and the pages CLASSIFIED_PARSERS saw."""
+        if classification is None:
+            return
+        response['page_classification'] = classification
+        response['extraction_metadata']['relevant_pages'] = relevant_pages
+
+    def _execution_stages(
+        self,
+        parsers_to_use: List[str],
+        execution: str,
+        cloud_routing: str
+    ) -> List[Tuple[Optional[int], List[str]]]:
+        """
+        (tier, parsers) stages run one after another. Parallel execution is
+        one stage (two when the cloud parsers wait for the routing check);
+        tiered execution is one stage per tier, with tier numbers.
+        """
+        if execution == 'tiered':
+            stages = [(tier, [p for p in parsers_to_use if tier_of(p) == tier]) for tier in (1, 2, 3)]
+        elif cloud_routing == 'pages':
+            stages = [
+                (None, [p for p in parsers_to_use if p not in CLOUD_PARSERS]),
+                (None, [p for p in parsers_to_use if p in CLOUD_PARSERS]),
+            ]
+        else:
+            stages = [(None, list(parsers_to_use))]
+        return [(tier, stage_parsers) for tier, stage_parsers in stages if stage_parsers]
+
+    def _prepare_stage(
+        self,
+        tier: Optional[int],
+        stage_parsers: List[str],
+        results: List[Dict[str, Any]],
+        classification: Optional[List[Dict[str, Any]]],
+        relevant_pages: Optional[List[int]],
+        pdf_bytes: bytes,
+        pages: Optional[List[int]],
+        cloud_routing: str
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Dict[str, Optional[List[int]]]]:
+        """
+        Decide whether a stage runs and on which pages. Returns the stage's
+        record for extraction_metadata, the cloud routing plan (stages with
+        cloud parsers under cloud_routing=pages) and each parser's pages.
+
+        Tiers 2 and 3 run only when their gate (parsers.tiers) gives a
+        reason. Under cloud_routing=pages the cloud parsers run exactly when
+        the routing check flags pages, which counts as a tier 3 reason.
+        """
+        stage = {'tier': tier, 'parsers': stage_parsers, 'ran': True, 'reasons': []}
+        if tier in (2, 3):
+            best = self._select_best_result(results)
+            if tier == 2:
+                stage['reasons'] = tier_2_reasons(best, classification)
+            else:
+                stage['reasons'] = tier_3_reasons(best, self._calculate_agreement(results))
+            stage['ran'] = bool(stage['reasons'])
+
+        plan = None
+        if cloud_routing == 'pages' and set(stage_parsers) & set(CLOUD_PARSERS):
+            plan = self._plan_cloud_pages(results, pdf_bytes, pages, classification)
+            if plan['pages_sent'] and tier is not None:
+                stage['reasons'].append('pages_flagged')
+            stage['ran'] = bool(plan['pages_sent'])
+
+        stage_pages = {
+            parser_name: plan['pages_sent'] if plan else (relevant_pages if parser_name in CLASSIFIED_PARSERS else pages)
+            for parser_name in stage_parsers
+        }
+        return stage, plan, stage_pages
+
+    def _routing_mode(self, parsers_to_use: List[str], requested: Optional[str]) -> str:
+        """'pages' only when it can apply: a cloud parser is requested and pdfplumber is there to check."""
+        mode = routing_mode(requested)
+        if mode == 'pages' and ('pdfplumber' not in parsers_to_use or not set(parsers_to_use) & set(CLOUD_PARSERS)):
+            return 'all'
+        return mode
+
+    def _plan_cloud_pages(
+        self,
+        results: List[Dict[str, Any]],
+        pdf_bytes: bytes,
+        pages: Optional[List[int]],
+        classification: Optional[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Check pdfplumber's tables page by page (see parsers.routing) and pick
+        the pages for the cloud parsers within CLOUD_PAGE_BUDGET. The tables
+        come from pdfplumber's result in the local stage, so nothing is
+        extracted twice.
+        """
+        budget = page_budget()
+        local = next((r for r in results if r['parser_name'] == 'pdfplumber' and r['success']), None)
+        try:
+            with span('routing.assess'):
+                tables = result_tables(local)
+                flagged = assess_pages(tables, classification)
+        except Exception:
+            # Can't tell which pages are wrong: fall back to sending them all
+            tables, flagged = [], []
+            sent = select_pages(len(page_fingerprints(pdf_bytes)), pages)
+            return {'tables': tables, 'flagged': flagged, 'pages_sent': sent, 'over_budget': [], 'budget': budget}
+
+        sent, over_budget = select_pages_within_budget(flagged, budget)
+        return {'tables': tables, 'flagged': flagged, 'pages_sent': sent, 'over_budget': over_budget, 'budget': budget}
+
+    def _attach_routing(self, response: Dict[str, Any], plan: Optional[Dict[str, Any]]):
+        """
+        Record what was sent to the cloud parsers and, when they returned
+        items, make the best result pdfplumber's items with the sent pages
+        replaced by the best cloud parser's.
+        """
+        if plan is None:
+            return
+        metadata = response['extraction_metadata']
+        metadata['cloud_routing'] = {
+            'mode': 'pages',
+            'budget': plan['budget'],
+            'flagged': plan['flagged'],
+            'pages_sent': plan['pages_sent'],
+            'pages_over_budget': sorted({page for group in plan['over_budget'] for page in group['pages']}),
+        }
+
+        results = response['all_results']
+        local = next((r for r in results if r['parser_name'] == 'pdfplumber' and r['success']), None)
+        cloud = [r for r in results if r['parser_name'] in CLOUD_PARSERS and r['success'] and r['items']]
+        if local is None or not cloud or not plan['tables']:
+            return
+
+        best_cloud = max(cloud, key=lambda r: r['confidence_score'])
+        sent = set(plan['pages_sent'])
+        local_pages = sorted({
+            page for table in plan['tables'] if table['items'] and not sent.intersection(table['pages'])
+            for page in table['pages']
+        })
+        routed = {
+            **local,
+            'parser_name': 'routed',
+            'items': merge_by_page(
+                plan['tables'], plan['pages_sent'], best_cloud['items'], best_cloud['metadata'].get('item_pages')
+            ),
+            'confidence_score': max(local['confidence_score'], best_cloud['confidence_score']),
+            'metadata': {
+                **local['metadata'],
+                'routed_from': {'pdfplumber': local_pages, best_cloud['parser_name']: plan['pages_sent']},
+            },
+        }
+        response['best_result'] = routed
+        response['confidence_breakdown']['best_parser'] = 'routed'
+        response['confidence_breakdown']['best_parser_confidence'] = routed['confidence_score']
+        metadata['cloud_routing']['cloud_parser'] = best_cloud['parser_name']
+
+    def _apply_template(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        parsers_to_use: List[str],
+        pages: Optional[List[int]],
+        start_time: float
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Look up the document's layout template (see parsers.layout_templates).
+        Returns the detected layout (None without a recognisable header, for
+        whole-document runs only) and, on a template hit whose parser was
+        requested, the ensemble response from the template alone. A hit
+        whose items don't reconcile with the totals falls back to the
+        ensemble.
+        """
+        if pages or not templates_enabled():
+            return None, None
+
+        try:
+            with span('template.lookup'):
+                layout = detect_layout(pdf_bytes)
+                if layout is None:
+                    return None, None
+                template = get_template_store().get(layout['fingerprint'])
+        except Exception:
+            return None, None
+        if template is None or template['parser'] not in parsers_to_use:
+            return layout, None
+
+        with span('template.extract'):
+            result = TemplateParser().parse(pdf_bytes, filename, template)
+        if not result['items'] or reconciles(result) is False:
+            return layout, None
+
+        response = self._combine_results([result], filename, start_time, pages)
+        response['extraction_metadata']['layout_template'] = {
+            'fingerprint': template['fingerprint'],
+            'parser': template['parser'],
+            'learned_from': template['learned_from'],
+            'learned_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(template['created'])),
+        }
+        return layout, response
+
+    def _learn_template(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        layout: Optional[Dict[str, Any]],
+        response: Dict[str, Any]
+    ):
+        """
+        Store a template for this layout when the ensemble was confident, its
+        items reconcile with the totals and the template reproduces them.
+        """
+        best = response['best_result']
+        min_confidence = float(os.getenv('LAYOUT_TEMPLATE_MIN_CONFIDENCE', 0.8))
+        if layout is None or not best.get('items') or best.get('confidence_score', 0) < min_confidence:
+            return
+        if best['parser_name'] not in self.parsers or reconciles(best) is False:
+            return
+        try:
+            with span('template.learn'):
+                template = build_template(layout, best, filename)
+                if same_extraction(TemplateParser().parse(pdf_bytes, filename, template), best):
+                    get_template_store().put(layout['fingerprint'], template)
+        except Exception:
+            pass  # Templates are best effort; the response is already complete
+
+    def _lookup_near_duplicate(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        key: str,
+        pages: Optional[List[int]],
+        start_time: float
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Check the similarity index (see parsers.similarity). Returns the
+        document's signature (None without a text layer or when disabled)
+        and an earlier ensemble result to reuse, or None to parse normally.
+
+        An earlier result is reused as is when every page's text matches.
+        When only wording differs (item descriptions are wording too), the
+        parser that produced the earlier best_result runs again on the new
+        document, and the earlier result is only reused if that gives the
+        same, non-empty line items and grand total. Any changed figure
+        means a fresh parse.
+        """
+        if not similarity_enabled():
+            return None, None
+
+        try:
+            with span('similarity.lookup'):
+                signature = document_signature(pdf_bytes, pages)
+                if signature is None:
+                    return None, None
+                match = get_similarity_index().lookup(signature, key)
+        except Exception:
+            return None, None
+        if match is None:
+            return signature, None
+
+        if match['figures_changed']:
+            return signature, None
+
+        validated_with = None
+        if match['pages_changed']:
+            # Routed and template results have no single parser to re-run
+            previous = match['result'].get('best_result') or {}
+            parser_name = previous.get('parser_name')
+            parse = self._parser_callable(parser_name) if parser_name else None
+            if not previous.get('items') or parse is None:
+                return signature, None
+            with span('similarity.validate'):
+                current = parse(pdf_bytes, filename, pages)
+            if (
+                not current['success']
+                or not current.get('items')
+                or self._extraction_key(current) != self._extraction_key(previous)
+            ):
+                return signature, None
+            validated_with = parser_name
+
+        response = match['result']
+        response['extraction_metadata'].update({
+            'total_extraction_time_ms': int((time.time() - start_time) * 1000),
+            'file_name': filename,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'near_duplicate': {
+                'document_id': match['document_id'],
+                'file_name': match['file_name'],
+                'similarity': match['similarity'],
+                'pages_changed': match['pages_changed'],
+                'validated_with': validated_with,
+                'parsed_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(match['parsed_at'])),
+            },
+        })
+        return signature, response
+
+    def _extraction_key(self, result: Dict[str, Any]) -> Tuple:
+        """What a near-duplicate must agree on: line items and grand total."""
+        return (
+            [
+                (item.get('description'), item.get('quantity'), item.get('unit_price'), item.get('total_price'))
+                for item in result.get('items', [])
+            ],
+            result.get('financials', {}).get('grand_total'),
+        )
+
+    def _index_result(
+        self,
+        signature: Optional[Dict[str, Any]],
+        key: str,
+        filename: str,
+        response: Dict[str, Any]
+    ):
+        """Record a fresh ensemble result in the similarity index if any parser succeeded."""
+        if signature is None or not response['confidence_breakdown']['parsers_succeeded']:
+            return
+        try:
+            with span('similarity.index'):
+                get_similarity_index().add(signature, key, filename, response)
+        except Exception:
+            pass  # Indexing is best effort; the response is already complete
+
+    def _combine_results(
+        self,
+        results: List[Dict],
+        filename: str,
+        start_time: float,
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Combine individual parser results into the ensemble response."""
         # Build consensus from all results
-        consensus_items = self._build_consensus(results)
+        with span('ensemble.consensus'):
+            consensus_items = self._build_consensus(results)
 
         # Select best result
-        best_result = self._select_best_result(results)
+        with span('ensemble.select_best'):
+            best_result = self._select_best_result(results)
 
         # Calculate metrics
         success_count = sum(1 for r in results if r['success'])
         avg_confidence = sum(r['confidence_score'] for r in results) / len(results) if results else 0
 
-        cross_model_agreement = self._calculate_agreement(results)
+        with span('ensemble.agreement'):
+            cross_model_agreement = self._calculate_agreement(results)
 
         total_time_ms = int((time.time() - start_time) * 1000)
 
@@ -111,6 +988,7 @@ class EnsembleCoordinator:
                 'total_extraction_time_ms': total_time_ms,
                 'parsers_used': [r['parser_name'] for r in results],
                 'file_name': filename,
+                'pages': pages,
                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
             }
         }
@@ -118,7 +996,8 @@ class EnsembleCoordinator:
     def parse_with_auto_selection(
         self,
         pdf_bytes: bytes,
-        filename: str
+        filename: str,
+        pages: Optional[List[int]] = None
     ) -> Dict[str, Any]:
         """
         Automatically select and try parsers in order of likely success.
@@ -133,7 +1012,8 @@ class EnsembleCoordinator:
 
             try:
                 parser = self.parsers[parser_name]
-                result = parser.parse(pdf_bytes, filename)
+                with span(f'parser.{parser_name}'):
+                    result = parser.parse(pdf_bytes, filename, pages)
 
                 # If successful with good confidence, use it
                 if result['success'] and result['confidence_score'] >= 0.7:
@@ -147,7 +1027,63 @@ class EnsembleCoordinator:
                 continue
 
         # If no parser succeeded with high confidence, run ensemble
-        return self.parse_with_ensemble(pdf_bytes, filename, parser_order[:3])
+        return self.parse_with_ensemble(pdf_bytes, filename, parser_order[:3], pages)
+
+    def parse_smart(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        available: List[str],
+        pages: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the cheapest parser set that earlier, similar documents say will
+        reach the target confidence (see parsers.outcomes), and report the
+        plan as `smart_plan`. If the chosen set falls short, every available
+        parser runs (with the page store on, local parsers reuse their pages).
+        """
+        plan = self._smart_plan(pdf_bytes, available)
+        features = plan['features']
+        response = self.parse_with_ensemble(pdf_bytes, filename, plan['parsers'], pages, outcome_features=features)
+        if self._needs_escalation(plan, response, available):
+            plan['escalated'] = True
+            response = self.parse_with_ensemble(pdf_bytes, filename, available, pages, outcome_features=features)
+        response['smart_plan'] = plan
+        return response
+
+    def _smart_plan(self, pdf_bytes: bytes, available: List[str]) -> Dict[str, Any]:
+        """The parser set for parse_smart, with the document's features."""
+        try:
+            with span('smart.features'):
+                features = document_features(pdf_bytes)
+                records = get_outcome_store().records()
+        except Exception:
+            features, records = None, []
+        with span('smart.plan'):
+            plan = choose_parsers(features, available, records)
+        plan['features'] = features
+        plan['escalated'] = False
+        return plan
+
+    def _needs_escalation(self, plan: Dict[str, Any], response: Dict[str, Any], available: List[str]) -> bool:
+        if plan['reason'] != 'predicted' or len(plan['parsers']) == len(available):
+            return False
+        return response['best_result'].get('confidence_score', 0) < plan['target_confidence']
+
+    def _record_outcome(
+        self,
+        features: Optional[Dict[str, Any]],
+        pages: Optional[List[int]],
+        response: Dict[str, Any]
+    ):
+        """Record how each parser did on this kind of document (smart, whole-document runs only)."""
+        if features is None or pages or not outcome_learning_enabled() or not response['all_results']:
+            return
+        try:
+            with span('smart.record'):
+                get_outcome_store().add(outcome_record(features, response))
+        except Exception:
+            pass  # Learning is best effort; the response is already complete
 
     def _build_consensus(self, results: List[Dict]) -> List[Dict]:
         """
@@ -161,38 +1097,24 @@ class EnsembleCoordinator:
         if len(successful_results) == 1:
             return successful_results[0]['items']
 
-        # Group items by similarity
-        all_items = {}
-
-        for result in successful_results:
-            for item in result['items']:
-                # Create key from description and quantity
-                desc = item.get('description', '').lower().strip()
-                qty = item.get('quantity', 0)
-                key = f"{desc}_{qty}"
-
-                if key not in all_items:
-                    all_items[key] = []
-
-                all_items[key].append({
-                    **item,
-                    'source_parser': result['parser_name'],
-                    'source_confidence': result['confidence_score'],
-                })
-
-        # Build consensus items
+        # Group items by similarity. Groups hold (result, item) references;
+        # each consensus item is built with a single dict copy at the end.
         consensus_items = []
 
-        for key, items in all_items.items():
-            if len(items) == 1:
+        for members in self._group_items(successful_results).values():
+            if len(members) == 1:
                 # Single source
+                result, item = members[0]
                 consensus_items.append({
-                    **items[0],
+                    **item,
+                    'source_parser': result['parser_name'],
+                    'source_confidence': result['confidence_score'],
                     'consensus_level': 'single_source',
                     'agreement_count': 1,
                 })
             else:
                 # Multiple sources - average numeric values
+                items = [item for _, item in members]
                 quantities = [i['quantity'] for i in items if i.get('quantity', 0) > 0]
                 unit_prices = [i['unit_price'] for i in items if i.get('unit_price', 0) > 0]
                 totals = [i['total_price'] for i in items if i.get('total_price', 0) > 0]
@@ -202,20 +1124,31 @@ class EnsembleCoordinator:
                 avg_total = sum(totals) / len(totals) if totals else 0
 
                 # Use item with highest confidence as base
-                best_item = max(items, key=lambda x: x['source_confidence'])
+                best_result, best_item = max(members, key=lambda member: member[0]['confidence_score'])
 
                 consensus_items.append({
                     **best_item,
+                    'source_parser': best_result['parser_name'],
+                    'source_confidence': best_result['confidence_score'],
                     'quantity': avg_qty or best_item['quantity'],
                     'unit_price': avg_price or best_item['unit_price'],
                     'total_price': avg_total or best_item['total_price'],
                     'consensus_level': 'multi_source_averaged',
-                    'agreement_count': len(items),
-                    'sources': [i['source_parser'] for i in items],
+                    'agreement_count': len(members),
+                    'sources': [result['parser_name'] for result, _ in members],
                 })
 
         return consensus_items
 
+    def _group_items(self, successful_results: List[Dict]) -> Dict[str, List[Tuple[Dict, Dict]]]:
+        """Group every parser's items by lower-cased description and quantity, in first-seen order."""
+        groups: Dict[str, List[Tuple[Dict, Dict]]] = {}
+        for result in successful_results:
+            for item in result['items']:
+                key = f"{item.get('description', '').lower().strip()}_{item.get('quantity', 0)}"
+                groups.setdefault(key, []).append((result, item))
+        return groups
+
     def _select_best_result(self, results: List[Dict]) -> Dict:
         """
         Select the best result from multiple parser outputs.
@@ -253,42 +1186,65 @@ class EnsembleCoordinator:
             return 1.0  # Perfect agreement if only one parser
 
         # Count items that appear in multiple parsers
-        item_keys = {}
-
-        for result in successful:
-            for item in result['items']:
-                desc = item.get('description', '').lower().strip()
-                qty = item.get('quantity', 0)
-                key = f"{desc}_{qty}"
-
-                if key not in item_keys:
-                    item_keys[key] = 0
-                item_keys[key] += 1
+        groups = self._group_items(successful)
 
         # Calculate percentage of items agreed upon by 2+ parsers
-        multi_source = sum(1 for count in item_keys.values() if count >= 2)
-        total_unique = len(item_keys)
+        multi_source = sum(1 for members in groups.values() if len(members) >= 2)
+        total_unique = len(groups)
 
         return multi_source / total_unique if total_unique > 0 else 0.0
 
-    def _parse_with_unstructured_wrapper(self, pdf_bytes: bytes, filename: str) -> Dict:
+    def _color_dpi(self, parsers_to_use: List[str]) -> Optional[int]:
+        """
+        The resolution at which OCR should take its grayscale pages from RGB
+        renders, because local Unstructured hi_res reads the same pages in
+        colour in this request (see parsers.raster_cache); None otherwise.
+        """
+        if 'ocr' not in parsers_to_use or 'unstructured' not in parsers_to_use or not self.unstructured_available:
+            return None
+        if os.getenv('UNSTRUCTURED_API_KEY') or os.getenv('UNSTRUCTURED_STRATEGY', 'triage') == 'fast':
+            return None
+        from .unstructured_parser import hi_res_dpi
+        return hi_res_dpi()
+
+    def _parse_with_unstructured_wrapper(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        pages: Optional[List[int]] = None
+    ) -> Dict:
         """
         Wrapper to make Unstructured.io parser compatible with ensemble interface
         """
-        import os
+        from .unstructured_parser import UNSTRUCTURED_AVAILABLE, parse_with_unstructured, extract_line_items_from_tables
+
         start_time = time.time()
 
         # Check if API key is available (for enterprise mode)
         api_key = os.getenv('UNSTRUCTURED_API_KEY')
         use_api = bool(api_key)
 
-        result = parse_with_unstructured(
-            pdf_bytes=pdf_bytes,
-            filename=filename,
-            use_api=use_api,
-            api_key=api_key,
-            strategy='auto'  # or 'hi_res' for complex layouts
-        )
+        strategy = os.getenv('UNSTRUCTURED_STRATEGY', 'triage')  # or 'auto', 'hi_res', 'fast'
+
+        if use_api or not UNSTRUCTURED_AVAILABLE or int(os.getenv('UNSTRUCTURED_PROCESSES', 1)) <= 0:
+            # API calls just wait on the network: no point shipping them to another process
+            result = parse_with_unstructured(pdf_bytes, filename, use_api, api_key, strategy, pages)
+        else:
+            try:
+                # The worker can't see this process's memory: share rendered pages through disk
+                with raster_scope(pdf_bytes) as rasters, span('unstructured.pool'):
+                    rasters.share()
+                    future = get_unstructured_executor().submit(
+                        parse_with_unstructured, pdf_bytes, filename, use_api, api_key, strategy, pages
+                    )
+                    result = future.result(timeout=PARSER_TIMEOUT_SECONDS)
+            except FutureTimeoutError:
+                # Frees the slot if it hasn't started; a running partition finishes in the worker
+                future.cancel()
+                result = {'success': False, 'error': f'Unstructured timed out after {PARSER_TIMEOUT_SECONDS}s'}
+            except BrokenProcessPool as e:
+                discard_unstructured_executor()
+                result = {'success': False, 'error': f'Unstructured worker died: {e}'}
 
         if not result['success']:
             return {
@@ -304,7 +1260,8 @@ class EnsembleCoordinator:
 
         # Convert Unstructured tables to line items
         tables = result.get('tables', [])
-        line_items = extract_line_items_from_tables(tables)
+        with span('unstructured.line_items'):
+            line_items = extract_line_items_from_tables(tables)
 
         # Convert to standard format
         items = []
@@ -0,0 +1,158 @@
+import os
+import threading
+import multiprocessing
+from typing import Callable, Dict, List
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+# Shared executors for the whole worker process. Every request submits into
+# the same pool so concurrent ensemble and batch requests are scheduled
+# together instead of each spinning up its own threads.
+_lock = threading.Lock()
+_parser_executor = None
+_process_executor = None
+_unstructured_executor = None
+
+# Queue depth / running counts for the parser executor, pushed to listeners
+# (e.g. the metrics module) on every change.
+_stats_lock = threading.Lock()
+_stats = {'queued': 0, 'running': 0}
+_stats_listeners: List[Callable[[int, int], None]] = []
+
+
+def add_stats_listener(listener: Callable[[int, int], None]):
+    """Register a callback receiving (queued, running) whenever they change."""
+    _stats_listeners.append(listener)
+
+
+def executor_stats() -> Dict[str, int]:
+    """Current queued and running parser task counts."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _adjust_stats(queued: int = 0, running: int = 0):
+    with _stats_lock:
+        _stats['queued'] += queued
+        _stats['running'] += running
+        snapshot = (_stats['queued'], _stats['running'])
+
+    for listener in _stats_listeners:
+        try:
+            listener(*snapshot)
+        except Exception:
+            pass
+
+
+class _InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that tracks how many tasks are queued vs running."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        def run():
+            _adjust_stats(queued=-1, running=1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _adjust_stats(running=-1)
+
+        _adjust_stats(queued=1)
+        try:
+            future = super().submit(run)
+        except Exception:
+            _adjust_stats(queued=-1)
+            raise
+
+        # Tasks cancelled before they started never reach run()
+        future.add_done_callback(lambda f: f.cancelled() and _adjust_stats(queued=-1))
+        return future
+
+
+def get_parser_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor used to run parsers."""
+    global _parser_executor
+
+    if _parser_executor is None:
+        with _lock:
+            if _parser_executor is None:
+                max_workers = int(os.getenv('PARSER_THREADS', (os.cpu_count() or 1) * 2 + 1))
+                _parser_executor = _InstrumentedThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='parser'
+                )
+    return _parser_executor
+
+
+def get_process_executor() -> ProcessPoolExecutor:
+    """
+    Return the process-wide pool used for CPU-bound work that would otherwise
+    serialise on the GIL (e.g. pdfplumber over many page chunks).
+    """
+    global _process_executor
+
+    if _process_executor is None:
+        with _lock:
+            if _process_executor is None:
+                max_workers = int(os.getenv('PARSER_PROCESSES', os.cpu_count() or 1))
+                # spawn avoids forking a process that already has parser threads running
+                context = multiprocessing.get_context(os.getenv('PARSER_PROCESS_START_METHOD', 'spawn'))
+                _process_executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+    return _process_executor
+
+
+def get_unstructured_executor() -> ProcessPoolExecutor:
+    """
+    Return the dedicated pool for local Unstructured partitioning. Its workers
+    load the layout models once at start-up and keep them, and hi_res
+    inference runs there instead of competing with the other parsers for
+    this process's GIL.
+    """
+    global _unstructured_executor
+
+    if _unstructured_executor is None:
+        with _lock:
+            if _unstructured_executor is None:
+                from .unstructured_parser import init_unstructured_worker
+
+                max_workers = int(os.getenv('UNSTRUCTURED_PROCESSES', 1))
+                context = multiprocessing.get_context(os.getenv('PARSER_PROCESS_START_METHOD', 'spawn'))
+                _unstructured_executor = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=context,
+                    initializer=init_unstructured_worker,
+                )
+    return _unstructured_executor
+
+
+def discard_unstructured_executor():
+    """Drop a broken Unstructured pool so the next caller gets a fresh one."""
+    global _unstructured_executor
+
+    with _lock:
+        if _unstructured_executor is not None:
+            _unstructured_executor.shutdown(wait=False, cancel_futures=True)
+            _unstructured_executor = None
+
+
+def discard_process_executor():
+    """Drop a broken process pool so the next caller gets a fresh one."""
+    global _process_executor
+
+    with _lock:
+        if _process_executor is not None:
+            _process_executor.shutdown(wait=False, cancel_futures=True)
+            _process_executor = None
+
+
+def shutdown_executors():
+    """Stop the shared pools (worker exit, benchmarks). They are recreated on next use."""
+    global _parser_executor, _process_executor, _unstructured_executor
+
+    with _lock:
+        if _parser_executor is not None:
+            _parser_executor.shutdown(wait=True)
+            _parser_executor = None
+        if _process_executor is not None:
+            _process_executor.shutdown(wait=True)
+            _process_executor = None
+        if _unstructured_executor is not None:
+            _unstructured_executor.shutdown(wait=True)
+            _unstructured_executor = None
@@ -0,0 +1,32 @@
+"""
+Columnar line items for the `items_format=columnar` response.
+
+Parsers return items as lists of dicts with the same five or six keys
+repeated on every row. `to_columns` sends them as one array per key
+instead, so long quotes don't repeat every key name on every row:
+
+    to_columns(result['items'])
+    # {'columns': ['description', ...], 'count': n, 'data': {'description': [...], ...}}
+
+Inside the service items stay lists of dicts. Extraction is already
+column-wise (one DataFrame per document in parsers.table_normalize) and
+only becomes dicts at frame_items(). Every later reader (consensus,
+routing, templates, outcomes, the response itself) takes the parser result
+contract of one dict per item, and consensus groups references to those
+dicts rather than copying them.
+"""
+
+from typing import Any, Dict, List
+
+
+def to_columns(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Column names (first-seen key order), row count and one array per column (null where absent)."""
+    columns: Dict[str, None] = {}
+    for item in items:
+        for key in item:
+            columns.setdefault(key)
+    return {
+        'columns': list(columns),
+        'count': len(items),
+        'data': {key: [item.get(key) for item in items] for key in columns},
+    }
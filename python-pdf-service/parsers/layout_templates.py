@@ -0,0 +1,283 @@
+"""
+Supplier layout templates.
+
+Repeat suppliers send the same quote layout every time. A layout is
+fingerprinted from its line-item header row (the header cells' words and x
+positions) and the PDF producer. After a confident ensemble run the
+service stores a template for it:
+
+- column cut points (x, in PDF points) between the header's columns, taken
+  from the empty bands between the data rows' words
+- which column holds which line-item field
+- the parser that won, its confidence and the document it was learned from
+
+A template is only stored when extracting the same document with it gives
+the winning parser's item count and line total. On a later document with
+the same fingerprint `TemplateParser` reads the words once with PyMuPDF,
+drops them into the cached columns and returns line items without table
+detection, header matching or any other parser.
+
+Templates live in LAYOUT_TEMPLATE_DIR (a PageStore: shared by all workers
+on the host, LRU in front).
+"""
+
+import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from .page_store import PageStore
+from .pages import visual_rows
+from .pymupdf_parser import PyMuPDFParser
+from .table_normalize import cell_fields
+
+# Bump when the shape of stored templates changes
+TEMPLATE_VERSION = 1
+
+# Header cells are matched with table_normalize.HEADER_MATCHER. A cell maps
+# to one field at most, so 'unit' is matched last ("Unit Price" is the rate,
+# not the unit)
+COLUMN_FIELDS = ('description', 'quantity', 'unit_price', 'total_price', 'unit')
+# Pages searched for the header row
+HEADER_SCAN_PAGES = 3
+# Words further apart than this (points) are in different header cells
+CELL_GAP = 12.0
+# Header positions are rounded to this many points in the fingerprint
+POSITION_QUANTUM = 5.0
+
+_FIGURE = re.compile(r'^\(?[$£€]?\d[\d,]*(?:\.\d+)?\)?$')
+_TOTALS = re.compile(r'\b(?:sub-?total|total|gst|vat|tax|balance|amount due)\b', re.IGNORECASE)
+_VERSION = re.compile(r'[\d.]+')
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def templates_enabled() -> bool:
+    return os.getenv('LAYOUT_TEMPLATES_ENABLED', 'false').lower() == 'true'
+
+
+def get_template_store() -> PageStore:
+    """The process-wide template store, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PageStore(
+                directory=os.getenv(
+                    'LAYOUT_TEMPLATE_DIR',
+                    os.path.join(tempfile.gettempdir(), 'pdf-parser-templates')
+                ),
+                ttl_seconds=int(os.getenv('LAYOUT_TEMPLATE_TTL_SECONDS', 90 * 24 * 3600)),
+                max_cached=256,
+                name='templates',
+            )
+        return _store
+
+
+def detect_layout(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """
+    The document's line-item header and layout fingerprint, or None when no
+    header row (description, total and one more field) is found on the first
+    HEADER_SCAN_PAGES pages. Returns {'fingerprint', 'producer', 'header':
+    [cell text], 'cells': [[x0, x1]], 'fields': {field: cell index},
+    'page', 'data_rows': [[word, ...]]} (data rows of the header's page,
+    for learning column cut points).
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        producer = _VERSION.sub('', (doc.metadata or {}).get('producer') or '').strip().lower()
+        for page_index in range(min(len(doc), HEADER_SCAN_PAGES)):
+            rows = visual_rows(doc[page_index])
+            for row_index, row in enumerate(rows):
+                cells = _cells(row)
+                fields = _fields([text for text, _, _ in cells])
+                if 'description' not in fields or 'total_price' not in fields or len(fields) < 3:
+                    continue
+
+                header = [text.lower() for text, _, _ in cells]
+                positions = [round(x0 / POSITION_QUANTUM) * POSITION_QUANTUM for _, x0, _ in cells]
+                key = f"{producer}|{'|'.join(header)}|{positions}"
+                return {
+                    'fingerprint': hashlib.blake2b(key.encode(), digest_size=16).hexdigest(),
+                    'producer': producer,
+                    'header': header,
+                    'cells': [[x0, x1] for _, x0, x1 in cells],
+                    'fields': fields,
+                    'page': page_index + 1,
+                    'data_rows': rows[row_index + 1:],
+                }
+    return None
+
+
+def build_template(layout: Dict[str, Any], best: Dict[str, Any], filename: str) -> Dict[str, Any]:
+    """A template for `layout`, with column cuts learned from its data rows."""
+    data_words = [
+        word for row in layout['data_rows']
+        if sum(1 for word in row if _FIGURE.match(word[4])) >= 2
+        for word in row
+    ]
+    cuts = []
+    cells = layout['cells']
+    for (_, left_x1), (right_x0, right_x1) in zip(cells, cells[1:]):
+        cuts.append(_widest_gap(data_words, left_x1, right_x1, default=right_x0 - 2.0))
+
+    return {
+        'version': TEMPLATE_VERSION,
+        'fingerprint': layout['fingerprint'],
+        'header': layout['header'],
+        'cuts': [round(cut, 1) for cut in cuts],
+        'fields': layout['fields'],
+        'parser': best['parser_name'],
+        'confidence': best['confidence_score'],
+        'learned_from': filename,
+        'created': time.time(),
+    }
+
+
+def same_extraction(result: Dict[str, Any], best: Dict[str, Any]) -> bool:
+    """Whether a template's result matches the winning parser's: item count and line total."""
+    if not result['items'] or len(result['items']) != len(best.get('items', [])):
+        return False
+    ours = sum(item['total_price'] for item in result['items'])
+    theirs = sum(item.get('total_price') or 0.0 for item in best['items'])
+    return abs(ours - theirs) <= max(0.01, 0.001 * abs(theirs))
+
+
+class TemplateParser:
+    """
+    Line items from a document with a known layout: PyMuPDF words dropped
+    into the template's columns. Rows are read from the header row until a
+    totals row; tables continue across page breaks.
+    """
+
+    def __init__(self):
+        self._text_parser = PyMuPDFParser()
+
+    def parse(
+        self,
+        pdf_bytes: bytes,
+        filename: str,
+        template: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Parse a whole document with a template."""
+        start_time = time.time()
+        try:
+            items, text, num_pages = self._extract(pdf_bytes, template)
+        except Exception as e:
+            return {
+                'parser_name': 'template',
+                'success': False,
+                'items': [],
+                'metadata': {},
+                'financials': {},
+                'confidence_score': 0.0,
+                'extraction_time_ms': int((time.time() - start_time) * 1000),
+                'errors': [str(e)]
+            }
+
+        supplier_info = self._text_parser._extract_supplier_info(text)
+        return {
+            'parser_name': 'template',
+            'success': True,
+            'items': items,
+            'metadata': {
+                'supplier_name': supplier_info.get('supplier_name', ''),
+                'quote_number': supplier_info.get('quote_number', ''),
+                'quote_date': supplier_info.get('quote_date', ''),
+                'num_pages': num_pages,
+                'pages': None,
+                'template': template['fingerprint'],
+            },
+            'financials': self._text_parser._extract_financials(text),
+            'confidence_score': template['confidence'] if items else 0.0,
+            'extraction_time_ms': int((time.time() - start_time) * 1000),
+        }
+
+    def _extract(self, pdf_bytes: bytes, template: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str, int]:
+        cuts = template['cuts']
+        fields = template['fields']
+        header = template['header']
+        column_count = len(cuts) + 1
+
+        items = []
+        text = []
+        in_table = False
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            num_pages = len(doc)
+            for page in doc:
+                text.append(page.get_text())
+                for row in visual_rows(page):
+                    cells = [[] for _ in range(column_count)]
+                    for word in row:
+                        cells[bisect_right(cuts, (word[0] + word[2]) / 2)].append(word[4])
+                    values = [' '.join(cell) for cell in cells]
+
+                    if [value.lower() for value in values] == header:
+                        in_table = True
+                        continue
+                    if not in_table:
+                        continue
+                    if _TOTALS.search(' '.join(values)):
+                        in_table = False
+                        continue
+
+                    item = {
+                        'line_number': len(items) + 1,
+                        'description': self._value(values, fields, 'description'),
+                        'quantity': self._number(values, fields, 'quantity'),
+                        'unit': self._value(values, fields, 'unit'),
+                        'unit_price': self._number(values, fields, 'unit_price'),
+                        'total_price': self._number(values, fields, 'total_price'),
+                    }
+                    if item['description'] and (item['quantity'] or item['unit_price'] or item['total_price']):
+                        items.append(item)
+
+        return items, '\n'.join(text), num_pages
+
+    def _value(self, values: List[str], fields: Dict[str, int], field: str) -> str:
+        index = fields.get(field, -1)
+        return values[index] if 0 <= index < len(values) else ''
+
+    def _number(self, values: List[str], fields: Dict[str, int], field: str) -> float:
+        return self._text_parser._parse_number(self._value(values, fields, field))
+
+
+def _cells(row: List[tuple]) -> List[Tuple[str, float, float]]:
+    """Words of a row joined into cells wherever the gap exceeds CELL_GAP: (text, x0, x1)."""
+    cells = []
+    for word in row:
+        if cells and word[0] - cells[-1][2] <= CELL_GAP:
+            text, x0, _ = cells[-1]
+            cells[-1] = (f'{text} {word[4]}', x0, word[2])
+        else:
+            cells.append((word[4], word[0], word[2]))
+    return cells
+
+
+def _fields(header: List[str]) -> Dict[str, int]:
+    """Field -> cell index for a header row; each cell maps to at most one field."""
+    named = [cell_fields(cell) for cell in header]
+    fields = {}
+    for field in COLUMN_FIELDS:
+        for index, cell in enumerate(named):
+            if index not in fields.values() and field in cell:
+                fields[field] = index
+                break
+    return fields
+
+
+def _widest_gap(words: List[tuple], start: float, end: float, default: float) -> float:
+    """Middle of the widest x band in [start, end] that no word covers, or `default`."""
+    spans = sorted((max(word[0], start), min(word[2], end)) for word in words if word[2] > start and word[0] < end)
+    best_width, best_cut = 0.0, default
+    cursor = start
+    for x0, x1 in spans + [(end, end)]:
+        if x0 - cursor > best_width:
+            best_width, best_cut = x0 - cursor, (cursor + x0) / 2
+        cursor = max(cursor, x1)
+    return best_cut
@@ -1,94 +1,54 @@
 import io
+import os
 import time
 import re
-from typing import Dict, List, Any
-from pdf2image import convert_from_bytes
+from typing import Dict, List, Any, Optional, Tuple
 import pytesseract
+import numpy as np
 from PIL import Image
 
+from .pages import select_pages
+from .raster_cache import RasterCache, raster_scope
+from .table_normalize import POSITIONAL_COLUMNS, frame_items, normalize_rows
+from .table_regions import detect_table_regions
+from .tracing import span
+
+# Per-page OCR decisions reported in metadata.page_dpi
+PAGE_REPORT_KEYS = ('page', 'dpi', 'confidence', 'numeric_quality', 'escalated', 'table_regions')
+
+# A number as it should read on a quote: 12, 1,250.00, $85.50, (15%), 2.5m
+_CLEAN_NUMBER = re.compile(r'^\(?[$£€]?(\d{1,3}(,\d{3})+|\d+)(\.\d+)?%?\)?[a-z]{0,2}[.,:;]?$')
+
+
 class OCRParser:
     """
     PDF parser using OCR (Tesseract) - for scanned or image-based PDFs.
     Best for documents that are actually images rather than text PDFs.
     """
 
-    def __init__(self):
+    def __init__(self, mode: Optional[str] = None):
         # Try to set tesseract path if needed
         # On some systems you may need: pytesseract.pytesseract.tesseract_cmd = r'/usr/bin/tesseract'
-        pass
-
-    def parse(self, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Parse PDF using OCR."""
+        self.dpi = int(os.getenv('OCR_DPI', 300))
+        # Tesseract binarises internally, so grayscale loses nothing and is a third of the pixels
+        self.grayscale = os.getenv('OCR_GRAYSCALE', 'true').lower() == 'true'
+
+        # "full": every page at OCR_DPI. "progressive": every page at OCR_LOW_DPI first,
+        # re-OCR'd at OCR_DPI only if its confidence or numeric quality is too low.
+        # "roi": ruled table areas found on an OCR_LOW_DPI render are OCR'd at OCR_DPI,
+        # the rest of the page (header, totals) at OCR_LOW_DPI.
+        self.mode = (mode or os.getenv('OCR_MODE', 'full')).lower()
+        self.low_dpi = int(os.getenv('OCR_LOW_DPI', 150))
+        self.min_confidence = float(os.getenv('OCR_MIN_CONFIDENCE', 80))
+        self.min_numeric_quality = float(os.getenv('OCR_MIN_NUMERIC_QUALITY', 0.9))
+
+    def parse(self, pdf_bytes: bytes, filename: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Parse PDF using OCR. `pages` limits parsing to those 1-based page numbers."""
         start_time = time.time()
 
         try:
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_bytes, dpi=300)
-            num_pages = len(images)
-
-            all_text = []
-            ocr_data = []
-
-            # Perform OCR on each page
-            for page_num, image in enumerate(images, 1):
-                # Get text with confidence scores
-                page_data = pytesseract.image_to_data(
-                    image,
-                    output_type=pytesseract.Output.DICT,
-                    config='--psm 6'  # Assume uniform block of text
-                )
-
-                # Combine text from page
-                page_text = pytesseract.image_to_string(image, config='--psm 6')
-                all_text.append(page_text)
-
-                # Store OCR data with confidence
-                confidences = [
-                    c for c in page_data['conf']
-                    if c != -1  # -1 means no text detected
-                ]
-                avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-
-                ocr_data.append({
-                    'page': page_num,
-                    'text': page_text,
-                    'confidence': avg_confidence,
-                    'word_count': len([w for w in page_data['text'] if w.strip()])
-                })
-
-            full_text = '\n'.join(all_text)
-
-            # Extract line items
-            line_items = self._extract_line_items_from_text(full_text)
-
-            # Extract financials
-            financials = self._extract_financials(full_text)
-
-            # Extract supplier info
-            supplier_info = self._extract_supplier_info(full_text)
-
-            # Calculate average OCR confidence
-            avg_ocr_confidence = sum(d['confidence'] for d in ocr_data) / len(ocr_data) if ocr_data else 0
-
-            extraction_time_ms = int((time.time() - start_time) * 1000)
-
-            return {
-                'parser_name': 'ocr',
-                'success': True,
-                'items': line_items,
-                'metadata': {
-                    'supplier_name': supplier_info.get('supplier_name', ''),
-                    'quote_number': supplier_info.get('quote_number', ''),
-                    'quote_date': supplier_info.get('quote_date', ''),
-                    'num_pages': num_pages,
-                    'ocr_confidence': avg_ocr_confidence,
-                    'total_words': sum(d['word_count'] for d in ocr_data),
-                },
-                'financials': financials,
-                'confidence_score': self._calculate_confidence(line_items, financials, avg_ocr_confidence),
-                'extraction_time_ms': extraction_time_ms,
-                'ocr_quality': 'high' if avg_ocr_confidence > 80 else 'medium' if avg_ocr_confidence > 60 else 'low',
-            }
+            content = self.extract_page_content(pdf_bytes, pages)
+            return self.build_result(content, pages, start_time)
 
         except Exception as e:
             extraction_time_ms = int((time.time() - start_time) * 1000)
@@ -103,18 +63,232 @@ class OCRParser:
                 'errors': [str(e)]
             }
 
+    @property
+    def content_version(self) -> str:
+        """Identifies settings that change page content (keys the page result store)."""
+        return (
+            f'ocr-{self.mode}-{self.dpi}-{self.low_dpi}-{int(self.grayscale)}'
+            f'-{self.min_confidence:g}-{self.min_numeric_quality:g}'
+        )
+
+    def extract_page_content(self, pdf_bytes: bytes, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """OCR the pages: text plus quality measures per page (no images are kept)."""
+        # Rasterise and get word-level OCR data (with DPI escalation in progressive mode)
+        page_results = self._ocr_pages(pdf_bytes, pages)
+        text_content = []
+
+        for page_result in page_results:
+            page_num = page_result['page']
+
+            # Combine text from page (ROI mode has already read its crops)
+            page_text = page_result.get('text')
+            if page_text is None:
+                with span('ocr.tesseract_text', page=page_num):
+                    page_text = pytesseract.image_to_string(page_result['image'], config='--psm 6')
+
+            text_content.append({
+                **{key: page_result[key] for key in PAGE_REPORT_KEYS if key in page_result},
+                'text': page_text,
+                'word_count': page_result['word_count'],
+            })
+
+        return {
+            'text_content': text_content,
+            'num_pages': len(page_results),
+        }
+
+    def build_result(
+        self,
+        content: Dict[str, Any],
+        pages: Optional[List[int]],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """Turn OCR'd page content into the standard parser result."""
+        ocr_data = content['text_content']
+        full_text = '\n'.join(d['text'] for d in ocr_data)
+
+        # Extract line items
+        with span('ocr.line_items'):
+            line_items = self._extract_line_items_from_text(full_text)
+
+        # Extract financials and supplier info (regex passes)
+        with span('ocr.regex'):
+            financials = self._extract_financials(full_text)
+            supplier_info = self._extract_supplier_info(full_text)
+
+        # Calculate average OCR confidence
+        avg_ocr_confidence = sum(d['confidence'] for d in ocr_data) / len(ocr_data) if ocr_data else 0
+
+        extraction_time_ms = int((time.time() - start_time) * 1000)
+
+        return {
+            'parser_name': 'ocr',
+            'success': True,
+            'items': line_items,
+            'metadata': {
+                'supplier_name': supplier_info.get('supplier_name', ''),
+                'quote_number': supplier_info.get('quote_number', ''),
+                'quote_date': supplier_info.get('quote_date', ''),
+                'num_pages': content['num_pages'],
+                'pages': pages,
+                'ocr_confidence': avg_ocr_confidence,
+                'total_words': sum(d['word_count'] for d in ocr_data),
+                'ocr_mode': self.mode,
+                'page_dpi': [
+                    {key: d[key] for key in PAGE_REPORT_KEYS if key in d}
+                    for d in ocr_data
+                ],
+            },
+            'financials': financials,
+            'confidence_score': self._calculate_confidence(line_items, financials, avg_ocr_confidence),
+            'extraction_time_ms': extraction_time_ms,
+            'ocr_quality': 'high' if avg_ocr_confidence > 80 else 'medium' if avg_ocr_confidence > 60 else 'low',
+        }
+
+    def _ocr_pages(self, pdf_bytes: bytes, pages: Optional[List[int]]) -> List[Dict[str, Any]]:
+        """
+        Rasterise the requested pages and run tesseract's word-level pass on each.
+        In progressive mode pages start at the low DPI and only the ones that
+        read badly are rendered and OCR'd again at full DPI.
+
+        Pages come from the request's raster cache, so an ensemble that also
+        runs Unstructured hi_res, or a second pass here, never renders a page
+        twice at the same resolution.
+        """
+        with raster_scope(pdf_bytes) as rasters:
+            page_numbers = select_pages(rasters.page_count, pages)
+            if self.mode == 'roi':
+                return self._ocr_pages_roi(rasters, page_numbers)
+
+            first_dpi = self.low_dpi if self.mode == 'progressive' else self.dpi
+            results = []
+            for page_num in page_numbers:
+                with span('ocr.rasterise', page=page_num, dpi=first_dpi):
+                    image = rasters.image(page_num, first_dpi, self.grayscale)
+                results.append(self._ocr_page_data(page_num, image, first_dpi))
+
+            if self.mode != 'progressive' or self.dpi <= first_dpi:
+                return results
+
+            for index, result in enumerate(results):
+                if self._needs_escalation(result):
+                    with span('ocr.rasterise', page=result['page'], dpi=self.dpi):
+                        image = rasters.image(result['page'], self.dpi, self.grayscale)
+                    results[index] = {**self._ocr_page_data(result['page'], image, self.dpi), 'escalated': True}
+            return results
+
+    def _ocr_pages_roi(self, rasters: RasterCache, page_numbers: List[int]) -> List[Dict[str, Any]]:
+        """
+        Region-of-interest OCR. Each page is rendered once at the low DPI to find
+        ruled tables; only those boxes are rendered and OCR'd at full DPI. The
+        low-res render, with the tables blanked out, is OCR'd for the header,
+        supplier details and totals. Pages with no ruled table get a full-page
+        pass at full DPI, same as full mode.
+        """
+        results = []
+        for page_num in page_numbers:
+            with span('ocr.layout', page=page_num, dpi=self.low_dpi):
+                low_res = rasters.array(page_num, self.low_dpi, grayscale=True)
+                regions = detect_table_regions(low_res, self.low_dpi)
+
+            if not regions:
+                with span('ocr.rasterise', page=page_num, dpi=self.dpi):
+                    image = rasters.image(page_num, self.dpi, self.grayscale)
+                results.append({**self._ocr_page_data(page_num, image, self.dpi), 'table_regions': 0})
+                continue
+
+            # Tables at full resolution, top to bottom
+            parts = []
+            for region in regions:
+                with span('ocr.rasterise', page=page_num, dpi=self.dpi, region=True):
+                    crop = rasters.render_clip(page_num, self.dpi, region, self.grayscale)
+                parts.append(self._ocr_page_data(page_num, crop, self.dpi))
+
+            # Everything else at low resolution, with the tables painted white
+            scale = self.low_dpi / 72.0
+            rest = np.array(low_res)
+            for x0, y0, x1, y1 in regions:
+                rest[int(y0 * scale):int(y1 * scale) + 1, int(x0 * scale):int(x1 * scale) + 1] = 255
+            parts.append(self._ocr_page_data(page_num, Image.fromarray(rest), self.low_dpi))
+
+            for part in parts:
+                with span('ocr.tesseract_text', page=page_num):
+                    part['text'] = pytesseract.image_to_string(part['image'], config='--psm 6')
+
+            results.append(self._merge_parts(page_num, parts, len(regions)))
+        return results
+
+    def _merge_parts(self, page_num: int, parts: List[Dict[str, Any]], table_regions: int) -> Dict[str, Any]:
+        """Combine ROI crops of one page into a single page result, weighting by word count."""
+        words = sum(p['word_count'] for p in parts)
+
+        def weighted(key: str) -> float:
+            if not words:
+                return 0 if key == 'confidence' else 1.0
+            return sum(p[key] * p['word_count'] for p in parts) / words
+
+        # Header/footer text first so supplier details read in page order, then the tables
+        text = '\n'.join([parts[-1]['text']] + [p['text'] for p in parts[:-1]])
+        return {
+            'page': page_num,
+            'text': text,
+            'dpi': self.dpi,
+            'confidence': weighted('confidence'),
+            'numeric_quality': weighted('numeric_quality'),
+            'word_count': words,
+            'escalated': False,
+            'table_regions': table_regions,
+        }
+
+    def _ocr_page_data(self, page_num: int, image: Image.Image, dpi: int) -> Dict[str, Any]:
+        """Word-level tesseract pass for one page image, with its quality measures."""
+        with span('ocr.tesseract_data', page=page_num, dpi=dpi):
+            page_data = pytesseract.image_to_data(
+                image,
+                output_type=pytesseract.Output.DICT,
+                config='--psm 6'  # Assume uniform block of text
+            )
+
+        confidences = [
+            float(c) for c in page_data['conf']
+            if float(c) != -1  # -1 means no text detected
+        ]
+        words = [w for w in page_data['text'] if w.strip()]
+
+        return {
+            'page': page_num,
+            'image': image,
+            'dpi': dpi,
+            'confidence': sum(confidences) / len(confidences) if confidences else 0,
+            'numeric_quality': self._numeric_quality(words),
+            'word_count': len(words),
+            'escalated': False,
+        }
+
+    def _numeric_quality(self, words: List[str]) -> float:
+        """
+        Share of number-like tokens that read as clean numbers. Low resolution
+        tends to garble digits first ("1,2S0.0O"), which wrecks prices even
+        when the mean confidence looks fine.
+        """
+        numeric = [w for w in words if sum(ch.isdigit() for ch in w) >= max(1, len(w) // 2)]
+        if not numeric:
+            return 1.0
+        clean = sum(1 for w in numeric if _CLEAN_NUMBER.match(w))
+        return clean / len(numeric)
+
+    def _needs_escalation(self, page_result: Dict[str, Any]) -> bool:
+        return (page_result['confidence'] < self.min_confidence
+                or page_result['numeric_quality'] < self.min_numeric_quality)
+
     def _extract_line_items_from_text(self, text: str) -> List[Dict]:
         """Extract line items using regex patterns."""
-        line_items = []
-
         # Flexible pattern for line items
         # Handles: "Description 10 m2 50.00 500.00"
         pattern = r'(.+?)\s+(\d+(?:\.\d+)?)\s+([a-zA-Z²³]+)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)'
 
-        lines = text.split('\n')
-        line_number = 0
-
-        for line in lines:
+        rows = []
+        for line in text.split('\n'):
             line = line.strip()
             if not line or len(line) < 10:
                 continue
@@ -122,18 +296,9 @@ class OCRParser:
             # Try to match pattern
             match = re.search(pattern, line)
             if match:
-                line_number += 1
-                try:
-                    line_items.append({
-                        'line_number': line_number,
-                        'description': match.group(1).strip(),
-                        'quantity': float(match.group(2)),
-                        'unit': match.group(3),
-                        'unit_price': self._parse_number(match.group(4)),
-                        'total_price': self._parse_number(match.group(5)),
-                    })
-                except Exception:
-                    continue
+                rows.append(match.groups())
+
+        line_items = frame_items(normalize_rows([(rows, POSITIONAL_COLUMNS)], require_values=False, ocr_digits=True))
 
         # Fallback: try simpler patterns
         if len(line_items) < 3:
@@ -0,0 +1,306 @@
+"""
+Parser outcomes per kind of document, and parser selection learned from them.
+
+Every fresh ensemble run made for /parse/smart records compact features of
+the document (computed once, for the plan) next to how each parser did on
+it:
+
+- features: PDF producer, page count, share of pages with a text layer,
+  ruling density (line and rectangle drawings per page, a proxy for ruled
+  tables) and a supplier fingerprint (hash of the first words on page 1)
+- per parser: success, confidence, item count and latency, plus the
+  ensemble's cross-parser agreement
+
+`choose_parsers` is a k-nearest-neighbour model over those records: for a
+new document it looks at the most similar earlier ones and picks the
+cheapest parser set (PARSER_COSTS) whose best confidence reached
+SMART_TARGET_CONFIDENCE on at least SMART_MIN_SUCCESS_RATE of them. Too
+little history, or an exploration draw (SMART_EXPLORE_RATE, so cheap sets
+keep being checked against the full ensemble), means every available
+parser runs.
+
+Records live in OUTCOME_STORE_DIR, one file each, shared by all workers on
+the host; each process keeps them in memory and picks up new ones on lookup
+(the directory is only listed again once its mtime changes). Beyond
+OUTCOME_MAX_RECORDS the oldest files are deleted.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import tempfile
+import threading
+from itertools import combinations
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+from .store_dir import StoreDirectory
+
+# Relative cost of running a parser once (cloud parsers are billed per page)
+PARSER_COSTS = {
+    'pdfplumber': 1.0,
+    'pymupdf': 1.0,
+    'unstructured': 3.0,
+    'ocr': 5.0,
+    'textract': 10.0,
+    'docai': 10.0,
+}
+DEFAULT_PARSER_COST = 5.0
+
+# Pages sampled for ruling density (get_drawings is the slowest feature)
+RULING_SAMPLE_PAGES = 3
+# Pages with fewer words than this count as having no text layer
+MIN_TEXT_WORDS = 20
+SUPPLIER_WORDS = 8
+
+_WORD = re.compile(r'[a-z]{2,}')
+_VERSION = re.compile(r'[\d.]+')
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def outcome_learning_enabled() -> bool:
+    return os.getenv('OUTCOME_LEARNING_ENABLED', 'true').lower() == 'true'
+
+
+def document_features(pdf_bytes: bytes) -> Dict[str, Any]:
+    """Compact features of a PDF from one PyMuPDF pass (no rendering)."""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_count = len(doc)
+        text_pages = 0
+        first_words = []
+        for index, page in enumerate(doc):
+            words = page.get_text('words')
+            if len(words) >= MIN_TEXT_WORDS:
+                text_pages += 1
+            if index == 0:
+                first_words = [w for w in (_WORD.fullmatch(word[4].lower()) for word in words) if w]
+
+        sampled = min(page_count, RULING_SAMPLE_PAGES)
+        rulings = sum(
+            1
+            for page_num in range(sampled)
+            for drawing in doc[page_num].get_drawings()
+            for item in drawing['items']
+            if item[0] in ('l', 're')
+        )
+        producer = _VERSION.sub('', (doc.metadata or {}).get('producer') or '').strip().lower()
+
+    supplier_text = ' '.join(match.group(0) for match in first_words[:SUPPLIER_WORDS])
+    return {
+        'producer': producer,
+        'page_count': page_count,
+        'text_ratio': round(text_pages / page_count, 3) if page_count else 0.0,
+        'ruling_density': round(rulings / sampled, 2) if sampled else 0.0,
+        'supplier': hashlib.blake2b(supplier_text.encode(), digest_size=8).hexdigest() if supplier_text else '',
+    }
+
+
+def feature_distance(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Distance between two documents' features; 0 is identical."""
+    distance = abs(math.log1p(a['page_count']) - math.log1p(b['page_count']))
+    distance += 2.0 * abs(a['text_ratio'] - b['text_ratio'])
+    distance += abs(math.log1p(a['ruling_density']) - math.log1p(b['ruling_density'])) / 2.0
+    distance += 0.0 if a['producer'] == b['producer'] else 0.5
+    distance += 0.0 if a['supplier'] and a['supplier'] == b['supplier'] else 1.0
+    return distance
+
+
+def outcome_record(features: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    """What is kept from an ensemble response: per-parser outcomes and agreement."""
+    return {
+        'features': features,
+        'parsers': {
+            result['parser_name']: {
+                'success': result['success'],
+                'confidence': round(result['confidence_score'], 3),
+                'items': len(result.get('items', [])),
+                'time_ms': result.get('extraction_time_ms', 0),
+            }
+            for result in response['all_results']
+        },
+        'agreement': round(response['confidence_breakdown']['cross_model_agreement'], 3),
+        'created': time.time(),
+    }
+
+
+class OutcomeStore:
+    """Outcome records on disk (one file each) with every record held in memory."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_records: Optional[int] = None
+    ):
+        self.directory = directory or os.getenv(
+            'OUTCOME_STORE_DIR',
+            os.path.join(tempfile.gettempdir(), 'pdf-parser-outcomes')
+        )
+        self.ttl_seconds = ttl_seconds or int(os.getenv('OUTCOME_TTL_SECONDS', 90 * 24 * 3600))
+        self.max_records = max_records or int(os.getenv('OUTCOME_MAX_RECORDS', 5000))
+        self._records = {}
+        self._lock = threading.Lock()
+        self._seen_mtime = None
+        self._files = StoreDirectory(self.directory, self.ttl_seconds)
+
+    def add(self, record: Dict[str, Any]):
+        self._prune()
+        name = f"{int(record['created'] * 1000)}-{os.getpid()}-{random.getrandbits(32):08x}.json"
+        try:
+            self._files.write(os.path.join(self.directory, name), json.dumps(record).encode('utf-8'))
+        except OSError:
+            pass  # The in-process copy still serves this worker
+        self._remember(name, record)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Every record, newest last, including those other workers have written."""
+        self._refresh()
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            return [record for record in self._records.values() if record['created'] >= cutoff]
+
+    def _refresh(self):
+        try:
+            # Adding or deleting a record file bumps the directory's mtime
+            mtime = os.stat(self.directory).st_mtime_ns
+            if mtime == self._seen_mtime:
+                return
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return
+        self._seen_mtime = mtime
+
+        for name in sorted(names)[-self.max_records:]:
+            if name in self._records:
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    record = json.loads(f.read())
+            except (OSError, ValueError):
+                continue
+            self._remember(name, record)
+
+    def _remember(self, name: str, record: Dict[str, Any]):
+        with self._lock:
+            self._records[name] = record
+            if len(self._records) > self.max_records:
+                # File names start with the creation time, so the oldest sort first
+                for stale in sorted(self._records)[:len(self._records) - self.max_records]:
+                    del self._records[stale]
+
+    def _prune(self):
+        """Delete records older than the TTL and the oldest beyond max_records (at most every few minutes)."""
+        kept = self._files.prune()
+        if kept is None:
+            return
+
+        records = sorted(name for name in kept if name.endswith('.json'))
+        # File names start with the creation time, so the oldest sort first
+        for name in records[:max(0, len(records) - self.max_records)]:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                continue
+
+
+def get_outcome_store() -> OutcomeStore:
+    """The process-wide outcome store, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OutcomeStore()
+        return _store
+
+
+def choose_parsers(
+    features: Optional[Dict[str, Any]],
+    available: List[str],
+    records: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    The cheapest parser set likely to reach the target confidence on this
+    document, from its nearest neighbours in `records`. Returns the plan:
+    {'parsers', 'reason', 'success_rate', 'neighbours', 'cost',
+    'expected_time_ms', 'target_confidence'}; reason is 'predicted',
+    'insufficient_history' or 'exploration' (the last two run `available`).
+    Without features (unreadable PDF) there is no history to go on.
+    """
+    target = float(os.getenv('SMART_TARGET_CONFIDENCE', 0.7))
+    min_rate = float(os.getenv('SMART_MIN_SUCCESS_RATE', 0.8))
+    k = int(os.getenv('SMART_NEIGHBOURS', 15))
+    min_support = int(os.getenv('SMART_MIN_SUPPORT', 3))
+    max_distance = float(os.getenv('SMART_MAX_DISTANCE', 1.5))
+
+    neighbours = sorted(
+        (
+            (feature_distance(features, record['features']), record)
+            for record in (records if features else [])
+            if record['features'].get('page_count') is not None
+        ),
+        key=lambda pair: pair[0]
+    )
+    neighbours = [(distance, record) for distance, record in neighbours[:k] if distance <= max_distance]
+
+    plan = {
+        'parsers': list(available),
+        'reason': 'insufficient_history',
+        'success_rate': None,
+        'neighbours': len(neighbours),
+        'cost': _cost(available),
+        'expected_time_ms': None,
+        'target_confidence': target,
+    }
+    if random.random() < float(os.getenv('SMART_EXPLORE_RATE', 0.05)):
+        plan['reason'] = 'exploration'
+        return plan
+
+    candidates = [
+        list(subset)
+        for size in range(1, len(available) + 1)
+        for subset in combinations(available, size)
+    ]
+    for subset in sorted(candidates, key=_cost):
+        # Only neighbours where every parser in the set ran say anything about it
+        seen = [
+            (distance, record) for distance, record in neighbours
+            if all(name in record['parsers'] for name in subset)
+        ]
+        if len(seen) < min_support:
+            continue
+        weights = [1.0 / (1.0 + distance) for distance, _ in seen]
+        hits = [
+            max(record['parsers'][name]['confidence'] if record['parsers'][name]['success'] else 0.0 for name in subset) >= target
+            for _, record in seen
+        ]
+        success_rate = sum(w for w, hit in zip(weights, hits) if hit) / sum(weights)
+        if success_rate < min_rate:
+            continue
+        plan.update({
+            'parsers': subset,
+            'reason': 'predicted',
+            'success_rate': round(success_rate, 3),
+            'cost': _cost(subset),
+            # Parsers in a set run in parallel: the slowest one sets the pace
+            'expected_time_ms': int(max(
+                _median([record['parsers'][name]['time_ms'] for _, record in seen]) for name in subset
+            )),
+        })
+        return plan
+    return plan
+
+
+def _cost(parsers: List[str]) -> float:
+    return sum(PARSER_COSTS.get(name, DEFAULT_PARSER_COST) for name in parsers)
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
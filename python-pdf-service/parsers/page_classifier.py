@@ -0,0 +1,135 @@
+"""
+Fast page classification from PyMuPDF text features.
+
+A passive-fire quote is typically a cover letter, a few pages of priced
+line items, a totals block and several pages of terms, conditions and
+exclusions. Each page is labelled from its text layer in one PyMuPDF pass
+(no rendering):
+
+- `priced_table`: at least PRICED_LINES_MIN lines carrying a money amount
+  and another figure (qty, rate, total)
+- `totals`: a subtotal / GST / total line with an amount
+- `terms`: terms & conditions, exclusions and similar boilerplate
+- `narrative`: other text (cover letters, scope notes)
+- `scanned`: little or no text but an image over most of the page
+- `blank`: nothing to read
+
+`EnsembleCoordinator` sends only relevant pages (RELEVANT_LABELS, plus a
+narrative first page for the supplier's details) to the parsers that are
+billed or slow per page, and returns the labels so downstream chunking can
+skip the same pages.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+from .pages import select_pages, visual_rows
+
+LABELS = ('priced_table', 'totals', 'terms', 'narrative', 'scanned', 'blank')
+RELEVANT_LABELS = ('priced_table', 'totals', 'scanned')
+# Labels of pages that may hold the line items
+ITEM_LABELS = ('priced_table', 'scanned')
+
+PRICED_LINES_MIN = 3
+# Share of words that must be terms vocabulary for a page of prose to count as T&C
+TERMS_DENSITY_MIN = 0.03
+# Share of the page an image must cover for a near-textless page to count as scanned
+SCANNED_COVERAGE_MIN = 0.5
+MIN_WORDS = 5
+
+# An amount with cents, a currency symbol or thousands separators ("150.00",
+# "$150", "1,500"); bare whole numbers are quantities or item numbers
+_MONEY = re.compile(
+    r'^\(?(?:[$£€](?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{2})?'
+    r'|(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{2}'
+    r'|\d{1,3}(?:,\d{3})+)\)?$'
+)
+_FIGURE = re.compile(r'^\(?[$£€]?\d[\d,]*(?:\.\d+)?%?\)?[a-z]{0,3}[.,:;]?$', re.IGNORECASE)
+_TOTALS = re.compile(r'\b(?:sub-?total|total|gst|vat|tax|balance|amount due)\b', re.IGNORECASE)
+_TERMS = re.compile(
+    r'^(?:terms?|conditions?|liabilit\w*|warrant\w*|indemn\w*|exclu\w*|exclusions?|payment|'
+    r'variations?|valid\w*|retentions?|jurisdiction|insurance|defects?|quotation|contractor|'
+    r'accordance|approved|charged|invoice|disputes?|governed|obligations?)$',
+    re.IGNORECASE
+)
+_TERMS_HEADING = re.compile(r'terms\s*(?:&|and)\s*conditions|exclusions|general conditions', re.IGNORECASE)
+
+
+def classifier_enabled() -> bool:
+    return os.getenv('PAGE_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+
+
+def relevant_labels() -> List[str]:
+    configured = os.getenv('PAGE_CLASSIFIER_RELEVANT', '')
+    return [label.strip() for label in configured.split(',') if label.strip()] or list(RELEVANT_LABELS)
+
+
+def classify_pages(pdf_bytes: bytes, pages: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    One record per page: {'page', 'label', 'relevant', 'words',
+    'numeric_density', 'priced_lines'}.
+    """
+    labels = relevant_labels()
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        records = []
+        for page_num in select_pages(len(doc), pages):
+            record = classify_page(doc[page_num - 1])
+            record['relevant'] = record['label'] in labels
+            records.append({'page': page_num, **record})
+    return records
+
+
+def classify_page(page: fitz.Page) -> Dict[str, Any]:
+    """Label one page from its words, lines and image coverage."""
+    lines = [[word[4] for word in row] for row in visual_rows(page)]
+    words = [word for line in lines for word in line]
+
+    figures = sum(1 for word in words if _FIGURE.match(word))
+    priced_lines = 0
+    totals_lines = 0
+    for line in lines:
+        money = sum(1 for word in line if _MONEY.match(word))
+        if not money:
+            continue
+        if money + sum(1 for word in line if _FIGURE.match(word) and not _MONEY.match(word)) >= 2:
+            priced_lines += 1
+        if _TOTALS.search(' '.join(line)):
+            totals_lines += 1
+
+    features = {
+        'words': len(words),
+        'numeric_density': round(figures / len(words), 3) if words else 0.0,
+        'priced_lines': priced_lines,
+    }
+
+    coverage = _image_coverage(page) if priced_lines < PRICED_LINES_MIN else 0.0
+    if coverage >= SCANNED_COVERAGE_MIN:
+        label = 'scanned'
+    elif len(words) < MIN_WORDS:
+        label = 'blank'
+    elif priced_lines >= PRICED_LINES_MIN:
+        label = 'priced_table'
+    elif totals_lines:
+        label = 'totals'
+    elif _is_terms(lines, words):
+        label = 'terms'
+    else:
+        label = 'narrative'
+    return {'label': label, **features}
+
+
+def _is_terms(lines: List[List[str]], words: List[str]) -> bool:
+    heading = ' '.join(' '.join(line) for line in lines[:3])
+    if _TERMS_HEADING.search(heading):
+        return True
+    hits = sum(1 for word in words if _TERMS.match(word.strip('.,;:()')))
+    return hits / len(words) >= TERMS_DENSITY_MIN
+
+
+def _image_coverage(page: fitz.Page) -> float:
+    page_area = abs(page.rect) or 1.0
+    covered = max((abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info()), default=0.0)
+    return covered / page_area
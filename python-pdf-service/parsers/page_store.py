@@ -0,0 +1,165 @@
+"""
+Page-level result store for incremental re-parsing.
+
+Suppliers often send a revised quote in which only a page or two changed.
+Parsers that split extraction from result building (`extract_page_content`
++ `build_result`: pdfplumber, PyMuPDF, OCR) have their extracted content
+stored per page, keyed by the page's content fingerprint
+(pages.page_fingerprints). When a revision arrives only pages with new
+fingerprints are extracted; the rest come from the store, and line items,
+financials and (in the coordinator) consensus are rebuilt over the merged
+content.
+
+Entries live in PAGE_STORE_DIR (shared by all workers on a host, like the
+document store) behind a small in-process LRU. They hold the documents' text
+and tables on disk for PAGE_STORE_TTL_SECONDS, so the store is off unless
+PAGE_STORE_ENABLED=true.
+
+    store = get_page_store()
+    entry = store.get(page_key('pdfplumber', fingerprint))
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .cache_stats import record_lookup
+from .store_dir import StoreDirectory
+
+# Bump when the shape of stored page content changes
+PAGE_STORE_VERSION = 1
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def page_store_enabled() -> bool:
+    return os.getenv('PAGE_STORE_ENABLED', 'false').lower() == 'true'
+
+
+def page_key(content_version: str, fingerprint: str) -> str:
+    """Store key for one page as extracted by one parser configuration."""
+    return f'v{PAGE_STORE_VERSION}:{content_version}:{fingerprint}'
+
+
+class PageStore:
+    """Per-page extracted content, on disk with an in-process LRU in front."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        max_cached: Optional[int] = None,
+        name: str = 'pages'
+    ):
+        # Cache label in the lookup metrics
+        self.name = name
+        self.directory = directory or os.getenv(
+            'PAGE_STORE_DIR',
+            os.path.join(tempfile.gettempdir(), 'pdf-parser-pages')
+        )
+        self.ttl_seconds = ttl_seconds or int(os.getenv('PAGE_STORE_TTL_SECONDS', 7 * 24 * 3600))
+        self.max_cached = max_cached or int(os.getenv('PAGE_STORE_CACHE_SIZE', 2048))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._files = StoreDirectory(self.directory, self.ttl_seconds)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored content for a page key, or None."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        if entry is not None:
+            record_lookup(self.name, True)
+            return entry
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            record_lookup(self.name, False)
+            return None
+
+        record_lookup(self.name, True)
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        self._files.prune()
+        self._remember(key, entry)
+        try:
+            self._files.write(self._path(key), json.dumps(entry, default=str).encode('utf-8'))
+        except OSError:
+            pass  # The in-process copy still serves this worker
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest()[:40] + '.json')
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+
+def get_page_store() -> PageStore:
+    """The process-wide page store, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PageStore()
+        return _store
+
+
+def split_content(content: Dict[str, Any], page_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Cut a parser's extracted content into one entry per page. List values
+    (tables, text, blocks, ...) are split by each element's 'page'; anything
+    else (document metadata) is kept in every entry under 'document'.
+    """
+    document = {
+        key: value for key, value in content.items()
+        if not isinstance(value, list) and key != 'num_pages'
+    }
+    entries = {page: {'document': document} for page in page_numbers}
+    for key, value in content.items():
+        if not isinstance(value, list):
+            continue
+        for entry in entries.values():
+            entry[key] = []
+        for element in value:
+            entry = entries.get(element.get('page'))
+            if entry is not None:
+                entry[key].append(element)
+    return entries
+
+
+def merge_content(
+    entries: List[Dict[str, Any]],
+    page_numbers: List[int],
+    document: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Rebuild parser content from per-page entries in page order. Elements get
+    their page number in this document (a reused page may have moved).
+    Document-level fields come from `document` (fresh from this revision
+    when any page was extracted), else from the first entry.
+    """
+    content = {}
+    for entry, page in zip(entries, page_numbers):
+        for key, value in entry.items():
+            if key != 'document':
+                content.setdefault(key, []).extend({**element, 'page': page} for element in value)
+    if document is None and entries:
+        document = entries[0]['document']
+    content.update(document or {})
+    content['num_pages'] = len(page_numbers)
+    return content
@@ -0,0 +1,157 @@
+import re
+import hashlib
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+_RANGE_PATTERN = re.compile(r'^(\d+)\s*(?:-\s*(\d+))?$')
+
+# Words whose baselines are this close (points) are on the same visual row
+ROW_TOLERANCE = 3.0
+
+
+def parse_page_spec(spec: Optional[str]) -> Optional[List[int]]:
+    """
+    Parse a page range string such as "1-3,5" into sorted 1-based page numbers.
+    Returns None when no spec is given (meaning every page).
+    """
+    if spec is None or not str(spec).strip():
+        return None
+
+    pages = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        match = _RANGE_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Invalid page range: '{part}'")
+
+        first = int(match.group(1))
+        last = int(match.group(2)) if match.group(2) else first
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: '{part}'")
+        pages.update(range(first, last + 1))
+
+    return sorted(pages)
+
+
+def select_pages(num_pages: int, pages: Optional[List[int]]) -> List[int]:
+    """Return the 1-based page numbers to parse, dropping any past the end of the document."""
+    if pages is None:
+        return list(range(1, num_pages + 1))
+    return [p for p in pages if 1 <= p <= num_pages]
+
+
+def visual_rows(page: fitz.Page, tolerance: float = ROW_TOLERANCE) -> List[List[tuple]]:
+    """
+    The page's words (PyMuPDF word tuples) grouped into visual rows by
+    baseline, top to bottom and left to right within a row. Table cells are
+    often separate text lines in the PDF, so PyMuPDF's own line numbers
+    split rows apart.
+    """
+    rows = []
+    row_baseline = None
+    for word in sorted(page.get_text('words'), key=lambda w: (w[3], w[0])):
+        if row_baseline is None or word[3] - row_baseline > tolerance:
+            rows.append([])
+            row_baseline = word[3]
+        rows[-1].append(word)
+    return [sorted(row, key=lambda w: w[0]) for row in rows]
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    """Return the page count of a PDF."""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return len(doc)
+
+
+def page_fingerprints(pdf_bytes: bytes) -> List[str]:
+    """
+    One content hash per page: its content stream plus the resources it draws
+    (images and form XObjects by their stream bytes, fonts by name), the page
+    size and rotation. Unchanged pages of a revised PDF keep their
+    fingerprint even when they move or the file's object numbers change.
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [_page_fingerprint(doc, page) for page in doc]
+
+
+def _page_fingerprint(doc: fitz.Document, page: fitz.Page) -> str:
+    digest = hashlib.sha256()
+    digest.update(f'{tuple(page.mediabox)}|{tuple(page.cropbox)}|{page.rotation}'.encode())
+    digest.update(page.read_contents())
+
+    # Resources are hashed in name order; object numbers differ between revisions
+    streams = [(image[7], image[0]) for image in page.get_images(full=True)]
+    streams += [(xobject[1], xobject[0]) for xobject in page.get_xobjects()]
+    for name, xref in sorted(streams):
+        digest.update(name.encode())
+        digest.update(doc.xref_stream_raw(xref) or b'')
+    for font in sorted(page.get_fonts(full=True), key=lambda font: font[4]):
+        digest.update('|'.join(str(part) for part in font[1:6]).encode())
+
+    return digest.hexdigest()
+
+
+def extract_pages_pdf(pdf_bytes: bytes, pages: Optional[List[int]]) -> bytes:
+    """
+    Build a smaller PDF containing only the requested pages.
+    Used by parsers that can only be handed a whole document (cloud APIs).
+    """
+    return extract_pages(pdf_bytes, pages)[0]
+
+
+def extract_pages(pdf_bytes: bytes, pages: Optional[List[int]]) -> Tuple[bytes, Optional[List[int]]]:
+    """
+    extract_pages_pdf plus the original page number of each page of the new
+    PDF, for mapping page numbers reported on it back (None when the whole
+    document is returned unchanged).
+    """
+    if pages is None:
+        return pdf_bytes, None
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as src:
+        selected = select_pages(len(src), pages)
+        if len(selected) == len(src):
+            return pdf_bytes, None
+
+        dst = fitz.open()
+        for page_num in selected:
+            dst.insert_pdf(src, from_page=page_num - 1, to_page=page_num - 1)
+        data = dst.tobytes(garbage=3, deflate=True)
+        dst.close()
+
+    return data, selected
+
+
+def original_page(page_numbers: Optional[List[int]], page: int) -> int:
+    """A 1-based page number of an extract_pages() PDF as a page of the original document."""
+    return page_numbers[page - 1] if page_numbers else page
+
+
+def split_pdf(
+    pdf_bytes: bytes,
+    chunk_size: int,
+    pages: Optional[List[int]] = None
+) -> List[Tuple[List[int], bytes]]:
+    """
+    Split a PDF into sub-PDFs of at most `chunk_size` pages.
+    Returns (original 1-based page numbers, chunk bytes) pairs in page order.
+    """
+    chunks = []
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as src:
+        selected = select_pages(len(src), pages)
+
+        step = max(1, chunk_size)
+        for offset in range(0, len(selected), step):
+            page_numbers = selected[offset:offset + step]
+            dst = fitz.open()
+            dst.set_metadata(src.metadata or {})
+            for page_num in page_numbers:
+                dst.insert_pdf(src, from_page=page_num - 1, to_page=page_num - 1)
+            chunks.append((page_numbers, dst.tobytes(deflate=True)))
+            dst.close()
+
+    return chunks
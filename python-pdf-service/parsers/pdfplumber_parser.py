@@ -2,7 +2,26 @@ import io
 import time
 import pdfplumber
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from .table_normalize import frame_items, header_tables, match_header, normalize_rows
+from .tracing import span
+
+
+def extract_chunk_content(chunk_bytes: bytes, page_numbers: List[int]) -> Dict[str, Any]:
+    """
+    Process-pool entry point for chunked parsing: extract one sub-PDF and map
+    its page numbers back to the pages of the original document.
+    """
+    content = PDFPlumberParser().extract_page_content(chunk_bytes)
+
+    for table in content['tables']:
+        table['page'] = page_numbers[table['page'] - 1]
+    for page_text in content['text_content']:
+        page_text['page'] = page_numbers[page_text['page'] - 1]
+
+    return content
+
 
 class PDFPlumberParser:
     """
@@ -10,78 +29,13 @@ class PDFPlumberParser:
     Best for well-structured quotes with clear table layouts.
     """
 
-    def parse(self, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Parse PDF using pdfplumber."""
+    def parse(self, pdf_bytes: bytes, filename: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Parse PDF using pdfplumber. `pages` limits parsing to those 1-based page numbers."""
         start_time = time.time()
 
         try:
-            pdf_file = io.BytesIO(pdf_bytes)
-            tables = []
-            text_content = []
-            metadata = {}
-
-            with pdfplumber.open(pdf_file) as pdf:
-                num_pages = len(pdf.pages)
-
-                # Extract metadata
-                if pdf.metadata:
-                    metadata = {
-                        'title': pdf.metadata.get('Title', ''),
-                        'author': pdf.metadata.get('Author', ''),
-                        'subject': pdf.metadata.get('Subject', ''),
-                        'creator': pdf.metadata.get('Creator', ''),
-                    }
-
-                # Extract tables and text from each page
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract tables
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        for table_idx, table in enumerate(page_tables):
-                            tables.append({
-                                'page': page_num,
-                                'table_index': table_idx,
-                                'rows': table,
-                                'row_count': len(table)
-                            })
-
-                    # Extract text
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append({
-                            'page': page_num,
-                            'text': page_text
-                        })
-
-            # Extract line items from tables
-            line_items = self._extract_line_items_from_tables(tables)
-
-            # Extract financials from text
-            full_text = '\n'.join([p['text'] for p in text_content if p['text']])
-            financials = self._extract_financials(full_text)
-
-            # Extract supplier info
-            supplier_info = self._extract_supplier_info(full_text)
-
-            extraction_time_ms = int((time.time() - start_time) * 1000)
-
-            return {
-                'parser_name': 'pdfplumber',
-                'success': True,
-                'items': line_items,
-                'metadata': {
-                    'supplier_name': supplier_info.get('supplier_name', ''),
-                    'quote_number': supplier_info.get('quote_number', ''),
-                    'quote_date': supplier_info.get('quote_date', ''),
-                    'num_pages': num_pages,
-                    'tables_found': len(tables),
-                    'pdf_metadata': metadata,
-                },
-                'financials': financials,
-                'confidence_score': self._calculate_confidence(line_items, financials, tables),
-                'extraction_time_ms': extraction_time_ms,
-                'raw_tables': tables[:3],  # Include first 3 tables for debugging
-            }
+            content = self.extract_page_content(pdf_bytes, pages)
+            return self.build_result(content, pages, start_time)
 
         except Exception as e:
             extraction_time_ms = int((time.time() - start_time) * 1000)
@@ -96,69 +50,161 @@ class PDFPlumberParser:
                 'errors': [str(e)]
             }
 
-    def _extract_line_items_from_tables(self, tables: List[Dict]) -> List[Dict]:
-        """Extract line items from detected tables."""
-        line_items = []
+    def extract_page_content(self, pdf_bytes: bytes, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Pull raw tables, page text and document metadata out of the PDF."""
+        pdf_file = io.BytesIO(pdf_bytes)
+        tables = []
+        text_content = []
+        metadata = {}
+
+        with span('pdfplumber.open'):
+            pdf = pdfplumber.open(pdf_file, pages=pages)
+
+        with pdf:
+            num_pages = len(pdf.pages)
+
+            # Extract metadata
+            if pdf.metadata:
+                metadata = {
+                    'title': pdf.metadata.get('Title', ''),
+                    'author': pdf.metadata.get('Author', ''),
+                    'subject': pdf.metadata.get('Subject', ''),
+                    'creator': pdf.metadata.get('Creator', ''),
+                }
+
+            # Extract tables and text from each page
+            for page in pdf.pages:
+                page_num = page.page_number
+                # Extract tables
+                with span('pdfplumber.extract_tables', page=page_num):
+                    page_tables = page.extract_tables()
+                if page_tables:
+                    for table_idx, table in enumerate(page_tables):
+                        tables.append({
+                            'page': page_num,
+                            'table_index': table_idx,
+                            'rows': table,
+                            'row_count': len(table)
+                        })
+
+                # Extract text
+                with span('pdfplumber.extract_text', page=page_num):
+                    page_text = page.extract_text()
+                if page_text:
+                    text_content.append({
+                        'page': page_num,
+                        'text': page_text
+                    })
+
+        return {
+            'tables': tables,
+            'text_content': text_content,
+            'metadata': metadata,
+            'num_pages': num_pages,
+        }
+
+    def build_result(
+        self,
+        content: Dict[str, Any],
+        pages: Optional[List[int]],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """Turn extracted page content into the standard parser result."""
+        tables = content['tables']
+        text_content = content['text_content']
+
+        # Join tables that continue across page breaks, then extract line items
+        with span('pdfplumber.line_items'):
+            line_item_tables = self.table_line_items(content)
+            line_items = [item for table in line_item_tables for item in table['items']]
+
+        # Extract financials and supplier info from text (regex passes)
+        with span('pdfplumber.regex'):
+            full_text = '\n'.join([p['text'] for p in text_content if p['text']])
+            financials = self._extract_financials(full_text)
+            supplier_info = self._extract_supplier_info(full_text)
+
+        extraction_time_ms = int((time.time() - start_time) * 1000)
+
+        return {
+            'parser_name': 'pdfplumber',
+            'success': True,
+            'items': line_items,
+            'metadata': {
+                'supplier_name': supplier_info.get('supplier_name', ''),
+                'quote_number': supplier_info.get('quote_number', ''),
+                'quote_date': supplier_info.get('quote_date', ''),
+                'num_pages': content['num_pages'],
+                'pages': pages,
+                'tables_found': len(tables),
+                # Per stitched table, for the cloud routing check (parsers.routing)
+                'line_item_tables': [
+                    {'pages': table['pages'], 'columns': table['columns'], 'items': len(table['items'])}
+                    for table in line_item_tables
+                ],
+                'pdf_metadata': content['metadata'],
+            },
+            'financials': financials,
+            'confidence_score': self._calculate_confidence(line_items, financials, tables),
+            'extraction_time_ms': extraction_time_ms,
+            'raw_tables': tables[:3],  # Include first 3 tables for debugging
+        }
 
-        for table in tables:
+    def table_line_items(self, content: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Line items per stitched table, for judging extraction page by page:
+        [{'pages': [first..last], 'columns': [detected fields], 'items': [...]}].
+        """
+        tables = self._stitch_tables(content['tables'])
+        frame = self._line_item_frame(tables)
+        items = {index: frame_items(rows) for index, rows in frame.groupby('table')}
+        return [
+            {
+                'pages': list(range(table['page'], table['last_page'] + 1)),
+                'columns': sorted(match_header(table['rows'][0])) if table['rows'] else [],
+                'items': items.get(index, []),
+            }
+            for index, table in enumerate(tables)
+        ]
+
+    def _stitch_tables(self, tables: List[Dict]) -> List[Dict]:
+        """
+        Merge tables that continue across a page break.
+
+        A table is treated as a continuation when it is the first table on the
+        page directly after the previous table, has no recognisable header row
+        of its own and has the same number of columns as the previous table's
+        header. Its rows are appended to the previous table so the detected
+        header and column indices carry forward.
+        """
+        stitched = []
+
+        for table in sorted(tables, key=lambda t: (t['page'], t['table_index'])):
             rows = table['rows']
-            if not rows or len(rows) < 2:
+            previous = stitched[-1] if stitched else None
+
+            if (
+                previous is not None
+                and rows
+                and previous['rows']
+                and table['table_index'] == 0
+                and table['page'] == previous['last_page'] + 1
+                and len(rows[0]) == len(previous['rows'][0])
+                and len(match_header(previous['rows'][0])) >= 2
+                and len(match_header(rows[0])) < 2
+            ):
+                previous['rows'] = previous['rows'] + rows
+                previous['row_count'] = len(previous['rows'])
+                previous['last_page'] = table['page']
                 continue
 
-            # Try to identify header row
-            header = rows[0]
-            data_rows = rows[1:]
-
-            # Look for common column patterns
-            desc_col = self._find_column_index(header, ['description', 'item', 'desc'])
-            qty_col = self._find_column_index(header, ['qty', 'quantity', 'quant'])
-            unit_col = self._find_column_index(header, ['unit', 'uom', 'um'])
-            rate_col = self._find_column_index(header, ['rate', 'unit price', 'price'])
-            total_col = self._find_column_index(header, ['total', 'amount', 'value'])
-
-            for row_idx, row in enumerate(data_rows):
-                if not row or all(cell is None or str(cell).strip() == '' for cell in row):
-                    continue
-
-                try:
-                    item = {
-                        'line_number': row_idx + 1,
-                        'description': self._get_cell_value(row, desc_col),
-                        'quantity': self._parse_number(self._get_cell_value(row, qty_col)),
-                        'unit': self._get_cell_value(row, unit_col),
-                        'unit_price': self._parse_number(self._get_cell_value(row, rate_col)),
-                        'total_price': self._parse_number(self._get_cell_value(row, total_col)),
-                    }
-
-                    # Only add if we have at least description and some numeric value
-                    if item['description'] and (item['quantity'] or item['unit_price'] or item['total_price']):
-                        line_items.append(item)
-
-                except Exception as e:
-                    continue
-
-        return line_items
-
-    def _find_column_index(self, header: List, keywords: List[str]) -> int:
-        """Find column index by matching keywords."""
-        if not header:
-            return -1
-
-        for idx, cell in enumerate(header):
-            if cell is None:
-                continue
-            cell_lower = str(cell).lower().strip()
-            for keyword in keywords:
-                if keyword in cell_lower:
-                    return idx
-        return -1
-
-    def _get_cell_value(self, row: List, col_idx: int) -> str:
-        """Safely get cell value."""
-        if col_idx < 0 or col_idx >= len(row):
-            return ''
-        value = row[col_idx]
-        return str(value).strip() if value is not None else ''
+            stitched.append({**table, 'last_page': table['page']})
+
+        return stitched
+
+    def _line_item_frame(self, tables: List[Dict]):
+        """Every table's line items as one DataFrame (see table_normalize.normalize_rows)."""
+        return normalize_rows(header_tables(table['rows'] for table in tables), line_numbers='row')
 
     def _parse_number(self, value: str) -> float:
         """Parse numeric value from string."""
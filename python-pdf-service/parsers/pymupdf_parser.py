@@ -2,7 +2,11 @@ import io
 import time
 import fitz  # PyMuPDF
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from .pages import select_pages
+from .table_normalize import POSITIONAL_COLUMNS, frame_items, normalize_rows
+from .tracing import span
 
 class PyMuPDFParser:
     """
@@ -10,25 +14,45 @@ class PyMuPDFParser:
     Better for documents with mixed layouts and complex formatting.
     """
 
-    def parse(self, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Parse PDF using PyMuPDF."""
+    def parse(self, pdf_bytes: bytes, filename: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Parse PDF using PyMuPDF. `pages` limits parsing to those 1-based page numbers."""
         start_time = time.time()
 
         try:
-            pdf_file = io.BytesIO(pdf_bytes)
+            content = self.extract_page_content(pdf_bytes, pages)
+            return self.build_result(content, pages, start_time)
+
+        except Exception as e:
+            extraction_time_ms = int((time.time() - start_time) * 1000)
+            return {
+                'parser_name': 'pymupdf',
+                'success': False,
+                'items': [],
+                'metadata': {},
+                'financials': {},
+                'confidence_score': 0.0,
+                'extraction_time_ms': extraction_time_ms,
+                'errors': [str(e)]
+            }
+
+    def extract_page_content(self, pdf_bytes: bytes, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Pull text blocks, page text and document metadata out of the PDF."""
+        pdf_file = io.BytesIO(pdf_bytes)
+        with span('pymupdf.open'):
             doc = fitz.open(stream=pdf_file, filetype="pdf")
 
-            num_pages = len(doc)
-            all_text = []
+        with doc:
+            page_numbers = select_pages(len(doc), pages)
             blocks = []
-            tables_detected = 0
+            text_content = []
 
             # Extract text and layout information
-            for page_num in range(num_pages):
+            for page_num in [p - 1 for p in page_numbers]:
                 page = doc[page_num]
 
                 # Get text blocks with position info
-                page_blocks = page.get_text("blocks")
+                with span('pymupdf.get_blocks', page=page_num + 1):
+                    page_blocks = page.get_text("blocks")
                 blocks.extend([{
                     'page': page_num + 1,
                     'x0': block[0],
@@ -41,13 +65,15 @@ class PyMuPDFParser:
                 } for block in page_blocks if block[4].strip()])
 
                 # Get plain text
-                page_text = page.get_text()
-                all_text.append(page_text)
+                with span('pymupdf.get_text', page=page_num + 1):
+                    page_text = page.get_text()
 
-                # Try to detect tables by analyzing layout
-                tables_detected += self._detect_tables_in_page(page_blocks)
-
-            full_text = '\n'.join(all_text)
+                text_content.append({
+                    'page': page_num + 1,
+                    'text': page_text,
+                    # Try to detect tables by analyzing layout
+                    'tables_detected': self._detect_tables_in_page(page_blocks),
+                })
 
             # Extract metadata
             metadata = {
@@ -59,49 +85,52 @@ class PyMuPDFParser:
                 'producer': doc.metadata.get('producer', ''),
             }
 
-            doc.close()
+        return {
+            'blocks': blocks,
+            'text_content': text_content,
+            'metadata': metadata,
+            'num_pages': len(page_numbers),
+        }
 
-            # Extract line items from text using patterns
+    def build_result(
+        self,
+        content: Dict[str, Any],
+        pages: Optional[List[int]],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """Turn extracted page content into the standard parser result."""
+        blocks = content['blocks']
+        full_text = '\n'.join(p['text'] for p in content['text_content'])
+
+        # Extract line items from text using patterns
+        with span('pymupdf.line_items'):
             line_items = self._extract_line_items_from_text(full_text, blocks)
 
-            # Extract financials
+        # Extract financials and supplier info (regex passes)
+        with span('pymupdf.regex'):
             financials = self._extract_financials(full_text)
-
-            # Extract supplier info
             supplier_info = self._extract_supplier_info(full_text)
 
-            extraction_time_ms = int((time.time() - start_time) * 1000)
-
-            return {
-                'parser_name': 'pymupdf',
-                'success': True,
-                'items': line_items,
-                'metadata': {
-                    'supplier_name': supplier_info.get('supplier_name', ''),
-                    'quote_number': supplier_info.get('quote_number', ''),
-                    'quote_date': supplier_info.get('quote_date', ''),
-                    'num_pages': num_pages,
-                    'blocks_found': len(blocks),
-                    'tables_detected': tables_detected,
-                    'pdf_metadata': metadata,
-                },
-                'financials': financials,
-                'confidence_score': self._calculate_confidence(line_items, financials, blocks),
-                'extraction_time_ms': extraction_time_ms,
-            }
-
-        except Exception as e:
-            extraction_time_ms = int((time.time() - start_time) * 1000)
-            return {
-                'parser_name': 'pymupdf',
-                'success': False,
-                'items': [],
-                'metadata': {},
-                'financials': {},
-                'confidence_score': 0.0,
-                'extraction_time_ms': extraction_time_ms,
-                'errors': [str(e)]
-            }
+        extraction_time_ms = int((time.time() - start_time) * 1000)
+
+        return {
+            'parser_name': 'pymupdf',
+            'success': True,
+            'items': line_items,
+            'metadata': {
+                'supplier_name': supplier_info.get('supplier_name', ''),
+                'quote_number': supplier_info.get('quote_number', ''),
+                'quote_date': supplier_info.get('quote_date', ''),
+                'num_pages': content['num_pages'],
+                'pages': pages,
+                'blocks_found': len(blocks),
+                'tables_detected': sum(p['tables_detected'] for p in content['text_content']),
+                'pdf_metadata': content['metadata'],
+            },
+            'financials': financials,
+            'confidence_score': self._calculate_confidence(line_items, financials, blocks),
+            'extraction_time_ms': extraction_time_ms,
+        }
 
     def _detect_tables_in_page(self, blocks: List) -> int:
         """Detect potential tables by analyzing block alignment."""
@@ -119,31 +148,21 @@ class PyMuPDFParser:
 
     def _extract_line_items_from_text(self, text: str, blocks: List[Dict]) -> List[Dict]:
         """Extract line items using regex patterns."""
-        line_items = []
-
         # Pattern for line items: description, qty, unit, rate, total
         # Example: "Fire seal penetration 10 m2 50.00 500.00"
         pattern = r'(.+?)\s+(\d+(?:\.\d+)?)\s+([a-zA-Z²³]+)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)'
 
-        lines = text.split('\n')
-        line_number = 0
-
-        for line in lines:
+        rows = []
+        for line in text.split('\n'):
             line = line.strip()
             if not line or len(line) < 10:
                 continue
 
             match = re.search(pattern, line)
             if match:
-                line_number += 1
-                line_items.append({
-                    'line_number': line_number,
-                    'description': match.group(1).strip(),
-                    'quantity': float(match.group(2)),
-                    'unit': match.group(3),
-                    'unit_price': self._parse_number(match.group(4)),
-                    'total_price': self._parse_number(match.group(5)),
-                })
+                rows.append(match.groups())
+
+        line_items = frame_items(normalize_rows([(rows, POSITIONAL_COLUMNS)], require_values=False))
 
         # If pattern matching didn't work well, try block-based extraction
         if len(line_items) < 3 and len(blocks) > 10:
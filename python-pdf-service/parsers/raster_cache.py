@@ -0,0 +1,275 @@
+"""
+Per-request cache of rendered page rasters.
+
+An ensemble that runs `ocr` next to Unstructured hi_res used to rasterise
+the same pages once per consumer, and OCR's progressive/ROI passes render
+again on top. `raster_scope(pdf_bytes)` opens one cache for a request; every
+consumer asks it for `(page, dpi, grayscale)` and each page is rendered at
+most once per resolution. A grayscale page is converted from the RGB render
+at the same resolution when there is one, and with `color_dpi` set (the
+coordinator sets it to Unstructured's hi_res resolution when that runs next
+to OCR) grayscale requests at that resolution render RGB first, so both
+parsers use one render. The
+active cache lives in a context variable, so parser threads started with
+`tracing.bind` see it too.
+
+Rasters are kept as uint8 NumPy arrays up to RASTER_CACHE_MAX_MB per
+request. Beyond that the least recently used pages are dropped, or with
+RASTER_CACHE_SPILL set, written to RASTER_CACHE_DIR:
+
+- "mmap":       raw .npy files, read back memory-mapped (no copy, no decode)
+- "compressed": .npz files, smaller on disk, decompressed on read
+
+Spilled files are named after the document's hash, so parser processes in
+the async process pool working on the same document find each other's
+pages. With RASTER_CACHE_MAX_MB=0 every page is written through.
+`RasterCache.share()` writes every page through regardless of the budget
+(as "mmap" unless RASTER_CACHE_SPILL says "compressed"); the coordinator
+calls it before handing a document to the Unstructured process pool, whose
+workers share their caches the same way.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+from .cache_stats import record_lookup
+from .rasterize import pixmap_to_array, pixmap_to_image, raster_backend, render_pages, render_pixmap
+from .tracing import span
+
+RasterKey = Tuple[int, int, bool]  # page number, dpi, grayscale
+
+_current_cache: contextvars.ContextVar = contextvars.ContextVar('pdf_raster_cache', default=None)
+
+
+class RasterCache:
+    """Rendered pages of one document, keyed by (page, dpi, grayscale)."""
+
+    def __init__(
+        self,
+        pdf_bytes: bytes,
+        max_mb: Optional[float] = None,
+        spill: Optional[str] = None,
+        spill_dir: Optional[str] = None
+    ):
+        self.pdf_bytes = pdf_bytes
+        self.max_bytes = int(float(max_mb if max_mb is not None else os.getenv('RASTER_CACHE_MAX_MB', 512)) * 1024 * 1024)
+        self.spill = (spill if spill is not None else os.getenv('RASTER_CACHE_SPILL', '')).lower()
+        self.spill_dir = spill_dir or os.getenv('RASTER_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'pdf-raster-cache')
+
+        self._memory: 'OrderedDict[RasterKey, np.ndarray]' = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled: List[str] = []
+        self._digest: Optional[str] = None
+        self._doc: Optional['fitz.Document'] = None
+        self._shared = False
+        # Grayscale requests at this dpi render RGB: an RGB consumer will want the page too
+        self.color_dpi: Optional[int] = None
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'renders': 0, 'spilled': 0, 'disk_hits': 0}
+
+    # -- public API ---------------------------------------------------------
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            return len(self._document())
+
+    def array(self, page_number: int, dpi: int, grayscale: bool = True) -> np.ndarray:
+        """The 1-based page as a (height, width[, 3]) uint8 array. Treat it as read-only."""
+        key = (page_number, dpi, grayscale)
+        with self._lock:
+            array = self._memory.get(key)
+            if array is not None:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                record_lookup('rasters', True)
+                return array
+
+            array = self._load_spilled(key)
+            record_lookup('rasters', array is not None)
+            if array is None:
+                array = self._render(key)
+            self._store(key, array)
+            return array
+
+    def image(self, page_number: int, dpi: int, grayscale: bool = True) -> Image.Image:
+        """The 1-based page as a PIL image (mode L or RGB)."""
+        return Image.fromarray(self.array(page_number, dpi, grayscale))
+
+    def render_clip(
+        self,
+        page_number: int,
+        dpi: int,
+        clip: Tuple[float, float, float, float],
+        grayscale: bool = True
+    ) -> Image.Image:
+        """Render part of a page (PDF points). Clips are one-off, so they are not cached."""
+        with self._lock:
+            return pixmap_to_image(render_pixmap(self._document()[page_number - 1], dpi, grayscale, clip))
+
+    def share(self):
+        """
+        Make this cache's pages visible to other processes working on the same
+        document: pages already in memory are written to RASTER_CACHE_DIR now,
+        later renders as they are made, and pages another process wrote are
+        read back. The files this cache wrote go when it closes.
+        """
+        with self._lock:
+            self.spill = self.spill or 'mmap'
+            self._shared = True
+            for key, array in self._memory.items():
+                if not isinstance(array, np.memmap):
+                    self._spill(key, array)
+
+    def close(self):
+        """Close the document and delete the files this cache spilled."""
+        with self._lock:
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+            self._memory.clear()
+            self._memory_bytes = 0
+            for path in self._spilled:
+                try:
+                    # Readers that already mapped the file keep their view
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._spilled = []
+
+    # -- internals ----------------------------------------------------------
+
+    def _document(self) -> 'fitz.Document':
+        if self._doc is None:
+            self._doc = fitz.open(stream=self.pdf_bytes, filetype='pdf')
+        return self._doc
+
+    def _render(self, key: RasterKey) -> np.ndarray:
+        page_number, dpi, grayscale = key
+
+        if grayscale:
+            # A grayscale page is a cheap conversion of an RGB one (ours or another process's)
+            rgb_key = (page_number, dpi, False)
+            rgb = self._memory.get(rgb_key)
+            if rgb is not None:
+                self.stats['hits'] += 1
+            else:
+                rgb = self._load_spilled(rgb_key)
+                if rgb is None and dpi == self.color_dpi:
+                    rgb = self._render(rgb_key)
+                if rgb is not None:
+                    self._store(rgb_key, rgb)
+            if rgb is not None:
+                return np.asarray(Image.fromarray(rgb).convert('L'))
+
+        with span('raster.render', page=page_number, dpi=dpi):
+            if raster_backend() == 'pdf2image':
+                array = np.asarray(render_pages(self.pdf_bytes, [page_number], dpi, grayscale)[0][1])
+            else:
+                pixmap = render_pixmap(self._document()[page_number - 1], dpi, grayscale)
+                # Copy out of the Pixmap so the array outlives it
+                array = pixmap_to_array(pixmap).copy()
+        self.stats['renders'] += 1
+        return array
+
+    def _store(self, key: RasterKey, array: np.ndarray):
+        if isinstance(array, np.memmap):
+            # Already on disk; keeping the mapping costs no heap
+            self._memory[key] = array
+            return
+
+        if self._shared:
+            self._spill(key, array)
+        self._memory[key] = array
+        self._memory_bytes += array.nbytes
+        while self._memory_bytes > self.max_bytes and self._memory:
+            old_key, old_array = self._memory.popitem(last=False)
+            if isinstance(old_array, np.memmap):
+                continue
+            self._memory_bytes -= old_array.nbytes
+            if self.spill:
+                self._spill(old_key, old_array)
+                if old_key == key and self.spill == 'mmap':
+                    # Write-through: hand back a mapped view of the file just written
+                    self._memory[key] = self._load_spilled(key)
+
+    def _spill_path(self, key: RasterKey) -> str:
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.pdf_bytes).hexdigest()[:24]
+        page_number, dpi, grayscale = key
+        extension = 'npz' if self.spill == 'compressed' else 'npy'
+        return os.path.join(self.spill_dir, f"{self._digest}-p{page_number}-{dpi}{'g' if grayscale else 'c'}.{extension}")
+
+    def _spill(self, key: RasterKey, array: np.ndarray):
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        with span('raster.spill', page=key[0], dpi=key[1]):
+            # Write then rename so a concurrent reader never sees a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                if self.spill == 'compressed':
+                    np.savez_compressed(f, raster=array)
+                else:
+                    np.save(f, array)
+            os.replace(tmp_path, path)
+        self._spilled.append(path)
+        self.stats['spilled'] += 1
+
+    def _load_spilled(self, key: RasterKey) -> Optional[np.ndarray]:
+        if not self.spill:
+            return None
+        path = self._spill_path(key)
+        try:
+            if self.spill == 'compressed':
+                with np.load(path) as archive:
+                    array = archive['raster']
+            else:
+                array = np.load(path, mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+        self.stats['disk_hits'] += 1
+        return array
+
+
+def current_rasters(pdf_bytes: bytes) -> Optional[RasterCache]:
+    """The cache of an open raster_scope for `pdf_bytes`, or None."""
+    current = _current_cache.get()
+    return current if current is not None and current.pdf_bytes is pdf_bytes else None
+
+
+@contextmanager
+def raster_scope(pdf_bytes: bytes, color_dpi: Optional[int] = None) -> Iterator[RasterCache]:
+    """
+    Share one RasterCache for `pdf_bytes` with everything run inside the block
+    (including executor threads started with tracing.bind). Nested scopes for
+    the same document reuse the outer cache, so a parser can always open one:
+    inside an ensemble it joins the request's cache, on its own it gets a
+    private one. `color_dpi` sets RasterCache.color_dpi.
+    """
+    current = _current_cache.get()
+    if current is not None and current.pdf_bytes is pdf_bytes:
+        current.color_dpi = current.color_dpi or color_dpi
+        yield current
+        return
+
+    cache = RasterCache(pdf_bytes)
+    cache.color_dpi = color_dpi
+    token = _current_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _current_cache.reset(token)
+        cache.close()
+
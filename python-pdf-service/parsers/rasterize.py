@@ -0,0 +1,133 @@
+"""
+Page rasterisation for OCR and other image consumers.
+
+PyMuPDF renders pages in-process straight into a Pixmap, which is wrapped as
+a PIL image or NumPy array without a copy through temp files. The old
+pdf2image path (a `pdftoppm` subprocess writing PPM files) is kept behind
+RASTER_BACKEND=pdf2image for comparison.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from .pages import select_pages
+
+# A single DPI for every page, or per-page DPIs keyed by 1-based page number
+DpiSpec = Union[int, Dict[int, int]]
+
+DEFAULT_DPI = 300
+
+
+def raster_backend() -> str:
+    return os.getenv('RASTER_BACKEND', 'pymupdf').lower()
+
+
+def _dpi_for(dpi: DpiSpec, page_number: int) -> int:
+    if isinstance(dpi, dict):
+        return dpi.get(page_number, DEFAULT_DPI)
+    return dpi
+
+
+def render_pixmap(
+    page: 'fitz.Page',
+    dpi: int = DEFAULT_DPI,
+    grayscale: bool = False,
+    clip: Optional[Tuple[float, float, float, float]] = None
+) -> 'fitz.Pixmap':
+    """Render one page (or the `clip` rectangle of it, in PDF points) to a Pixmap."""
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    return page.get_pixmap(
+        dpi=dpi,
+        colorspace=colorspace,
+        alpha=False,
+        clip=fitz.Rect(clip) if clip is not None else None,
+    )
+
+
+def pixmap_to_image(pixmap: 'fitz.Pixmap') -> Image.Image:
+    """Wrap a Pixmap's samples as a PIL image."""
+    mode = 'L' if pixmap.n == 1 else 'RGB'
+    return Image.frombuffer(mode, (pixmap.width, pixmap.height), pixmap.samples, 'raw', mode, 0, 1)
+
+
+def pixmap_to_array(pixmap: 'fitz.Pixmap'):
+    """Wrap a Pixmap's samples as a (height, width[, channels]) uint8 NumPy array."""
+    import numpy as np
+
+    array = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width, pixmap.n)
+    return array[:, :, 0] if pixmap.n == 1 else array
+
+
+def render_page(
+    doc: 'fitz.Document',
+    page_number: int,
+    dpi: int = DEFAULT_DPI,
+    grayscale: bool = False,
+    clip: Optional[Tuple[float, float, float, float]] = None
+) -> Image.Image:
+    """Render a 1-based page of an open document to a PIL image."""
+    return pixmap_to_image(render_pixmap(doc[page_number - 1], dpi, grayscale, clip))
+
+
+def render_page_array(
+    doc: 'fitz.Document',
+    page_number: int,
+    dpi: int = DEFAULT_DPI,
+    grayscale: bool = True,
+    clip: Optional[Tuple[float, float, float, float]] = None
+):
+    """Render a 1-based page of an open document to a NumPy array."""
+    return pixmap_to_array(render_pixmap(doc[page_number - 1], dpi, grayscale, clip))
+
+
+def render_pages(
+    pdf_bytes: bytes,
+    pages: Optional[List[int]] = None,
+    dpi: DpiSpec = DEFAULT_DPI,
+    grayscale: bool = False
+) -> List[Tuple[int, Image.Image]]:
+    """
+    Rasterise the requested 1-based pages (default all) as (page_number, image)
+    pairs. `dpi` may be a dict giving each page its own resolution.
+    """
+    if raster_backend() == 'pdf2image':
+        return _render_pages_pdf2image(pdf_bytes, pages, dpi, grayscale)
+
+    with fitz.open(stream=pdf_bytes, filetype='pdf') as doc:
+        return [
+            (page_number, render_page(doc, page_number, _dpi_for(dpi, page_number), grayscale))
+            for page_number in select_pages(len(doc), pages)
+        ]
+
+
+def _render_pages_pdf2image(
+    pdf_bytes: bytes,
+    pages: Optional[List[int]],
+    dpi: DpiSpec,
+    grayscale: bool
+) -> List[Tuple[int, Image.Image]]:
+    """Legacy poppler path: one pdftoppm call per contiguous run of pages at the same DPI."""
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+
+    total_pages = pdfinfo_from_bytes(pdf_bytes).get('Pages', 0)
+    wanted = select_pages(total_pages, pages)
+
+    # Group into contiguous same-DPI runs: [1, 2, 3, 7, 8] -> (1, 3), (7, 8)
+    runs = []
+    for page_number in wanted:
+        page_dpi = _dpi_for(dpi, page_number)
+        if runs and page_number == runs[-1][1] + 1 and page_dpi == runs[-1][2]:
+            runs[-1][1] = page_number
+        else:
+            runs.append([page_number, page_number, page_dpi])
+
+    rendered = []
+    for first, last, page_dpi in runs:
+        images = convert_from_bytes(
+            pdf_bytes, dpi=page_dpi, first_page=first, last_page=last, grayscale=grayscale
+        )
+        rendered.extend(zip(range(first, last + 1), images))
+    return rendered
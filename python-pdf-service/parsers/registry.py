@@ -0,0 +1,82 @@
+"""
+Lazy parser registry.
+
+Parser modules pull in heavy backends (boto3, google-cloud-documentai,
+pytesseract/pdf2image, unstructured + pandas), so nothing is imported until a
+parser is first used, and parsers left out of ENABLED_PARSERS are never
+imported at all.
+"""
+
+import os
+import importlib
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# name -> (module, class) for the class-based parsers
+PARSER_CLASSES: Dict[str, Tuple[str, str]] = {
+    'pdfplumber': ('parsers.pdfplumber_parser', 'PDFPlumberParser'),
+    'pymupdf': ('parsers.pymupdf_parser', 'PyMuPDFParser'),
+    'ocr': ('parsers.ocr_parser', 'OCRParser'),
+    'textract': ('parsers.textract_parser', 'TextractParser'),
+    'docai': ('parsers.docai_parser', 'DocAIParser'),
+}
+
+# Unstructured is function-based and wrapped by the ensemble coordinator
+ALL_PARSERS = list(PARSER_CLASSES) + ['unstructured']
+
+_import_lock = threading.Lock()
+
+
+def enabled_parsers() -> List[str]:
+    """Parsers this deployment may use: ENABLED_PARSERS (comma-separated), default all."""
+    configured = os.getenv('ENABLED_PARSERS', '').strip()
+    if not configured or configured == 'all':
+        return list(ALL_PARSERS)
+    return [name.strip() for name in configured.split(',') if name.strip() in ALL_PARSERS]
+
+
+def is_enabled(parser_name: str) -> bool:
+    return parser_name in enabled_parsers()
+
+
+def get_parser_class(parser_name: str):
+    """Import (on first use) and return a parser class."""
+    module_name, class_name = PARSER_CLASSES[parser_name]
+    # The import lock keeps two request threads from racing a half-imported module
+    with _import_lock:
+        module = importlib.import_module(module_name)
+    return getattr(module, class_name)
+
+
+def create_parser(parser_name: str):
+    """New instance of a class-based parser."""
+    return get_parser_class(parser_name)()
+
+
+class ParserRegistry(Mapping):
+    """
+    Dict-like view of the enabled class-based parsers. Each parser is
+    imported and instantiated the first time it is looked up.
+    """
+
+    def __init__(self, names: Optional[List[str]] = None):
+        enabled = names if names is not None else enabled_parsers()
+        self._names = [name for name in enabled if name in PARSER_CLASSES]
+        self._instances: Dict[str, Any] = {}
+
+    def __getitem__(self, parser_name: str):
+        if parser_name not in self._names:
+            raise KeyError(parser_name)
+        if parser_name not in self._instances:
+            self._instances[parser_name] = create_parser(parser_name)
+        return self._instances[parser_name]
+
+    def __contains__(self, parser_name) -> bool:
+        return parser_name in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
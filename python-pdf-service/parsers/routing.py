@@ -0,0 +1,138 @@
+"""
+Cost-aware routing of pages to the cloud parsers.
+
+Textract and Document AI are billed and rate-limited per page and are the
+slowest hops in the ensemble. With `cloud_routing=pages` the local parsers
+run first and pdfplumber's tables are checked page by page:
+
+- `no_items`: the page looks priced (page classifier) but no line items came out
+- `missing_columns`: a table without a recognisable qty, rate or total column
+- `arithmetic`: too many rows where qty x rate doesn't match the line total
+
+Only flagged pages, most severe first and within CLOUD_PAGE_BUDGET, go to
+the cloud parsers as a sub-PDF. Their items replace pdfplumber's for those
+pages in the routed result, each at its own page; every other page keeps
+the local items.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+ROUTING_MODES = ('all', 'pages')
+
+# Most severe first: pages are sent to the cloud parsers in this order
+PROBLEMS = ('no_items', 'missing_columns', 'arithmetic')
+REQUIRED_COLUMNS = ('description', 'quantity', 'unit_price', 'total_price')
+# Labels (parsers.page_classifier) of pages expected to carry line items
+PRICED_LABELS = ('priced_table', 'scanned')
+
+
+def routing_mode(requested: Optional[str] = None) -> str:
+    """The cloud routing mode for a request: the request's own choice, else CLOUD_ROUTING."""
+    mode = (requested or os.getenv('CLOUD_ROUTING', 'all')).lower()
+    return mode if mode in ROUTING_MODES else 'all'
+
+
+def page_budget() -> int:
+    return int(os.getenv('CLOUD_PAGE_BUDGET', 10))
+
+
+def _mismatch_rate(items: List[Dict[str, Any]]) -> float:
+    """Share of rows whose qty x rate is missing or doesn't match the total (within 2% / 1c)."""
+    if not items:
+        return 0.0
+    tolerance = float(os.getenv('CLOUD_ROUTING_TOLERANCE', 0.02))
+    bad = 0
+    for item in items:
+        qty, rate, total = item.get('quantity', 0), item.get('unit_price', 0), item.get('total_price', 0)
+        if not (qty and rate and total) or abs(qty * rate - total) > max(0.01, tolerance * abs(total)):
+            bad += 1
+    return bad / len(items)
+
+
+def result_tables(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    PDFPlumberParser.table_line_items() output rebuilt from a pdfplumber
+    result: its items split by the per-table counts in
+    metadata['line_item_tables'].
+    """
+    tables = []
+    offset = 0
+    for table in result['metadata']['line_item_tables']:
+        tables.append({**table, 'items': result['items'][offset:offset + table['items']]})
+        offset += table['items']
+    return tables
+
+
+def assess_pages(
+    tables: List[Dict[str, Any]],
+    classification: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Groups of pages the local extraction got wrong, most severe first:
+    [{'pages': [...], 'problem': ..., 'mismatch_rate': ...}]. A table that
+    spans pages is one group, so it is sent (and replaced) as a whole.
+
+    `tables` is PDFPlumberParser.table_line_items() output (see result_tables).
+    """
+    max_mismatch = float(os.getenv('CLOUD_ROUTING_MAX_MISMATCH', 0.1))
+    groups = []
+    pages_with_items = set()
+
+    for table in tables:
+        if not table['items']:
+            continue
+        pages_with_items.update(table['pages'])
+        mismatch = _mismatch_rate(table['items'])
+        if any(column not in table['columns'] for column in REQUIRED_COLUMNS):
+            groups.append({'pages': table['pages'], 'problem': 'missing_columns', 'mismatch_rate': round(mismatch, 3)})
+        elif mismatch > max_mismatch:
+            groups.append({'pages': table['pages'], 'problem': 'arithmetic', 'mismatch_rate': round(mismatch, 3)})
+
+    for record in classification or []:
+        if record['label'] in PRICED_LABELS and record['page'] not in pages_with_items:
+            groups.append({'pages': [record['page']], 'problem': 'no_items', 'mismatch_rate': None})
+
+    return sorted(groups, key=lambda group: (PROBLEMS.index(group['problem']), group['pages'][0]))
+
+
+def select_pages_within_budget(groups: List[Dict[str, Any]], budget: int) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """(pages to send, groups left out) taking whole groups in order while they fit the budget."""
+    selected = []
+    skipped = []
+    for group in groups:
+        new_pages = [page for page in group['pages'] if page not in selected]
+        if len(selected) + len(new_pages) <= budget:
+            selected.extend(new_pages)
+        else:
+            skipped.append(group)
+    return sorted(selected), skipped
+
+
+def merge_by_page(
+    tables: List[Dict[str, Any]],
+    sent_pages: List[int],
+    cloud_items: List[Dict[str, Any]],
+    cloud_pages: Optional[List[int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    pdfplumber's items for tables on pages that weren't sent, plus the cloud
+    parser's items, in page order. `cloud_pages` is the page of each cloud
+    item (the parser's metadata['item_pages']); without it, e.g. for items
+    read from plain text, they go in as one block at the first sent page.
+    """
+    sent = set(sent_pages)
+    segments = [
+        (table['pages'][0], table['items'])
+        for table in tables
+        if table['items'] and not sent.intersection(table['pages'])
+    ]
+    if cloud_pages and len(cloud_pages) == len(cloud_items):
+        by_page = {}
+        for page, item in zip(cloud_pages, cloud_items):
+            by_page.setdefault(page, []).append(item)
+        segments.extend(by_page.items())
+    elif sent_pages:
+        segments.append((sent_pages[0], cloud_items))
+    segments.sort(key=lambda segment: segment[0])
+    return [item for _, items in segments for item in items]
@@ -0,0 +1,302 @@
+"""
+Near-duplicate detection for ensemble results.
+
+A re-exported quote (new PDF producer, changed metadata, re-saved file) has
+different bytes but the same text. Each ensemble run on a PDF with a text
+layer records a signature of its text from a fast PyMuPDF pass:
+
+- a MinHash of the document's word shingles, indexed with LSH bands, which
+  finds candidates and estimates their Jaccard similarity
+- digests of each page's normalised words and of its numbers alone, which
+  tell exactly which pages' text and figures differ (one changed price
+  barely moves a MinHash)
+
+A later document whose MinHash similarity reaches SIMILARITY_THRESHOLD
+(same page count, same parsers and page range) maps to the earlier result.
+`EnsembleCoordinator` returns it straight away when every page's text
+matches. When only wording differs (every figure on every page is the same)
+it is returned only after the parser behind the earlier best result gives
+the same non-empty line items on the new document; a changed figure always
+means a fresh parse.
+
+Off by default (SIMILARITY_INDEX_ENABLED): it returns results parsed from
+other files.
+
+Scanned PDFs (no text layer) have no signature and are always parsed.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from .cache_stats import record_lookup
+from .pages import select_pages
+from .store_dir import StoreDirectory
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_WORDS = 3
+
+# Bump when signatures or stored results change shape
+INDEX_VERSION = 2
+
+_SIGNATURE_SUFFIX = '.sig.json'
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(0x5EED)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+# Words and numbers as printed on a quote (1,250.00 stays one token)
+_TOKEN = re.compile(r'[a-z0-9]+(?:[.,][0-9]+)*')
+_DIGIT = re.compile(r'\d')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def similarity_enabled() -> bool:
+    return os.getenv('SIMILARITY_INDEX_ENABLED', 'false').lower() == 'true'
+
+
+def _shingle_hashes(words: List[str]) -> np.ndarray:
+    """64-bit hashes of the distinct word shingles."""
+    if len(words) < SHINGLE_WORDS:
+        shingles = {' '.join(words)} if words else set()
+    else:
+        shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'little') for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def _minhash(hashes: np.ndarray) -> np.ndarray:
+    low = hashes & np.uint64(0xFFFFFFFF)
+    permuted = (low[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def document_signature(pdf_bytes: bytes, pages: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+    """MinHash + per-page digests of a PDF's text layer, or None if it has (almost) no text."""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        page_words = [_TOKEN.findall(doc[page - 1].get_text().lower()) for page in select_pages(len(doc), pages)]
+
+    hashes = [_shingle_hashes(words) for words in page_words]
+    all_hashes = np.unique(np.concatenate(hashes)) if hashes else np.array([], dtype=np.uint64)
+    if len(all_hashes) < NUM_PERM:
+        return None
+
+    return {
+        'document_id': hashlib.sha256(pdf_bytes).hexdigest()[:32],
+        'minhash': _minhash(all_hashes).tolist(),
+        'page_digests': [_digest(words) for words in page_words],
+        'page_number_digests': [_digest([w for w in words if _DIGIT.search(w)]) for words in page_words],
+    }
+
+
+def _digest(words: List[str]) -> str:
+    return hashlib.blake2b(' '.join(words).encode(), digest_size=16).hexdigest()
+
+
+class SimilarityIndex:
+    """
+    Signatures and the ensemble results they map to. Entries are files in
+    SIMILARITY_INDEX_DIR so every worker on the host shares them; each
+    process keeps the signatures (not the results) in memory with LSH
+    buckets and picks up other workers' entries on lookup.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        threshold: Optional[float] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None
+    ):
+        self.directory = directory or os.getenv(
+            'SIMILARITY_INDEX_DIR',
+            os.path.join(tempfile.gettempdir(), 'pdf-parser-similarity')
+        )
+        self.threshold = threshold or float(os.getenv('SIMILARITY_THRESHOLD', 0.9))
+        self.ttl_seconds = ttl_seconds or int(os.getenv('SIMILARITY_TTL_SECONDS', 7 * 24 * 3600))
+        self.max_entries = max_entries or int(os.getenv('SIMILARITY_MAX_ENTRIES', 5000))
+        self._entries = {}
+        self._buckets = defaultdict(set)
+        self._loaded = set()
+        self._lock = threading.Lock()
+        self._files = StoreDirectory(self.directory, self.ttl_seconds)
+
+    def lookup(self, signature: Dict[str, Any], run_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Best earlier document for this signature and run, or None. Returns
+        {'document_id', 'file_name', 'similarity', 'pages_changed', 'figures_changed',
+        'parsed_at', 'result'}; the page lists are 1-based pages whose text / figures differ.
+        """
+        self._refresh()
+        minhash = np.array(signature['minhash'], dtype=np.uint64)
+        page_count = len(signature['page_digests'])
+
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(signature['minhash']):
+                candidates |= self._buckets.get(band_key, set())
+            entries = [self._entries[c] for c in candidates if c in self._entries]
+
+        best, best_similarity = None, 0.0
+        cutoff = time.time() - self.ttl_seconds
+        for entry in entries:
+            if entry['run_key'] != run_key or len(entry['page_digests']) != page_count:
+                continue
+            if entry['created'] < cutoff:
+                continue
+            similarity = float(np.mean(np.array(entry['minhash'], dtype=np.uint64) == minhash))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = entry, similarity
+        if best is None:
+            record_lookup('similarity', False)
+            return None
+
+        try:
+            with open(self._path(best['entry_id'], 'result'), 'rb') as f:
+                result = json.loads(f.read())
+        except (OSError, ValueError):
+            record_lookup('similarity', False)
+            return None
+
+        record_lookup('similarity', True)
+        return {
+            'document_id': best['document_id'],
+            'file_name': best['file_name'],
+            'similarity': round(best_similarity, 4),
+            'pages_changed': [
+                page for page, (old, new) in enumerate(zip(best['page_digests'], signature['page_digests']), 1)
+                if old != new
+            ],
+            'figures_changed': [
+                page for page, (old, new) in enumerate(zip(best['page_number_digests'], signature['page_number_digests']), 1)
+                if old != new
+            ],
+            'parsed_at': best['created'],
+            'result': result,
+        }
+
+    def add(self, signature: Dict[str, Any], run_key: str, filename: str, result: Dict[str, Any]):
+        """Record a fresh ensemble result under its document's signature."""
+        entry_id = signature['document_id'] + '-' + hashlib.sha256(run_key.encode()).hexdigest()[:8]
+        entry = {
+            **signature,
+            'entry_id': entry_id,
+            'run_key': run_key,
+            'file_name': filename,
+            'created': time.time(),
+        }
+        self._prune()
+        try:
+            # Result first: a signature must never point at a missing result
+            self._files.write(self._path(entry_id, 'result'), json.dumps(result, default=str).encode('utf-8'))
+            self._files.write(self._path(entry_id, 'sig'), json.dumps(entry).encode('utf-8'))
+        except OSError:
+            return
+        self._remember(entry_id + _SIGNATURE_SUFFIX, entry)
+
+    def _refresh(self):
+        """
+        Load signatures other workers have written since the last lookup and
+        forget those whose files are gone (pruned here or by another worker).
+        """
+        try:
+            names = {name for name in os.listdir(self.directory) if name.endswith(_SIGNATURE_SUFFIX)}
+        except OSError:
+            return
+
+        with self._lock:
+            for name in self._loaded - names:
+                self._forget(name)
+
+        for name in names - self._loaded:
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    entry = json.loads(f.read())
+            except (OSError, ValueError):
+                continue
+            self._remember(name, entry)
+
+    def _remember(self, name: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._forget(name)
+            self._loaded.add(name)
+            self._entries[entry['entry_id']] = entry
+            for band_key in self._band_keys(entry['minhash']):
+                self._buckets[band_key].add(entry['entry_id'])
+            if len(self._entries) > self.max_entries:
+                oldest = sorted(self._entries.values(), key=lambda e: e['created'])
+                for stale in oldest[:len(self._entries) - self.max_entries]:
+                    self._forget(stale['entry_id'] + _SIGNATURE_SUFFIX)
+
+    def _forget(self, name: str):
+        """Drop an entry from memory (caller holds the lock)."""
+        self._loaded.discard(name)
+        entry = self._entries.pop(name[:-len(_SIGNATURE_SUFFIX)], None)
+        if entry is not None:
+            for band_key in self._band_keys(entry['minhash']):
+                bucket = self._buckets.get(band_key)
+                if bucket is not None:
+                    bucket.discard(entry['entry_id'])
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def _prune(self):
+        """
+        Delete entries older than the TTL, and the oldest beyond max_entries
+        (at most every few minutes).
+        """
+        kept = self._files.prune()
+        if kept is None:
+            return
+
+        signatures = [(mtime, name) for name, mtime in kept.items() if name.endswith(_SIGNATURE_SUFFIX)]
+        for _, name in sorted(signatures)[:max(0, len(signatures) - self.max_entries)]:
+            entry_id = name[:-len(_SIGNATURE_SUFFIX)]
+            # Signature first: a signature must never point at a missing result
+            for path in (self._path(entry_id, 'sig'), self._path(entry_id, 'result')):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+
+    def _band_keys(self, minhash: List[int]):
+        rows = NUM_PERM // BANDS
+        return [(band, tuple(minhash[band * rows:(band + 1) * rows])) for band in range(BANDS)]
+
+    def _path(self, entry_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f'{entry_id}.{kind}.json')
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """The process-wide similarity index, created on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+        return _index
+
+
+def run_key(
+    parsers_to_use: List[str],
+    pages: Optional[List[int]],
+    cloud_routing: str = 'all',
+    execution: str = 'parallel'
+) -> str:
+    """Results are only reused for the same parser set, page range, cloud routing and execution mode."""
+    return f"v{INDEX_VERSION}|{','.join(sorted(parsers_to_use))}|{pages or 'all'}|{cloud_routing}|{execution}"
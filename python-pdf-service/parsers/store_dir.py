@@ -0,0 +1,67 @@
+"""
+The on-disk side of the stores shared by every worker on a host (uploaded
+documents, the page store, the similarity index, outcome records): one
+directory of files, written atomically and swept of files not used within
+the store's TTL.
+"""
+
+import os
+import time
+import tempfile
+from typing import Dict, Optional
+
+# Directory sweeps for expired files happen at most this often by default
+PRUNE_INTERVAL_SECONDS = 300
+
+
+class StoreDirectory:
+    """A store's directory: atomic writes and TTL sweeps by modification time."""
+
+    def __init__(self, path: str, ttl_seconds: float, prune_interval: float = PRUNE_INTERVAL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, path: str, data: bytes):
+        """Write via a temp file + rename so other workers never read a partial file."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def prune(self) -> Optional[Dict[str, float]]:
+        """
+        Delete files not modified within the TTL, at most once per
+        prune_interval. Returns the files kept, name -> mtime, for stores
+        that also cap their size; None when no sweep ran.
+        """
+        now = time.time()
+        if now - self._last_prune < self.prune_interval:
+            return None
+        self._last_prune = now
+
+        cutoff = now - self.ttl_seconds
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return None
+
+        kept = {}
+        for name in names:
+            path = os.path.join(self.path, name)
+            try:
+                mtime = os.path.getmtime(path)
+                if mtime < cutoff:
+                    os.unlink(path)
+                else:
+                    kept[name] = mtime
+            except OSError:
+                continue
+        return kept
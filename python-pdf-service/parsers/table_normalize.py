@@ -0,0 +1,199 @@
+"""
+Table-to-line-item normalisation shared by every parser.
+
+Each parser ends up with rows of cells (table rows, or the groups of a
+regex-matched text line) that have to become line items. Rather than
+looping over rows and parsing cells one at a time, all of a document's rows
+are gathered into columns and converted a whole column at a time:
+
+- header rows map to fields through one compiled matcher (HEADER_MATCHER)
+- numeric columns are joined into one string, stripped of currency
+  symbols, thousands separators and whitespace with a single str.translate,
+  split again and converted by NumPy in one call
+- only a column with unparseable cells falls back to pandas' to_numeric;
+  for OCR text (`ocr_digits`) those cells get digit fixes (O/o -> 0,
+  l/I -> 1, S -> 5, when the cell has a digit); anything still
+  unparseable becomes 0.0
+- the result is one DataFrame for the document, filtered with a vectorised
+  mask (rows need a description and a quantity, rate or total)
+
+pandas is imported on first use so importing a parser stays cheap.
+"""
+
+import re
+from functools import lru_cache
+from itertools import repeat, zip_longest
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+FIELDS = ('description', 'quantity', 'unit', 'unit_price', 'total_price')
+TEXT_FIELDS = ('description', 'unit')
+NUMBER_FIELDS = ('quantity', 'unit_price', 'total_price')
+
+# Columns of a row that is already in field order (regex groups, DocAI tables)
+POSITIONAL_COLUMNS = {field: index for index, field in enumerate(FIELDS)}
+
+# One optional lookahead per field, so a single match reports every field a
+# header cell names ("Unit Price" is both the unit and the unit_price column).
+# 'item' is its own group: it names the description only as a fallback
+HEADER_MATCHER = re.compile(
+    r'^'
+    r'(?=.*?(?P<description>desc))?'
+    r'(?=.*?(?P<item>item))?'
+    r'(?=.*?(?P<quantity>qty|quant))?'
+    r'(?=.*?(?P<unit>unit|uom|um))?'
+    r'(?=.*?(?P<unit_price>rate|price))?'
+    r'(?=.*?(?P<total_price>total|amount|value))?',
+    re.DOTALL
+)
+
+_OCR_DIGITS = str.maketrans('OolIS', '00115')
+# Deleted from numeric cells before conversion
+_NOT_NUMERIC = str.maketrans('', '', ',$£€ \t\r\n\x0b\x0c\xa0')
+# Joins a column's cells for the one-pass clean; never part of a cell
+_SEPARATOR = '\x1f'
+_DIGIT = re.compile(r'\d')
+
+
+def cell_fields(cell: Any) -> Set[str]:
+    """Fields a header cell names ('item' alone names the description)."""
+    fields = _cell_keywords(cell)
+    if 'item' in fields:
+        fields.discard('item')
+        fields.add('description')
+    return fields
+
+
+def match_header(header: Optional[List[Any]]) -> Dict[str, int]:
+    """
+    Field -> index of the first header cell naming it (missing fields are
+    omitted). An "Item" column is only the description when no cell says
+    "Description": in "Item | Description" it holds item numbers.
+    """
+    columns = {}
+    for index, cell in enumerate(header or []):
+        for field in _cell_keywords(cell):
+            columns.setdefault(field, index)
+    item = columns.pop('item', None)
+    if item is not None:
+        columns.setdefault('description', item)
+    return columns
+
+
+def header_tables(tables: Iterable[List[List[Any]]]) -> List[Tuple[List[List[Any]], Dict[str, int]]]:
+    """
+    (data rows, columns) per table whose first row is its header. Tables
+    without data rows give ([], {}) so positions still line up with `tables`.
+    """
+    return [
+        (rows[1:], match_header(rows[0])) if rows and len(rows) >= 2 else ([], {})
+        for rows in tables
+    ]
+
+
+def to_numbers(values: List[Any], ocr_digits: bool = False) -> 'np.ndarray':
+    """
+    Numeric cells as a float64 array (0.0 where nothing parses). With
+    `ocr_digits`, letters OCR confuses with digits are read as those digits.
+    """
+    import numpy as np
+    import pandas as pd
+
+    texts = [value if isinstance(value, str) else '' if value is None else str(value) for value in values]
+    cleaned = _SEPARATOR.join(texts).translate(_NOT_NUMERIC).split(_SEPARATOR)
+    if len(cleaned) != len(texts):
+        cleaned = [text.translate(_NOT_NUMERIC) for text in texts]
+    try:
+        numbers = np.array([text or '0' for text in cleaned], dtype=np.float64)
+    except ValueError:
+        numbers = pd.to_numeric(pd.Series(cleaned, dtype=object), errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        if ocr_digits:
+            for index in np.flatnonzero(np.isnan(numbers)):
+                if _DIGIT.search(cleaned[index]):
+                    numbers[index] = _to_float(cleaned[index].translate(_OCR_DIGITS))
+    numbers[np.isnan(numbers)] = 0.0
+    return numbers
+
+
+def normalize_rows(
+    tables: List[Tuple[List[List[Any]], Dict[str, int]]],
+    line_numbers: str = 'sequence',
+    require_values: bool = True,
+    defaults: Optional[Dict[str, Any]] = None,
+    ocr_digits: bool = False
+) -> 'pd.DataFrame':
+    """
+    Line items from `tables`, each (rows, {field: column index}), as one
+    DataFrame with columns table (index into `tables`), row (index into its
+    rows), line_number and FIELDS.
+
+    Rows need a description and, with `require_values`, a quantity, rate or
+    total. line_numbers is 'sequence' (1..n over the kept rows) or 'row'
+    (position in the table's rows, 1-based). Fields a table has no column
+    for take `defaults` (else empty / 0.0). `ocr_digits` is for OCR text
+    (see to_numbers).
+    """
+    import numpy as np
+    import pandas as pd
+
+    defaults = defaults or {}
+    counts = [len(rows) for rows, _ in tables]
+    data = {field: [] for field in FIELDS}
+    for (rows, columns), count in zip(tables, counts):
+        if not count:
+            continue
+        cells = list(zip_longest(*(row or () for row in rows)))
+        for field in FIELDS:
+            index = columns.get(field, -1)
+            data[field].extend(cells[index] if 0 <= index < len(cells) else repeat(defaults.get(field), count))
+
+    for field in TEXT_FIELDS:
+        data[field] = np.array(
+            ['' if value is None else str(value).strip() for value in data[field]], dtype=object
+        )
+    for field in NUMBER_FIELDS:
+        data[field] = to_numbers(data[field], ocr_digits)
+
+    counts = np.array(counts, dtype=np.int64)
+    table = np.repeat(np.arange(len(counts)), counts)
+    row = np.arange(len(table)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    keep = data['description'] != ''
+    if require_values:
+        keep &= (data['quantity'] != 0) | (data['unit_price'] != 0) | (data['total_price'] != 0)
+    row = row[keep]
+
+    return pd.DataFrame({
+        'table': table[keep],
+        'row': row,
+        'line_number': row + 1 if line_numbers == 'row' else np.arange(1, len(row) + 1),
+        **{field: data[field][keep] for field in FIELDS},
+    })
+
+
+def frame_items(frame: 'pd.DataFrame') -> List[Dict[str, Any]]:
+    """Line item dicts from a normalize_rows() frame."""
+    # Column lists zipped into dicts: several times faster than to_dict('records')
+    columns = ['line_number', *FIELDS]
+    return [dict(zip(columns, values)) for values in zip(*(frame[column].tolist() for column in columns))]
+
+
+def frame_pages(frame: 'pd.DataFrame', table_pages: List[int]) -> List[int]:
+    """The page of each frame_items() item, given the page of each table passed to normalize_rows()."""
+    return [table_pages[index] for index in frame['table'].tolist()]
+
+
+def _cell_keywords(cell: Any) -> Set[str]:
+    return set() if cell is None else set(_keywords(str(cell).lower().strip()))
+
+
+# The same header repeats on every page of a quote
+@lru_cache(maxsize=1024)
+def _keywords(text: str) -> Tuple[str, ...]:
+    return tuple(group for group, keyword in HEADER_MATCHER.match(text).groupdict().items() if keyword)
+
+
+def _to_float(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
@@ -0,0 +1,120 @@
+"""
+Cheap table localisation on a low-resolution page raster.
+
+Quote tables are almost always ruled: horizontal rules between rows, often
+with vertical column rules. Those rules are long unbroken runs of dark
+pixels, which text never produces, so a couple of NumPy passes over a
+~150 DPI grayscale render find them without running any OCR. Nearby
+horizontal rules that overlap horizontally are grouped into one table, and
+its box (in PDF points) is what OCRParser renders at full resolution.
+
+Borderless tables are not found; callers fall back to the full page.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+Box = Tuple[float, float, float, float]  # x0, y0, x1, y1 in PDF points
+
+# Minimum length of a rule, and largest gap between two rules of the same table
+MIN_RULE_PT = 72.0
+MAX_ROW_GAP_PT = 60.0
+# Rules are dark; anti-aliased 0.5pt lines at 150 DPI still come out well under this
+DARK_THRESHOLD = 160
+
+
+def _runs(dark: np.ndarray, min_len: int) -> np.ndarray:
+    """
+    For each row of a boolean image, True at column i when dark[row, i:i+min_len]
+    is all dark, i.e. a run of at least `min_len` starts there.
+    """
+    height, width = dark.shape
+    if width < min_len:
+        return np.zeros((height, 0), dtype=bool)
+    padded = np.zeros((height, width + 1), dtype=np.int32)
+    np.cumsum(dark, axis=1, out=padded[:, 1:])
+    return (padded[:, min_len:] - padded[:, :-min_len]) == min_len
+
+
+def horizontal_rules(gray: np.ndarray, dpi: int, min_rule_pt: float = MIN_RULE_PT) -> List[Box]:
+    """Horizontal rules on a grayscale page raster, merged across adjacent pixel rows."""
+    scale = 72.0 / dpi
+    min_len = max(1, int(min_rule_pt / scale))
+    starts = _runs(gray < DARK_THRESHOLD, min_len)
+
+    rule_rows = np.flatnonzero(starts.any(axis=1))
+    rules: List[Box] = []
+    for row in rule_rows:
+        columns = np.flatnonzero(starts[row])
+        x0, x1 = columns[0], columns[-1] + min_len
+        # A rule 2-3 pixels thick shows up on consecutive rows: extend the previous one
+        if rules and row - rules[-1][3] / scale <= 1:
+            prev = rules[-1]
+            rules[-1] = (min(prev[0], x0 * scale), prev[1], max(prev[2], x1 * scale), (row + 1) * scale)
+        else:
+            rules.append((x0 * scale, row * scale, x1 * scale, (row + 1) * scale))
+    return rules
+
+
+def vertical_rules(gray: np.ndarray, dpi: int, min_rule_pt: float = MIN_RULE_PT / 4) -> List[Box]:
+    """Vertical rules, found by running the horizontal pass over the transposed raster."""
+    return [(y0, x0, y1, x1) for x0, y0, x1, y1 in horizontal_rules(gray.T, dpi, min_rule_pt)]
+
+
+def _overlap(a0: float, a1: float, b0: float, b1: float) -> float:
+    return max(0.0, min(a1, b1) - max(a0, b0))
+
+
+def detect_table_regions(
+    gray: np.ndarray,
+    dpi: int,
+    min_rules: int = 2,
+    max_row_gap_pt: float = MAX_ROW_GAP_PT
+) -> List[Box]:
+    """
+    Table bounding boxes (PDF points, top-left origin) on a grayscale page raster.
+
+    Each box covers a group of at least `min_rules` horizontal rules that are
+    within `max_row_gap_pt` of each other and overlap by at least half their
+    width, widened to any vertical rules crossing it, and padded by one row
+    above so a header that is only underlined is included.
+    """
+    height, width = gray.shape
+    scale = 72.0 / dpi
+    page_w, page_h = width * scale, height * scale
+
+    groups: List[List[Box]] = []
+    for rule in horizontal_rules(gray, dpi):
+        if groups:
+            last = groups[-1][-1]
+            x0 = min(r[0] for r in groups[-1])
+            x1 = max(r[2] for r in groups[-1])
+            shorter = min(x1 - x0, rule[2] - rule[0])
+            if rule[1] - last[3] <= max_row_gap_pt and _overlap(x0, x1, rule[0], rule[2]) >= shorter / 2:
+                groups[-1].append(rule)
+                continue
+        groups.append([rule])
+
+    verticals = vertical_rules(gray, dpi)
+    regions: List[Box] = []
+    for group in groups:
+        if len(group) < min_rules:
+            continue
+        x0 = min(r[0] for r in group)
+        x1 = max(r[2] for r in group)
+        y0, y1 = group[0][1], group[-1][3]
+        for v in verticals:
+            if _overlap(y0, y1, v[1], v[3]) > 0 and _overlap(x0 - 2, x1 + 2, v[0], v[2]) > 0:
+                x0, x1 = min(x0, v[0]), max(x1, v[2])
+                y0, y1 = min(y0, v[1]), max(y1, v[3])
+
+        gaps = [b[1] - a[3] for a, b in zip(group, group[1:])]
+        row_height = float(np.median(gaps)) if gaps else 20.0
+        regions.append((
+            max(0.0, x0 - 4),
+            max(0.0, y0 - row_height - 4),
+            min(page_w, x1 + 4),
+            min(page_h, y1 + 4),
+        ))
+    return regions
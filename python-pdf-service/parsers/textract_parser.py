@@ -2,10 +2,14 @@ import io
 import time
 import os
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import boto3
 from botocore.exceptions import ClientError
 
+from .pages import extract_pages, original_page
+from .table_normalize import POSITIONAL_COLUMNS, frame_items, frame_pages, header_tables, normalize_rows
+from .tracing import span
+
 class TextractParser:
     """
     PDF parser using AWS Textract - excellent for forms and tables.
@@ -15,17 +19,21 @@ class TextractParser:
     def __init__(self):
         self.textract = None
         try:
-            self.textract = boto3.client(
-                'textract',
-                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-                region_name=os.getenv('AWS_REGION', 'us-east-1')
-            )
+            self.textract = self._create_client()
         except Exception as e:
             print(f"Warning: Textract client initialization failed: {e}")
 
-    def parse(self, pdf_bytes: bytes, filename: str) -> Dict[str, Any]:
-        """Parse PDF using AWS Textract."""
+    def _create_client(self):
+        """Build the Textract client (benchmarks.fakes swaps this out for load tests)."""
+        return boto3.client(
+            'textract',
+            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            region_name=os.getenv('AWS_REGION', 'us-east-1')
+        )
+
+    def parse(self, pdf_bytes: bytes, filename: str, pages: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Parse PDF using AWS Textract. `pages` limits parsing to those 1-based page numbers."""
         start_time = time.time()
 
         if not self.textract:
@@ -41,11 +49,16 @@ class TextractParser:
             }
 
         try:
+            # Send only the requested pages
+            with span('textract.select_pages'):
+                pdf_bytes, page_numbers = extract_pages(pdf_bytes, pages)
+
             # Call Textract analyze_document API
-            response = self.textract.analyze_document(
-                Document={'Bytes': pdf_bytes},
-                FeatureTypes=['TABLES', 'FORMS']
-            )
+            with span('textract.analyze_document', bytes=len(pdf_bytes)):
+                response = self.textract.analyze_document(
+                    Document={'Bytes': pdf_bytes},
+                    FeatureTypes=['TABLES', 'FORMS']
+                )
 
             # Extract blocks
             blocks = response.get('Blocks', [])
@@ -53,38 +66,45 @@ class TextractParser:
             # Process different block types
             lines_text = []
             tables = []
+            table_pages = []
             forms = {}
 
-            for block in blocks:
-                if block['BlockType'] == 'LINE':
-                    lines_text.append(block.get('Text', ''))
-
-                elif block['BlockType'] == 'TABLE':
-                    table_data = self._extract_table(block, blocks)
-                    if table_data:
-                        tables.append(table_data)
-
-                elif block['BlockType'] == 'KEY_VALUE_SET' and block.get('EntityTypes'):
-                    if 'KEY' in block['EntityTypes']:
-                        key_text = self._get_text_from_relationships(block, blocks)
-                        value_text = self._get_value_for_key(block, blocks)
-                        if key_text and value_text:
-                            forms[key_text] = value_text
+            with span('textract.process_blocks', blocks=len(blocks)):
+                for block in blocks:
+                    if block['BlockType'] == 'LINE':
+                        lines_text.append(block.get('Text', ''))
+
+                    elif block['BlockType'] == 'TABLE':
+                        table_data = self._extract_table(block, blocks)
+                        if table_data:
+                            tables.append(table_data)
+                            # Pages of the sub-PDF are 1..n; report the original page
+                            table_pages.append(original_page(page_numbers, block.get('Page', 1)))
+
+                    elif block['BlockType'] == 'KEY_VALUE_SET' and block.get('EntityTypes'):
+                        if 'KEY' in block['EntityTypes']:
+                            key_text = self._get_text_from_relationships(block, blocks)
+                            value_text = self._get_value_for_key(block, blocks)
+                            if key_text and value_text:
+                                forms[key_text] = value_text
 
             full_text = '\n'.join(lines_text)
 
             # Extract line items from tables
-            line_items = self._extract_line_items_from_tables(tables)
-
-            # If no items from tables, try text extraction
-            if not line_items:
-                line_items = self._extract_line_items_from_text(full_text)
+            with span('textract.line_items'):
+                frame = self._line_item_frame(tables)
+                line_items = frame_items(frame)
+                item_pages = frame_pages(frame, table_pages)
 
-            # Extract financials
-            financials = self._extract_financials(full_text, forms)
+                # If no items from tables, try text extraction
+                if not line_items:
+                    line_items = self._extract_line_items_from_text(full_text)
+                    item_pages = []
 
-            # Extract supplier info
-            supplier_info = self._extract_supplier_info(full_text, forms)
+            # Extract financials and supplier info
+            with span('textract.regex'):
+                financials = self._extract_financials(full_text, forms)
+                supplier_info = self._extract_supplier_info(full_text, forms)
 
             # Calculate average confidence
             avg_confidence = self._calculate_avg_confidence(blocks)
@@ -100,8 +120,11 @@ class TextractParser:
                     'quote_number': supplier_info.get('quote_number', ''),
                     'quote_date': supplier_info.get('quote_date', ''),
                     'num_pages': response.get('DocumentMetadata', {}).get('Pages', 0),
+                    'pages': pages,
                     'blocks_found': len(blocks),
                     'tables_found': len(tables),
+                    'table_pages': table_pages,
+                    'item_pages': item_pages,
                     'forms_found': len(forms),
                     'textract_confidence': avg_confidence,
                 },
@@ -187,72 +210,18 @@ class TextractParser:
         return ''
 
     def _extract_line_items_from_tables(self, tables: List[List[List[str]]]) -> List[Dict]:
-        """Extract line items from Textract tables."""
-        line_items = []
-
-        for table in tables:
-            if not table or len(table) < 2:
-                continue
+        """Extract line items from Textract tables (first row of each is its header)."""
+        return frame_items(self._line_item_frame(tables))
 
-            header = table[0]
-            rows = table[1:]
-
-            # Find column indices
-            desc_col = self._find_column_index(header, ['description', 'item', 'desc'])
-            qty_col = self._find_column_index(header, ['qty', 'quantity'])
-            unit_col = self._find_column_index(header, ['unit', 'uom'])
-            rate_col = self._find_column_index(header, ['rate', 'unit price', 'price'])
-            total_col = self._find_column_index(header, ['total', 'amount'])
-
-            for row_idx, row in enumerate(rows):
-                if not row or all(not cell.strip() for cell in row):
-                    continue
-
-                item = {
-                    'line_number': len(line_items) + 1,
-                    'description': self._get_cell_value(row, desc_col),
-                    'quantity': self._parse_number(self._get_cell_value(row, qty_col)),
-                    'unit': self._get_cell_value(row, unit_col),
-                    'unit_price': self._parse_number(self._get_cell_value(row, rate_col)),
-                    'total_price': self._parse_number(self._get_cell_value(row, total_col)),
-                }
-
-                if item['description'] and (item['quantity'] or item['unit_price'] or item['total_price']):
-                    line_items.append(item)
-
-        return line_items
+    def _line_item_frame(self, tables: List[List[List[str]]]):
+        """Every table's line items as one DataFrame (see table_normalize.normalize_rows)."""
+        return normalize_rows(header_tables(tables))
 
     def _extract_line_items_from_text(self, text: str) -> List[Dict]:
         """Extract line items from plain text."""
-        line_items = []
         pattern = r'(.+?)\s+(\d+(?:\.\d+)?)\s+([a-zA-Z²³]+)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)\s+(\d+(?:,\d{3})*(?:\.\d{2})?)'
-
-        for match in re.finditer(pattern, text):
-            line_items.append({
-                'line_number': len(line_items) + 1,
-                'description': match.group(1).strip(),
-                'quantity': float(match.group(2)),
-                'unit': match.group(3),
-                'unit_price': self._parse_number(match.group(4)),
-                'total_price': self._parse_number(match.group(5)),
-            })
-
-        return line_items
-
-    def _find_column_index(self, header: List[str], keywords: List[str]) -> int:
-        """Find column index by keywords."""
-        for idx, cell in enumerate(header):
-            cell_lower = cell.lower().strip()
-            for keyword in keywords:
-                if keyword in cell_lower:
-                    return idx
-        return -1
-
-    def _get_cell_value(self, row: List[str], col_idx: int) -> str:
-        """Get cell value safely."""
-        if col_idx < 0 or col_idx >= len(row):
-            return ''
-        return row[col_idx].strip()
+        rows = [match.groups() for match in re.finditer(pattern, text)]
+        return frame_items(normalize_rows([(rows, POSITIONAL_COLUMNS)], require_values=False))
 
     def _parse_number(self, value: str) -> float:
         """Parse number from string."""
@@ -0,0 +1,82 @@
+"""
+Tiered ensemble execution.
+
+By default (ENSEMBLE_EXECUTION=parallel) every requested parser runs at
+once. With `execution=tiered` the coordinator runs them in cost order and
+stops once the result is good enough:
+
+1. local text parsers (pdfplumber, PyMuPDF)
+2. OCR and Unstructured, if tier 1 is low-confidence or a page is an image
+3. Textract and DocAI, if the parsers so far disagree, found nothing, or
+   their line items don't add up to the quote's totals
+
+Each gate returns the reasons the next tier is needed; no reasons means it
+is skipped.
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+
+EXECUTION_MODES = ('parallel', 'tiered')
+
+TIER_2_PARSERS = ('ocr', 'unstructured')
+TIER_3_PARSERS = ('textract', 'docai')
+
+
+def execution_mode(requested: Optional[str] = None) -> str:
+    """The execution mode for a request: the request's own choice, else ENSEMBLE_EXECUTION."""
+    mode = (requested or os.getenv('ENSEMBLE_EXECUTION', 'parallel')).lower()
+    return mode if mode in EXECUTION_MODES else 'parallel'
+
+
+def tier_of(parser_name: str) -> int:
+    if parser_name in TIER_3_PARSERS:
+        return 3
+    if parser_name in TIER_2_PARSERS:
+        return 2
+    return 1
+
+
+def reconciles(result: Dict[str, Any]) -> Optional[bool]:
+    """
+    Whether the line items add up to the subtotal, the grand total or the
+    grand total less tax (within TIER_RECONCILE_TOLERANCE). None when the
+    result has no items or no totals to check against.
+    """
+    items = result.get('items') or []
+    financials = result.get('financials') or {}
+    subtotal = financials.get('subtotal') or 0.0
+    tax = financials.get('tax') or 0.0
+    grand_total = financials.get('grand_total') or 0.0
+    targets = [total for total in (subtotal, grand_total, grand_total - tax) if total > 0]
+    if not items or not targets:
+        return None
+
+    tolerance = float(os.getenv('TIER_RECONCILE_TOLERANCE', 0.01))
+    items_total = sum(item.get('total_price') or 0.0 for item in items)
+    return any(abs(items_total - total) <= max(0.01, tolerance * total) for total in targets)
+
+
+def tier_2_reasons(
+    best: Dict[str, Any],
+    classification: Optional[List[Dict[str, Any]]] = None
+) -> List[str]:
+    """Why OCR / Unstructured are needed after tier 1 (empty: they aren't)."""
+    reasons = []
+    if not best.get('items') or best.get('confidence_score', 0) < float(os.getenv('TIER_CONFIDENCE_MIN', 0.7)):
+        reasons.append('low_confidence')
+    if any(record['label'] == 'scanned' for record in classification or []):
+        reasons.append('image_pages')
+    return reasons
+
+
+def tier_3_reasons(best: Dict[str, Any], agreement: float) -> List[str]:
+    """Why the cloud parsers are needed after tiers 1 and 2 (empty: they aren't)."""
+    if not best.get('items'):
+        return ['no_items']
+    reasons = []
+    if agreement < float(os.getenv('TIER_AGREEMENT_MIN', 0.5)):
+        reasons.append('low_agreement')
+    if reconciles(best) is False:
+        reasons.append('totals_mismatch')
+    return reasons
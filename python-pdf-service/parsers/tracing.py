@@ -0,0 +1,204 @@
+"""
+Lightweight per-request tracing with OpenTelemetry-compatible spans.
+
+Parsers wrap their stages in `span('pdfplumber.extract_tables')`. When no
+trace is active (the default) a span costs one context-variable lookup.
+A trace is started per request with `start_trace(...)`; on exit its spans
+are exported according to TRACE_EXPORT:
+
+- unset:  not exported (still available for the opt-in `timings` breakdown)
+- "file": appended as OTLP/JSON lines to TRACE_EXPORT_FILE
+- "otlp": POSTed as OTLP/JSON to OTEL_EXPORTER_OTLP_ENDPOINT (e.g. a local collector)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('pdf_parser_trace', default=None)
+_current_span_id: contextvars.ContextVar = contextvars.ContextVar('pdf_parser_span', default=None)
+
+# OTLP exports happen off the request thread
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trace-export')
+
+
+class Trace:
+    """Spans collected for one request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span_record: Dict[str, Any]):
+        with self._lock:
+            self.spans.append(span_record)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Total time and call count per span name, e.g. {'ocr.tesseract': {'count': 3, 'total_ms': 812.4}}."""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+
+        for record in spans:
+            entry = totals.setdefault(record['name'], {'count': 0, 'total_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += (record['end_time_unix_nano'] - record['start_time_unix_nano']) / 1e6
+
+        for entry in totals.values():
+            entry['total_ms'] = round(entry['total_ms'], 2)
+        return totals
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON `ExportTraceServiceRequest` payload."""
+        with self._lock:
+            spans = list(self.spans)
+
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    _otlp_attribute('service.name', os.getenv('OTEL_SERVICE_NAME', 'pdf-parser-ensemble')),
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': 'pdf-parser-ensemble.tracing'},
+                    'spans': [{
+                        'traceId': self.trace_id,
+                        'spanId': record['span_id'],
+                        'parentSpanId': record['parent_span_id'] or '',
+                        'name': record['name'],
+                        'kind': 1,  # SPAN_KIND_INTERNAL
+                        'startTimeUnixNano': str(record['start_time_unix_nano']),
+                        'endTimeUnixNano': str(record['end_time_unix_nano']),
+                        'attributes': [_otlp_attribute(k, v) for k, v in record['attributes'].items()],
+                        'status': {'code': 2 if record['error'] else 1, 'message': record['error'] or ''},
+                    } for record in spans],
+                }],
+            }],
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def tracing_exported() -> bool:
+    """True if traces should be recorded for every request, for export."""
+    return bool(os.getenv('TRACE_EXPORT'))
+
+
+@contextmanager
+def start_trace(name: str, enabled: bool = True):
+    """
+    Start collecting spans for the current request. Yields the Trace (or None
+    when disabled) and exports it on exit.
+    """
+    if not enabled:
+        yield None
+        return
+
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span_id.set(None)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_span_id.reset(span_token)
+        _current_trace.reset(trace_token)
+        _export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time one stage. A no-op unless a trace is active."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    span_id = os.urandom(8).hex()
+    parent_span_id = _current_span_id.get()
+    token = _current_span_id.set(span_id)
+    start_ns = time.time_ns()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        _current_span_id.reset(token)
+        trace.add({
+            'name': name,
+            'span_id': span_id,
+            'parent_span_id': parent_span_id,
+            'start_time_unix_nano': start_ns,
+            'end_time_unix_nano': time.time_ns(),
+            'attributes': attributes,
+            'error': error,
+        })
+
+
+def bind(fn: Callable, span_name: Optional[str] = None) -> Callable:
+    """
+    Capture the current trace context so `fn` can run on an executor thread
+    with its spans attached to the submitting span.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        def traced():
+            if span_name is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return context.run(traced)
+
+    return run
+
+
+def _export(trace: Trace):
+    mode = os.getenv('TRACE_EXPORT', '').lower()
+    if not mode:
+        return
+
+    try:
+        if mode == 'file':
+            path = os.getenv('TRACE_EXPORT_FILE', 'traces.jsonl')
+            line = json.dumps(trace.to_otlp())
+            with open(path, 'a') as f:
+                f.write(line + '\n')
+        elif mode == 'otlp':
+            _export_executor.submit(_post_otlp, trace.to_otlp())
+    except Exception as e:
+        logger.warning(f"Trace export failed: {e}")
+
+
+def _post_otlp(payload: Dict[str, Any]):
+    endpoint = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318').rstrip('/')
+    req = urllib.request.Request(
+        f'{endpoint}/v1/traces',
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        urllib.request.urlopen(req, timeout=5).close()
+    except Exception as e:
+        logger.warning(f"OTLP trace export failed: {e}")
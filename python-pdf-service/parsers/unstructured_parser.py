@@ -14,6 +14,7 @@ import os
 import io
 import logging
 from typing import Dict, List, Any, Optional
+import fitz  # PyMuPDF
 import pandas as pd
 
 try:
@@ -24,15 +25,24 @@ except ImportError:
     UNSTRUCTURED_AVAILABLE = False
     logging.warning("Unstructured.io not available - install with: pip install unstructured[pdf]")
 
+from .pages import extract_pages, original_page, select_pages
+from .raster_cache import raster_scope
+from .table_normalize import header_tables, normalize_rows
+from .tracing import span
+
 logger = logging.getLogger(__name__)
 
+# Set by init_unstructured_worker: rasters then go through RASTER_CACHE_DIR
+_in_worker = False
+
 
 def parse_with_unstructured(
     pdf_bytes: bytes,
     filename: str = "quote.pdf",
     use_api: bool = False,
     api_key: Optional[str] = None,
-    strategy: str = "auto"
+    strategy: str = "triage",
+    pages: Optional[List[int]] = None
 ) -> Dict[str, Any]:
     """
     Parse PDF using Unstructured.io for layout-aware extraction
@@ -42,7 +52,8 @@ def parse_with_unstructured(
         filename: Original filename for logging
         use_api: If True, use Unstructured.io Enterprise API
         api_key: API key for enterprise (from env: UNSTRUCTURED_API_KEY)
-        strategy: "auto", "hi_res" (slower, better layout), or "fast"
+        strategy: "triage" (fast or hi_res per page), "auto", "hi_res" (slower, better layout), or "fast"
+        pages: Optional 1-based page numbers to parse (default: all pages)
 
     Returns:
         Dict with:
@@ -63,98 +74,39 @@ def parse_with_unstructured(
         }
 
     try:
-        # Save to temp file (Unstructured requires file path)
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(pdf_bytes)
-            tmp_path = tmp.name
-
-        try:
-            # Partition the document
-            if use_api and api_key:
-                logger.info(f"[Unstructured] Using API mode (strategy={strategy})")
+        if use_api and api_key:
+            # The API picks its own per-document strategy; it has no per-page one
+            api_strategy = "auto" if strategy == "triage" else strategy
+            logger.info(f"[Unstructured] Using API mode (strategy={api_strategy})")
+            with span("unstructured.select_pages"):
+                pdf_bytes, page_numbers = extract_pages(pdf_bytes, pages)
+            with span("unstructured.partition_api", strategy=api_strategy):
                 elements = partition_via_api(
-                    filename=tmp_path,
+                    file=io.BytesIO(pdf_bytes),
+                    metadata_filename=filename,
                     api_key=api_key,
                     api_url="https://api.unstructured.io/general/v0/general",
-                    strategy=strategy
+                    strategy=api_strategy
                 )
-            else:
-                logger.info(f"[Unstructured] Using local mode (strategy={strategy})")
-                elements = partition(filename=tmp_path, strategy=strategy)
-
-            logger.info(f"[Unstructured] Extracted {len(elements)} elements")
-
-            # Separate tables, text, and narratives
-            tables = []
-            narratives = []
-            all_text = []
-
-            for el in elements:
-                all_text.append(el.text)
-
-                if el.category == "Table":
-                    # Extract table content
-                    table_text = el.text
-
-                    # Try to parse as structured table
-                    try:
-                        # Unstructured provides text representation of tables
-                        # Parse it into structured rows
-                        lines = table_text.strip().split('\n')
-                        if len(lines) >= 2:  # Need at least header + 1 row
-                            # Simple heuristic: split by whitespace
-                            rows = [line.split() for line in lines]
-                            tables.append({
-                                "raw_text": table_text,
-                                "rows": rows,
-                                "row_count": len(rows),
-                                "metadata": el.metadata.to_dict() if hasattr(el, 'metadata') else {}
-                            })
-                    except Exception as e:
-                        logger.warning(f"[Unstructured] Failed to parse table: {e}")
-                        tables.append({
-                            "raw_text": table_text,
-                            "rows": [],
-                            "row_count": 0,
-                            "parse_error": str(e)
-                        })
-
-                elif el.category in ["NarrativeText", "ListItem"]:
-                    narratives.append(el.text)
-
-            # Calculate confidence based on structure quality
-            confidence = 0.7  # Base confidence
-            if tables:
-                confidence += 0.15  # Found tables
-            if narratives:
-                confidence += 0.10  # Found narrative sections
-            if len(elements) > 10:
-                confidence += 0.05  # Rich document structure
-
-            confidence = min(confidence, 1.0)
-
-            logger.info(f"[Unstructured] Success: {len(tables)} tables, {len(narratives)} narratives, confidence={confidence}")
-
-            return {
-                "success": True,
-                "tables": tables,
-                "text": "\n\n".join(all_text),
-                "narratives": narratives,
-                "element_count": len(elements),
-                "table_count": len(tables),
-                "metadata": {
-                    "parser": "unstructured",
-                    "strategy": strategy,
-                    "mode": "api" if use_api else "local"
-                },
-                "confidence": confidence
-            }
-
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            return _build_result(_restore_page_numbers(elements, page_numbers), api_strategy, "api", pages)
+
+        logger.info(f"[Unstructured] Using local mode (strategy={strategy})")
+        if strategy == "triage":
+            plan = triage_pages(pdf_bytes, pages)
+            result = _build_result(_partition_triaged(pdf_bytes, filename, plan), strategy, "local", pages)
+            result["metadata"]["page_strategies"] = plan
+            return result
+
+        if strategy == "hi_res":
+            # Layout model + OCR on page images: take them from the request's raster cache
+            return _build_result(_partition_rasters(pdf_bytes, pages), strategy, "local", pages)
+
+        # Only hand the requested pages to Unstructured, straight from memory
+        with span("unstructured.select_pages"):
+            pdf_bytes, page_numbers = extract_pages(pdf_bytes, pages)
+        with span("unstructured.partition", strategy=strategy):
+            elements = partition(file=io.BytesIO(pdf_bytes), metadata_filename=filename, strategy=strategy)
+        return _build_result(_restore_page_numbers(elements, page_numbers), strategy, "local", pages)
 
     except Exception as e:
         logger.error(f"[Unstructured] Parse error: {e}", exc_info=True)
@@ -167,6 +119,174 @@ def parse_with_unstructured(
         }
 
 
+def triage_pages(pdf_bytes: bytes, pages: Optional[List[int]] = None) -> Dict[int, str]:
+    """
+    Choose "fast" or "hi_res" for each page. A page with a real text layer
+    reads fine from pdfminer ("fast"); one without (a scan, or text flattened
+    to vector outlines) needs the layout model and OCR ("hi_res").
+    """
+    min_chars = int(os.getenv("UNSTRUCTURED_TRIAGE_MIN_CHARS", 50))
+    plan = {}
+    with span("unstructured.triage"):
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            for page_number in select_pages(len(doc), pages):
+                chars = len(doc[page_number - 1].get_text("text").strip())
+                plan[page_number] = "fast" if chars >= min_chars else "hi_res"
+    return plan
+
+
+def _partition_triaged(pdf_bytes: bytes, filename: str, plan: Dict[int, str]) -> List[Any]:
+    """Partition "fast" pages in one pdfminer pass and "hi_res" pages from rasters, in page order."""
+    fast_pages = [page for page, strategy in plan.items() if strategy == "fast"]
+    hi_res_pages = [page for page, strategy in plan.items() if strategy == "hi_res"]
+
+    elements = []
+    if fast_pages:
+        with span("unstructured.select_pages"):
+            subset, page_numbers = extract_pages(pdf_bytes, fast_pages)
+        with span("unstructured.partition", strategy="fast", pages=len(fast_pages)):
+            fast_elements = partition(file=io.BytesIO(subset), metadata_filename=filename, strategy="fast")
+        elements.extend(_restore_page_numbers(fast_elements, page_numbers))
+    if hi_res_pages:
+        elements.extend(_partition_rasters(pdf_bytes, hi_res_pages))
+
+    # Stable sort keeps each page's reading order
+    elements.sort(key=lambda el: el.metadata.page_number or 0)
+    return elements
+
+
+def init_unstructured_worker():
+    """
+    Process-pool initializer: import Unstructured and load the local layout
+    model once per worker, so no request pays for it. Never raises (a failing
+    initializer would break the pool); requests then fail as they did inline.
+    """
+    global _in_worker
+    _in_worker = True
+    if not UNSTRUCTURED_AVAILABLE or os.getenv("UNSTRUCTURED_API_KEY"):
+        return
+    try:
+        from unstructured.partition.image import partition_image  # noqa: F401
+        from unstructured_inference.models.base import get_model
+        get_model()
+    except Exception as e:
+        logger.warning(f"[Unstructured] Worker warm-up failed: {e}")
+
+
+def hi_res_dpi() -> int:
+    """Page image resolution for local hi_res: UNSTRUCTURED_DPI, else OCR_DPI."""
+    return int(os.getenv("UNSTRUCTURED_DPI") or os.getenv("OCR_DPI", 300))
+
+
+def _partition_rasters(pdf_bytes: bytes, pages: Optional[List[int]]) -> List[Any]:
+    """
+    hi_res partition of each page image, rendered through the raster cache at
+    UNSTRUCTURED_DPI, which defaults to OCR_DPI so both parsers ask for the
+    same pages (Unstructured's own default is 200). Inline, a page OCRParser
+    already rendered at that resolution is not rendered again; in a pool
+    worker the cache is shared through RASTER_CACHE_DIR, so only pages the
+    request process had rendered (or renders while this runs) are reused.
+    """
+    from unstructured.partition.image import partition_image
+
+    dpi = hi_res_dpi()
+    elements = []
+    with raster_scope(pdf_bytes) as rasters:
+        if _in_worker:
+            rasters.share()
+        for page_number in select_pages(rasters.page_count, pages):
+            image = rasters.image(page_number, dpi, grayscale=False)
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG", compress_level=1)
+            buffer.seek(0)
+            with span("unstructured.partition", strategy="hi_res", page=page_number):
+                page_elements = partition_image(file=buffer, strategy="hi_res")
+            for el in page_elements:
+                el.metadata.page_number = page_number
+            elements.extend(page_elements)
+    return elements
+
+
+def _restore_page_numbers(elements: List[Any], page_numbers: Optional[List[int]]) -> List[Any]:
+    """Page numbers in a sub-PDF are 1..n; map them back to the original document."""
+    if page_numbers is not None:
+        for el in elements:
+            el.metadata.page_number = original_page(page_numbers, el.metadata.page_number or 1)
+    return elements
+
+
+def _build_result(elements: List[Any], strategy: str, mode: str, pages: Optional[List[int]]) -> Dict[str, Any]:
+    """Sort partitioned elements into tables, text and narratives."""
+    logger.info(f"[Unstructured] Extracted {len(elements)} elements")
+
+    # Separate tables, text, and narratives
+    tables = []
+    narratives = []
+    all_text = []
+
+    for el in elements:
+        all_text.append(el.text)
+
+        if el.category == "Table":
+            # Extract table content
+            table_text = el.text
+
+            # Try to parse as structured table
+            try:
+                # Unstructured provides text representation of tables
+                # Parse it into structured rows
+                lines = table_text.strip().split('\n')
+                if len(lines) >= 2:  # Need at least header + 1 row
+                    # Simple heuristic: split by whitespace
+                    rows = [line.split() for line in lines]
+                    tables.append({
+                        "raw_text": table_text,
+                        "rows": rows,
+                        "row_count": len(rows),
+                        "metadata": el.metadata.to_dict() if hasattr(el, 'metadata') else {}
+                    })
+            except Exception as e:
+                logger.warning(f"[Unstructured] Failed to parse table: {e}")
+                tables.append({
+                    "raw_text": table_text,
+                    "rows": [],
+                    "row_count": 0,
+                    "parse_error": str(e)
+                })
+
+        elif el.category in ["NarrativeText", "ListItem"]:
+            narratives.append(el.text)
+
+    # Calculate confidence based on structure quality
+    confidence = 0.7  # Base confidence
+    if tables:
+        confidence += 0.15  # Found tables
+    if narratives:
+        confidence += 0.10  # Found narrative sections
+    if len(elements) > 10:
+        confidence += 0.05  # Rich document structure
+
+    confidence = min(confidence, 1.0)
+
+    logger.info(f"[Unstructured] Success: {len(tables)} tables, {len(narratives)} narratives, confidence={confidence}")
+
+    return {
+        "success": True,
+        "tables": tables,
+        "text": "\n\n".join(all_text),
+        "narratives": narratives,
+        "element_count": len(elements),
+        "table_count": len(tables),
+        "metadata": {
+            "parser": "unstructured",
+            "strategy": strategy,
+            "mode": mode,
+            "pages": pages
+        },
+        "confidence": confidence
+    }
+
+
 def extract_line_items_from_tables(tables: List[Dict]) -> List[Dict[str, Any]]:
     """
     Extract line items from Unstructured.io table data
@@ -178,58 +298,21 @@ def extract_line_items_from_tables(tables: List[Dict]) -> List[Dict[str, Any]]:
     - rate
     - total
     """
-    line_items = []
-
-    for table_idx, table in enumerate(tables):
-        rows = table.get("rows", [])
-        if len(rows) < 2:
-            continue
-
-        # Assume first row is header
-        header = rows[0]
-
-        # Try to identify columns (common patterns)
-        desc_col = None
-        qty_col = None
-        unit_col = None
-        rate_col = None
-        total_col = None
-
-        for i, h in enumerate(header):
-            h_lower = h.lower()
-            if 'desc' in h_lower or 'item' in h_lower:
-                desc_col = i
-            elif 'qty' in h_lower or 'quantity' in h_lower:
-                qty_col = i
-            elif 'unit' in h_lower:
-                unit_col = i
-            elif 'rate' in h_lower or 'price' in h_lower:
-                rate_col = i
-            elif 'total' in h_lower or 'amount' in h_lower:
-                total_col = i
-
-        # Extract data rows
-        for row in rows[1:]:
-            if len(row) < 2:
-                continue
-
-            try:
-                item = {
-                    "description": row[desc_col] if desc_col is not None and desc_col < len(row) else "",
-                    "qty": float(row[qty_col]) if qty_col is not None and qty_col < len(row) else 1.0,
-                    "unit": row[unit_col] if unit_col is not None and unit_col < len(row) else "ea",
-                    "rate": float(row[rate_col]) if rate_col is not None and rate_col < len(row) else 0.0,
-                    "total": float(row[total_col]) if total_col is not None and total_col < len(row) else 0.0,
-                    "source_table": table_idx
-                }
-
-                # Only add if we have at least description
-                if item["description"].strip():
-                    line_items.append(item)
-
-            except (ValueError, IndexError) as e:
-                logger.debug(f"[Unstructured] Skipping malformed row: {e}")
-                continue
+    # First row of each table is its header; single-cell rows are captions
+    frame = normalize_rows(
+        [
+            ([row for row in data_rows if len(row) >= 2], columns)
+            for data_rows, columns in header_tables(table.get("rows", []) for table in tables)
+        ],
+        require_values=False,
+        defaults={"quantity": 1.0, "unit": "ea"}
+    )
+    line_items = frame.rename(columns={
+        "quantity": "qty",
+        "unit_price": "rate",
+        "total_price": "total",
+        "table": "source_table",
+    })[["description", "qty", "unit", "rate", "total", "source_table"]].to_dict("records")
 
     logger.info(f"[Unstructured] Extracted {len(line_items)} line items from {len(tables)} tables")
     return line_items
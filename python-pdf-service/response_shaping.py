@@ -0,0 +1,214 @@
+"""
+Response shaping and encoding for parse endpoints, shared by app.py and asgi.py.
+
+An ensemble response on a long quote repeats each parser's items in
+`all_results`, again in `best_result` and roughly again in
+`consensus_items`, plus pdfplumber's `raw_tables`. Clients choose what
+they need with form (or query) fields:
+
+- `fields=best_result,confidence_breakdown`: keep only these keys (dotted
+  paths such as `best_result.items` reach one level down)
+- `best_result=ref`: send `best_result` as a pointer into `all_results`
+- `debug=true`: include debugging data (`raw_tables`); left out otherwise
+- `format=msgpack` (or `Accept: application/msgpack`): MessagePack body
+- `items_format=columnar`: every `items` / `consensus_items` list sent as
+  column arrays (see parsers/items.py) instead of one object per row
+
+Bodies are encoded with orjson when it is installed and compressed with
+zstd, brotli or gzip according to Accept-Encoding.
+"""
+
+import os
+import gzip
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from parsers.items import to_columns
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Keys only useful when debugging a parser, stripped unless debug=true
+DEBUG_KEYS = ('raw_tables',)
+
+# Bodies smaller than this aren't worth the compression CPU
+COMPRESS_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+
+# Request fields read by response_options()
+OPTION_FIELDS = ('fields', 'best_result', 'debug', 'format', 'items_format')
+
+# Line-item lists that items_format=columnar turns into column arrays
+ITEM_KEYS = ('items', 'consensus_items')
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def _truthy(value: Optional[str]) -> bool:
+    return (value or '').lower() in ('1', 'true', 'yes')
+
+
+def response_options(values: Mapping[str, Any], headers: Mapping[str, str]) -> Dict[str, Any]:
+    """Read shaping options from request fields (form or query) and headers."""
+    fields = [f.strip() for f in (values.get('fields') or '').split(',') if f.strip()]
+    accept = (headers.get('Accept') or '').lower()
+    fmt = (values.get('format') or '').lower()
+    if not fmt:
+        fmt = 'msgpack' if any(t in accept for t in MSGPACK_TYPES) else 'json'
+
+    return {
+        'fields': fields,
+        'best_result_ref': (values.get('best_result') or '').lower() == 'ref',
+        'debug': _truthy(values.get('debug')),
+        'format': fmt,
+        'columnar_items': (values.get('items_format') or '').lower() == 'columnar',
+        'accept_encoding': headers.get('Accept-Encoding') or '',
+    }
+
+
+def _strip_debug(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_debug(v) for k, v in value.items() if k not in DEBUG_KEYS}
+    if isinstance(value, list):
+        return [_strip_debug(v) for v in value]
+    return value
+
+
+def _select_fields(result: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Keep top-level keys (and `key.subkey` paths) named in `fields`."""
+    paths = [field.partition('.') for field in fields]
+    whole = {key for key, _, subkey in paths if not subkey and key in result}
+    selected = {key: result[key] for key in whole}
+
+    for key, _, subkey in paths:
+        if not subkey or key in whole:
+            continue
+        value = result.get(key)
+        if isinstance(value, dict) and subkey in value:
+            selected.setdefault(key, {})[subkey] = value[subkey]
+    return selected
+
+
+def _best_result_ref(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace the copy of the winning parser's result with a pointer into all_results."""
+    best = result.get('best_result')
+    all_results = result.get('all_results')
+    if not isinstance(best, dict) or not isinstance(all_results, list):
+        return result
+
+    for index, candidate in enumerate(all_results):
+        if candidate is best or (
+            candidate.get('parser_name') == best.get('parser_name')
+            and candidate.get('confidence_score') == best.get('confidence_score')
+        ):
+            return {**result, 'best_result': {
+                '$ref': f'#/all_results/{index}',
+                'parser_name': best.get('parser_name'),
+                'confidence_score': best.get('confidence_score'),
+            }}
+    return result
+
+
+def _columnar_items(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: to_columns(v)
+            if k in ITEM_KEYS and isinstance(v, list) and all(isinstance(i, dict) for i in v)
+            else _columnar_items(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_columnar_items(v) for v in value]
+    return value
+
+
+def shape_result(result: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply best_result referencing, field selection, debug stripping and item layout."""
+    fields = options['fields']
+    # A reference is only useful if what it points at is still in the response
+    if options['best_result_ref'] and (not fields or 'all_results' in fields):
+        result = _best_result_ref(result)
+    if fields:
+        result = _select_fields(result, fields)
+    if not options['debug']:
+        result = _strip_debug(result)
+    if options['columnar_items']:
+        result = _columnar_items(result)
+    return result
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact JSON bytes, via orjson when available."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # Something orjson won't take (e.g. a Decimal); the stdlib falls back to str()
+    return json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding the client accepts (q > 0) that we can produce: zstd, then br, then gzip."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    available = [('zstd', ZSTD_AVAILABLE), ('br', BROTLI_AVAILABLE), ('gzip', True)]
+    for name, ok in available:
+        if ok and accepted.get(name, accepted.get('*', 0)) > 0:
+            return name
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def encode_response(payload: Any, options: Dict[str, Any]) -> Tuple[bytes, Dict[str, str]]:
+    """Serialise and (if worthwhile) compress a payload. Returns (body, headers)."""
+    if options['format'] == 'msgpack' and MSGPACK_AVAILABLE:
+        body = msgpack.packb(payload, default=str)
+        headers = {'Content-Type': 'application/msgpack'}
+    else:
+        body = dumps(payload)
+        headers = {'Content-Type': 'application/json'}
+    headers['Vary'] = 'Accept, Accept-Encoding'
+
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = _pick_encoding(options['accept_encoding'])
+        if encoding:
+            body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+    return body, headers
@@ -129,6 +129,126 @@ def test_app():
     print("  ✓ Flask app works\n")
     return True
 
+def test_near_duplicate_renamed_items():
+    """A quote whose item descriptions changed must not get the earlier quote's result."""
+    print("Testing near-duplicate reuse...")
+    import shutil
+    import tempfile
+    from benchmarks import corpus
+    from parsers.ensemble_coordinator import EnsembleCoordinator
+
+    index_dir = tempfile.mkdtemp()
+    overrides = {
+        'SIMILARITY_INDEX_ENABLED': 'true',
+        'SIMILARITY_INDEX_DIR': index_dir,
+        'PAGE_STORE_ENABLED': 'false',
+        'LAYOUT_TEMPLATES_ENABLED': 'false',
+        'OUTCOME_LEARNING_ENABLED': 'false',
+    }
+    saved_env = {name: os.environ.get(name) for name in overrides}
+    saved_systems = list(corpus.SYSTEMS)
+    os.environ.update(overrides)
+    try:
+        original = corpus.generate_quote(corpus.QuoteSpec('near-duplicate', 2, seed=11))
+        # Same seed, same figures: only the "Pipe wrap" descriptions change
+        corpus.SYSTEMS[corpus.SYSTEMS.index('Pipe wrap')] = 'Pipe lagging'
+        renamed = corpus.generate_quote(corpus.QuoteSpec('near-duplicate', 2, seed=11))
+
+        coordinator = EnsembleCoordinator()
+        coordinator.parse_with_ensemble(original, 'a.pdf', ['pdfplumber', 'pymupdf'])
+        response = coordinator.parse_with_ensemble(renamed, 'b.pdf', ['pdfplumber', 'pymupdf'])
+
+        assert 'near_duplicate' not in response['extraction_metadata'], 'renamed items reused the earlier result'
+        descriptions = [item['description'] for item in response['best_result']['items']]
+        assert any('Pipe lagging' in d for d in descriptions), 'renamed items missing from the result'
+        assert not any('Pipe wrap' in d for d in descriptions), 'earlier descriptions leaked into the result'
+
+        copy = coordinator.parse_with_ensemble(original, 'a-copy.pdf', ['pdfplumber', 'pymupdf'])
+        assert copy['extraction_metadata'].get('near_duplicate'), 'identical copy was not reused'
+        print("  ✓ Renamed items are parsed again, identical copies reused\n")
+    finally:
+        corpus.SYSTEMS[:] = saved_systems
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+
+def test_whole_dollar_item_pages():
+    """Item pages priced in whole dollars must be classified and sent to the classified parsers."""
+    print("Testing page classification of whole-dollar quotes...")
+    import fitz
+    from parsers.ensemble_coordinator import EnsembleCoordinator
+    from parsers.page_classifier import classify_pages
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), 'Item Description Qty Rate Total')
+    for row in range(8):
+        page.insert_text((72, 100 + row * 20), f'{row + 1} Fire collar 10 $150 $1,500')
+    page = doc.new_page()
+    page.insert_text((72, 72), 'Subtotal $12,000')
+    page.insert_text((72, 92), 'GST $247.50')
+    page.insert_text((72, 112), 'Total $12,247.50')
+    pdf_bytes = doc.tobytes()
+    doc.close()
+
+    labels = [record['label'] for record in classify_pages(pdf_bytes)]
+    assert labels[0] == 'priced_table', f'whole-dollar item page labelled {labels[0]}'
+    classification, relevant = EnsembleCoordinator()._classify(pdf_bytes, None)
+    assert relevant is None or 1 in relevant, f'item page dropped from classified parsers: {relevant}'
+    print("  ✓ Whole-dollar item pages are kept\n")
+
+
+def test_routed_items_keep_their_pages():
+    """Cloud items for non-adjacent flagged pages must land at their own pages in the routed result."""
+    print("Testing per-page merge of routed cloud items...")
+    import fitz
+    from benchmarks.fakes import FakeBackendConfig, FakeTextractClient
+    from parsers.routing import merge_by_page
+    from parsers.textract_parser import TextractParser
+
+    doc = fitz.open()
+    for number in range(1, 8):
+        page = doc.new_page()
+        page.insert_text((72, 72), 'Description        Qty      Rate      Total')
+        for row in range(3):
+            page.insert_text((72, 100 + row * 20), f'Item p{number}r{row}        2      10.00      20.00')
+    pdf_bytes = doc.tobytes()
+    doc.close()
+
+    textract = TextractParser.__new__(TextractParser)
+    textract.textract = FakeTextractClient(FakeBackendConfig(0, 0, latency_sigma=0, error_rate=0, throttle_rate=0))
+    cloud = textract.parse(pdf_bytes, 'routed.pdf', [2, 7])
+    assert cloud['metadata']['item_pages'] == [2, 2, 2, 7, 7, 7], f"item pages: {cloud['metadata'].get('item_pages')}"
+
+    local_tables = [
+        {'pages': [number], 'columns': [], 'items': [{'description': f'Item p{number}r{row}'} for row in range(3)]}
+        for number in range(1, 8)
+    ]
+    merged = merge_by_page(local_tables, [2, 7], cloud['items'], cloud['metadata']['item_pages'])
+    expected = [f'Item p{number}r{row}' for number in range(1, 8) for row in range(3)]
+    assert [item['description'] for item in merged] == expected, 'cloud items not merged at their own pages'
+    print("  ✓ Routed cloud items keep their pages\n")
+
+
+def test_ocr_digit_fixes_only_for_ocr():
+    """Letters are read as digits only in OCR text: "5 l" from a text-layer table is not 51."""
+    print("Testing OCR digit fixes...")
+    from parsers.table_normalize import POSITIONAL_COLUMNS, frame_items, normalize_rows
+
+    rows = [('Fire collar', '5 l', 'ea', '1O.OO', '50.00')]
+    text_layer = frame_items(normalize_rows([(rows, POSITIONAL_COLUMNS)]))[0]
+    assert text_layer['quantity'] == 0.0, f"text-layer quantity read as {text_layer['quantity']}"
+    assert text_layer['unit_price'] == 0.0, f"text-layer rate read as {text_layer['unit_price']}"
+
+    ocr = frame_items(normalize_rows([(rows, POSITIONAL_COLUMNS)], ocr_digits=True))[0]
+    assert ocr['quantity'] == 51.0 and ocr['unit_price'] == 10.0, f"OCR fixes not applied: {ocr}"
+    print("  ✓ OCR digit fixes apply to OCR text only\n")
+
+
 def check_system_dependencies():
     """Check for system-level dependencies."""
     print("Checking system dependencies...")
@@ -199,6 +319,34 @@ def main():
         print("\n❌ App test failed!")
         return False
 
+    try:
+        test_near_duplicate_renamed_items()
+    except AssertionError as e:
+        print(f"  ✗ {e}")
+        print("\n❌ Near-duplicate test failed!")
+        return False
+
+    try:
+        test_whole_dollar_item_pages()
+    except AssertionError as e:
+        print(f"  ✗ {e}")
+        print("\n❌ Page classification test failed!")
+        return False
+
+    try:
+        test_routed_items_keep_their_pages()
+    except AssertionError as e:
+        print(f"  ✗ {e}")
+        print("\n❌ Cloud routing test failed!")
+        return False
+
+    try:
+        test_ocr_digit_fixes_only_for_ocr()
+    except AssertionError as e:
+        print(f"  ✗ {e}")
+        print("\n❌ Table normalisation test failed!")
+        return False
+
     if success:
         print("="*60)
         print("✅ ALL TESTS PASSED!")
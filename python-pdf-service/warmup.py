@@ -0,0 +1,159 @@
+"""
+Worker warm-up.
+
+With WARMUP=true the service imports every enabled parser's backend, loads
+tesseract language data, and runs a tiny built-in quote through each local
+parser before taking traffic. Unstructured's layout model is loaded in its
+own process pool by `start_worker_pools()`, once per worker.
+
+Under gunicorn with GUNICORN_PRELOAD=true this happens once in the master
+(gunicorn.conf.py `when_ready`), so forked workers share the warmed pages
+copy-on-write and the first request after a deploy or --max-requests recycle
+is not the slow one. Without preload each worker warms itself before it
+accepts connections.
+
+/health reports `ready` only once warm-up has finished.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict
+
+from parsers.registry import PARSER_CLASSES, create_parser, enabled_parsers, is_enabled
+
+logger = logging.getLogger(__name__)
+
+# Parsers that call paid remote APIs: warm-up builds their clients but never calls them
+_REMOTE_PARSERS = ('textract', 'docai')
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {'status': 'pending', 'parsers': {}, 'duration_ms': 0}
+
+
+def warmup_enabled() -> bool:
+    return os.getenv('WARMUP', 'false').lower() == 'true'
+
+
+def is_ready() -> bool:
+    """True once warm-up has run (or straight away when warm-up is disabled)."""
+    return not warmup_enabled() or _state['status'] == 'done'
+
+
+def status() -> Dict[str, Any]:
+    return {**_state, 'parsers': dict(_state['parsers'])}
+
+
+def sample_pdf() -> bytes:
+    """A one-page ruled quote, just enough to exercise each parser's full path."""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((50, 60), 'Warm-up Supplies Ltd', fontsize=14)
+    page.insert_text((50, 80), 'Quote Number: Q-00001', fontsize=10)
+
+    rows = [
+        ('Description', 'Qty', 'Unit', 'Rate', 'Total'),
+        ('Fire collar 100mm', '4', 'ea', '55.00', '220.00'),
+        ('Intumescent sealant', '10', 'm', '12.50', '125.00'),
+    ]
+    columns = [50, 300, 360, 420, 490, 560]
+    top = 110
+    for row_index, row in enumerate(rows):
+        y = top + row_index * 20
+        for col_index, cell in enumerate(row):
+            page.insert_text((columns[col_index] + 4, y + 14), cell, fontsize=10)
+    for row_index in range(len(rows) + 1):
+        y = top + row_index * 20
+        page.draw_line((columns[0], y), (columns[-1], y))
+    for x in columns:
+        page.draw_line((x, top), (x, top + len(rows) * 20))
+
+    page.insert_text((400, top + len(rows) * 20 + 30), 'Total: 345.00', fontsize=10)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def _load_tesseract_data():
+    """Run tesseract once so its binary and language data are in the page cache."""
+    import pytesseract
+    from PIL import Image
+
+    pytesseract.image_to_string(Image.new('L', (64, 32), color=255))
+
+
+def warm_up() -> Dict[str, Any]:
+    """Import, initialise and exercise every enabled parser. Safe to call more than once."""
+    with _lock:
+        if _state['status'] != 'done':
+            _state['status'] = 'warming'
+            _run_warm_up()
+    return status()
+
+
+def start_worker_pools() -> Dict[str, Any]:
+    """
+    Start the dedicated Unstructured pool and wait until its workers have
+    loaded their models. Pools can't be inherited across fork, so this runs in
+    each worker (gunicorn post_worker_init), never in a preloading master.
+    """
+    if not is_enabled('unstructured'):
+        return status()
+
+    from parsers.unstructured_parser import UNSTRUCTURED_AVAILABLE
+
+    if not UNSTRUCTURED_AVAILABLE or os.getenv('UNSTRUCTURED_API_KEY') or int(os.getenv('UNSTRUCTURED_PROCESSES', 1)) <= 0:
+        return status()
+
+    from parsers.ensemble_coordinator import EnsembleCoordinator
+
+    start = time.time()
+    try:
+        # Spawns the workers (each loads its model in the pool initializer) and runs one parse
+        outcome = EnsembleCoordinator()._parse_with_unstructured_wrapper(sample_pdf(), 'warmup.pdf')['success']
+    except Exception as e:
+        outcome = f'error: {e}'
+        logger.warning(f"Warm-up of the Unstructured pool failed: {e}")
+    _state['parsers']['unstructured'] = {'result': outcome, 'ms': int((time.time() - start) * 1000)}
+    return status()
+
+
+def _run_warm_up():
+    from parsers.ensemble_coordinator import EnsembleCoordinator
+
+    start = time.time()
+    pdf_bytes = sample_pdf()
+    coordinator = EnsembleCoordinator()
+
+    for parser_name in enabled_parsers():
+        parser_start = time.time()
+        try:
+            if parser_name == 'unstructured':
+                # The layout model lives in the Unstructured pool, warmed by start_worker_pools()
+                import parsers.unstructured_parser  # noqa: F401
+                outcome = 'pooled'
+            elif parser_name in _REMOTE_PARSERS:
+                create_parser(parser_name)
+                outcome = 'client_only'
+            elif parser_name in PARSER_CLASSES:
+                if parser_name == 'ocr':
+                    _load_tesseract_data()
+                outcome = create_parser(parser_name).parse(pdf_bytes, 'warmup.pdf')['success']
+            else:
+                continue
+        except Exception as e:
+            # A parser that can't warm up (e.g. tesseract missing) still fails the same way per request
+            outcome = f'error: {e}'
+            logger.warning(f"Warm-up of {parser_name} failed: {e}")
+
+        _state['parsers'][parser_name] = {
+            'result': outcome,
+            'ms': int((time.time() - parser_start) * 1000),
+        }
+
+    _state['duration_ms'] = int((time.time() - start) * 1000)
+    _state['status'] = 'done'
+    logger.info(f"Warm-up finished in {_state['duration_ms']} ms: {_state['parsers']}")